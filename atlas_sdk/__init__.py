@@ -1,10 +1,40 @@
-from .skill_client import SkillClient
-from .channel_client import ChannelClient
-from .broker import BrokerConfig
-from .intent import Intent
-from .slot import Slot
-from .env import Env
-from .request import Request
+"""Submodules are only imported when one of their classes is used, so a channel gateway
+does not pay for the skill machinery and the other way around.
+"""
+
 from .version import __version__
+import importlib
+
+# Public name -> submodule where it's defined
+_EXPORTS = {
+  'SkillClient': 'skill_client',
+  'ChannelClient': 'channel_client',
+  'ChannelHub': 'channel_hub',
+  'Channel': 'channel_hub',
+  'AsyncSkillClient': 'async_skill_client',
+  'AsyncChannelClient': 'async_channel_client',
+  'BrokerConfig': 'broker',
+  'Intent': 'intent',
+  'Slot': 'slot',
+  'Env': 'env',
+  'Request': 'request',
+  'AsyncRequest': 'request',
+}
+
+__all__ = list(_EXPORTS) + ['__version__']
+
+def __getattr__(name):
+  module = _EXPORTS.get(name)
+
+  if not module:
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+  value = getattr(importlib.import_module('.' + module, __name__), name)
+
+  # Cached so next accesses are plain attribute lookups
+  globals()[name] = value
+
+  return value
 
-__name__ = 'atlas_sdk'
\ No newline at end of file
+def __dir__():
+  return sorted(set(globals()) | set(_EXPORTS))
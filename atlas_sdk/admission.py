@@ -0,0 +1,175 @@
+"""Admission control, so a single user or session flooding a skill could not slow down
+every other one.
+"""
+
+from collections import Counter, OrderedDict
+import threading, time
+
+# Reasons why a request has been shed
+SHED_IN_FLIGHT = 'in_flight'
+SHED_SESSION = 'session'
+SHED_USER = 'user'
+
+# Shown, translated, to the user of a shed request when no other message has been given
+SHED_MESSAGE = 'I am a bit overwhelmed right now, please try again later'
+
+class RateLimiter():
+  """Token buckets keyed by an arbitrary value.
+
+  Each key may be used `burst` times in a row, then `rate` times per second. Only the
+  most recently used keys are remembered, a forgotten key starts again with a full bucket.
+
+  """
+
+  def __init__(self, rate, burst=None, max_keys=10000, clock=time.monotonic):
+    """Constructs a new rate limiter.
+
+    :param rate: Tokens added to each bucket per second
+    :type rate: float
+    :param burst: Size of each bucket, defaults to rate
+    :type burst: float
+    :param max_keys: Maximum number of buckets kept in memory
+    :type max_keys: int
+    :param clock: Function returning the current time in seconds
+    :type clock: callable
+
+    """
+
+    self.rate = rate
+    self.burst = burst or rate
+    self.max_keys = max_keys
+
+    self._clock = clock
+    self._lock = threading.Lock()
+    self._buckets = OrderedDict()
+
+  def __len__(self):
+    return len(self._buckets)
+
+  def allow(self, key):
+    """Takes a token from the bucket of the given key if there is one left.
+
+    :param key: Bucket key
+    :type key: hashable
+    :rtype: bool
+
+    """
+
+    now = self._clock()
+
+    with self._lock:
+      bucket = self._buckets.pop(key, None)
+
+      if bucket is None:
+        tokens = self.burst
+      else:
+        tokens, last = bucket
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+
+      allowed = tokens >= 1
+
+      if allowed:
+        tokens -= 1
+
+      # Reinserted so the least recently used key is always the first one
+      self._buckets[key] = (tokens, now)
+
+      if len(self._buckets) > self.max_keys:
+        self._buckets.popitem(last=False)
+
+    return allowed
+
+class AdmissionControl():
+  """Decides if a request should be handled or shed.
+
+  Requests are shed when too many of them are already in flight (waiting or running), or
+  when their session or user sends them faster than allowed.
+
+  """
+
+  def __init__(self, max_in_flight=0, session_rate=None, session_burst=None, user_rate=None, user_burst=None, message=SHED_MESSAGE, clock=time.monotonic):
+    """Constructs a new admission control.
+
+    :param max_in_flight: Maximum number of requests being handled at the same time, 0 for no limit
+    :type max_in_flight: int
+    :param session_rate: Requests per second allowed for a single session, no limit if not set
+    :type session_rate: float
+    :param session_burst: Requests a session could send in a row, defaults to session_rate
+    :type session_burst: float
+    :param user_rate: Requests per second allowed for a single user, no limit if not set
+    :type user_rate: float
+    :param user_burst: Requests a user could send in a row, defaults to user_rate
+    :type user_burst: float
+    :param message: Text shown, translated, to the user of a shed request, None to only terminate the dialog
+    :type message: str
+    :param clock: Function returning the current time in seconds
+    :type clock: callable
+
+    """
+
+    self.max_in_flight = max_in_flight
+    self.message = message
+    self.sessions = RateLimiter(session_rate, session_burst, clock=clock) if session_rate else None
+    self.users = RateLimiter(user_rate, user_burst, clock=clock) if user_rate else None
+
+    # Number of shed requests by reason
+    self.shed = Counter()
+    self.admitted = 0
+
+    self._lock = threading.Lock()
+    self._in_flight = 0
+
+  @property
+  def in_flight(self):
+    """Number of admitted requests not handled yet.
+
+    :rtype: int
+
+    """
+
+    return self._in_flight
+
+  def admit(self, request):
+    """Checks if the given request should be handled, if so, it's counted as in flight
+    until release is called.
+
+    :param request: Received request
+    :type request: Request
+    :returns: None if admitted, the reason why it has been shed otherwise
+    :rtype: str
+
+    """
+
+    reason = None
+
+    with self._lock:
+      if self.max_in_flight and self._in_flight >= self.max_in_flight:
+        reason = SHED_IN_FLIGHT
+      else:
+        self._in_flight += 1
+
+    if not reason:
+      sid, uid = request.sid, request.uid
+
+      if self.sessions is not None and sid is not None and not self.sessions.allow(sid):
+        reason = SHED_SESSION
+      elif self.users is not None and uid is not None and not self.users.allow(uid):
+        reason = SHED_USER
+
+      if reason:
+        self.release()
+
+    with self._lock:
+      if reason:
+        self.shed[reason] += 1
+      else:
+        self.admitted += 1
+
+    return reason
+
+  def release(self):
+    """Marks an admitted request as handled.
+    """
+
+    with self._lock:
+      self._in_flight -= 1
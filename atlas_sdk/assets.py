@@ -0,0 +1,245 @@
+"""Assets, such as card medias, published once by skills and referenced by their content
+hash instead of being embedded in every response.
+"""
+
+import base64, hashlib, mmap, os, threading
+
+# Prefix of asset references, followed by the content hash and the file extension
+ASSET_SCHEME = 'atlas-asset:'
+
+# Files at least this big are hashed and kept through a memory map instead of being read
+MMAP_THRESHOLD = 64 * 1024
+
+def asset_digest(ref):
+  """Retrieve the content hash of an asset reference.
+
+  :param ref: Asset reference, as given by Asset.uri
+  :type ref: str
+  :rtype: str
+
+  """
+
+  digest, _ = os.path.splitext(ref[len(ASSET_SCHEME):])
+
+  return digest
+
+def is_asset(value):
+  """Checks if the given value is an asset reference.
+
+  :rtype: bool
+
+  """
+
+  return isinstance(value, str) and value.startswith(ASSET_SCHEME)
+
+def content_type(ref):
+  """Guess the content type of an asset from its reference or path.
+
+  :param ref: Asset reference or file path
+  :type ref: str
+  :rtype: str
+
+  """
+
+  import mimetypes # Only needed when building data uris
+
+  return mimetypes.guess_type('file' + os.path.splitext(ref)[1])[0] or 'application/octet-stream'
+
+class Asset():
+  """A single asset loaded from a file.
+  """
+
+  __slots__ = ('name', 'path', 'digest', 'data', 'uri')
+
+  def __init__(self, path, name=None):
+    """Loads and hashes the given file.
+
+    :param path: Path of the file
+    :type path: str
+    :param name: Name of the asset, defaults to the file name without extension
+    :type name: str
+
+    """
+
+    self.path = path
+    self.name = name or os.path.splitext(os.path.basename(path))[0]
+
+    with open(path, mode='rb') as f:
+      if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+        self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+      else:
+        self.data = f.read()
+
+    self.digest = hashlib.sha256(self.data).hexdigest()
+    self.uri = ASSET_SCHEME + self.digest + os.path.splitext(path)[1].lower()
+
+  def __len__(self):
+    return len(self.data)
+
+  def content(self):
+    """Retrieve the content of the asset.
+
+    :rtype: bytes
+
+    """
+
+    return self.data if isinstance(self.data, bytes) else self.data[:]
+
+  def __str__(self):
+    return 'Asset %s (%s)' % (self.name, self.uri)
+
+class AssetRegistry():
+  """Assets of a skill, each file is loaded and hashed once.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._by_path = {}
+    self._published = set()
+
+  def __len__(self):
+    return len(self._by_path)
+
+  def __iter__(self):
+    return iter(list(self._by_path.values()))
+
+  def add(self, path, name=None):
+    """Registers a file as an asset, it's loaded only the first time.
+
+    :param path: Path of the file
+    :type path: str
+    :param name: Name of the asset, defaults to the file name without extension
+    :type name: str
+    :rtype: Asset
+
+    """
+
+    path = os.path.abspath(path)
+
+    with self._lock:
+      asset = self._by_path.get(path)
+
+    if not asset:
+      asset = Asset(path, name)
+
+      with self._lock:
+        asset = self._by_path.setdefault(path, asset)
+
+    return asset
+
+  def uris(self, files):
+    """Registers the given files and makes a dictionary of their references where keys are
+    their names, a drop-in replacement for utils.svgs_to_data_uri.
+
+    :param files: Files to register
+    :type files: list
+    :rtype: dict
+
+    """
+
+    files = [files] if type(files) is not list else files
+
+    return { a.name: a.uri for a in (self.add(path) for path in files) }
+
+  def unpublished(self):
+    """Retrieve assets not published yet and marks them as published.
+
+    :rtype: list
+
+    """
+
+    with self._lock:
+      assets = [a for a in self._by_path.values() if a.digest not in self._published]
+      self._published.update(a.digest for a in assets)
+
+    return assets
+
+class AssetCache():
+  """Contents of assets received by channels, by content hash.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._contents = {}
+    self._uris = {}
+
+  def __len__(self):
+    return len(self._contents)
+
+  def __contains__(self, digest):
+    return digest in self._contents
+
+  def put(self, digest, content):
+    """Stores the content of an asset.
+
+    :param digest: Content hash
+    :type digest: str
+    :param content: Content
+    :type content: bytes
+
+    """
+
+    with self._lock:
+      self._contents.setdefault(digest, content)
+
+  def on_message(self, msg):
+    """Stores an asset received on ASSET_TOPIC, may be given to Client.subscribe_message.
+    """
+
+    if msg.payload:
+      self.put(msg.topic.rsplit('/', 1)[-1], bytes(msg.payload))
+
+  def get(self, ref):
+    """Retrieve the content of an asset.
+
+    :param ref: Asset reference or content hash
+    :type ref: str
+    :returns: Content, None if not received yet
+    :rtype: bytes
+
+    """
+
+    return self._contents.get(asset_digest(ref) if is_asset(ref) else ref)
+
+  def data_uri(self, ref):
+    """Converts an asset reference to a data uri, for clients which could not fetch assets
+    by themselves. Each data uri is built once.
+
+    :param ref: Asset reference
+    :type ref: str
+    :returns: The data uri, None if the asset has not been received yet
+    :rtype: str
+
+    """
+
+    uri = self._uris.get(ref)
+
+    if uri is None:
+      content = self.get(ref)
+
+      if content is None:
+        return None
+
+      uri = self._uris[ref] = 'data:%s;base64,%s' % (content_type(ref), base64.b64encode(content).decode())
+
+    return uri
+
+  def resolve(self, value):
+    """Replaces asset references found in a decoded payload, such as card medias, by their
+    data uri. References of assets not received yet are left untouched.
+
+    :param value: Decoded payload
+    :rtype: dict or list or str
+
+    """
+
+    if isinstance(value, dict):
+      return { k: self.resolve(v) for k, v in value.items() }
+
+    if isinstance(value, list):
+      return [self.resolve(v) for v in value]
+
+    if is_asset(value):
+      return self.data_uri(value) or value
+
+    return value
@@ -0,0 +1,9 @@
+from .async_client import AsyncClient
+from .channel_client import ChannelClient
+
+class AsyncChannelClient(AsyncClient, ChannelClient):
+  """Channel client running on an asyncio event loop.
+
+  Handlers (on_ask, on_show, ...) may be coroutine functions.
+
+  """
@@ -0,0 +1,251 @@
+from .client import Client
+import asyncio, inspect
+
+MISC_INTERVAL = 1 # Seconds between two keepalive checks
+
+class AsyncClient(Client):
+  """Client which runs on an asyncio event loop instead of the paho network thread.
+
+  The socket is watched by the loop itself so reads, writes and handlers all happen on a
+  single thread. Handlers may be coroutine functions, each call is then scheduled as a task
+  so many of them could be in flight at the same time.
+
+  It is meant to be mixed with other clients, for example `class AsyncSkillClient(AsyncClient, SkillClient)`,
+  so the constructor just forwards its arguments.
+
+  """
+
+  def __init__(self, *args, **kwargs):
+    super(AsyncClient, self).__init__(*args, **kwargs)
+
+    self._loop = None
+    self._fd = None
+    self._writing = False
+    self._misc_task = None
+    self._closed = None
+    self._drain_waiters = []
+    self._chains = {}
+    self.tasks = set()
+
+  async def start(self, config):
+    """Connects to the broker and attaches the client to the running event loop.
+
+    :param config: Broker configuration
+    :type config: BrokerConfig
+
+    """
+
+    self._loop = asyncio.get_running_loop()
+    self._closed = self._loop.create_future()
+
+    if getattr(self._client, 'passes_objects', False):
+      return self._attach_in_process()
+
+    if config.is_secured():
+      self._client.username_pw_set(config.username, config.password)
+
+    try:
+      # paho connect is blocking, keep it out of the loop
+      await self._loop.run_in_executor(None, self._client.connect, config.host, config.port)
+    except ConnectionRefusedError as e:
+      self.log.critical('Could not connect to the MQTT: %s' % e.strerror)
+      self._closed.set_result(None)
+      return
+
+    self._fd = self._client.socket().fileno()
+    self._loop.add_reader(self._fd, self._on_readable)
+    self._misc_task = self._loop.create_task(self._misc())
+    self._sync_writer()
+
+  def _attach_in_process(self):
+    """Connects an in process transport, such as a loopback one. Its events are delivered on
+    its own thread, they are handed to the loop.
+    """
+
+    client = self._client
+    on_disconnect = client.on_disconnect
+
+    def disconnected(*args):
+      on_disconnect(*args)
+
+      if not self._closed.done():
+        self._closed.set_result(None)
+
+    client.on_connect = self._threadsafe(client.on_connect)
+    client.on_message = self._threadsafe(client.on_message)
+    client.on_disconnect = self._threadsafe(disconnected)
+    client.connect()
+    client.loop_start()
+
+  def _threadsafe(self, callback):
+    """Wraps a callback so it's called on the loop whatever the calling thread.
+
+    :param callback: Callback to wrap
+    :type callback: callable
+    :rtype: callable
+
+    """
+
+    loop = self._loop
+
+    return lambda *args: loop.call_soon_threadsafe(callback, *args)
+
+  def call_later(self, delay, fn, *args):
+    return self._loop.call_later(delay, fn, *args)
+
+  async def wait_closed(self):
+    """Waits for the connection to be closed.
+    """
+
+    if self._closed:
+      await self._closed
+
+  def stop(self, *args, **kwargs):
+    super(AsyncClient, self).stop(*args, **kwargs)
+
+    self._sync_writer()
+
+  async def drain(self):
+    """Waits until every pending message has been written to the socket.
+    """
+
+    if self._fd is None or not self._client.want_write():
+      return
+
+    waiter = self._loop.create_future()
+    self._drain_waiters.append(waiter)
+
+    await waiter
+
+  def _send(self, topic, payload, qos, retain):
+    super(AsyncClient, self)._send(topic, payload, qos, retain)
+
+    self._sync_writer()
+
+  def _subscribe(self, topic, ret, handler):
+    def spawn(*args):
+      result = handler(*args)
+
+      if inspect.isawaitable(result):
+        self.spawn(result)
+
+    super(AsyncClient, self)._subscribe(topic, ret, spawn)
+
+    self._sync_writer()
+
+  def spawn(self, awaitable, key=None):
+    """Schedules the given awaitable on the client loop.
+
+    Awaitables sharing the same key will be run one after the other in submission order.
+
+    :param awaitable: Coroutine to run
+    :type awaitable: awaitable
+    :param key: Optional ordering key
+    :type key: hashable
+    :rtype: asyncio.Task
+
+    """
+
+    previous = self._chains.get(key) if key is not None else None
+
+    async def run():
+      if previous:
+        await asyncio.wait([previous])
+
+      try:
+        await awaitable
+      except asyncio.CancelledError:
+        raise
+      except Exception:
+        self.log.exception('Task %s failed' % awaitable)
+
+    task = self._loop.create_task(run())
+    self.tasks.add(task)
+
+    if key is not None:
+      self._chains[key] = task
+
+    def done(t):
+      self.tasks.discard(t)
+
+      if key is not None and self._chains.get(key) is t:
+        del self._chains[key]
+
+    task.add_done_callback(done)
+
+    return task
+
+  def _on_readable(self):
+    """Called by the loop when the socket could be read.
+    """
+
+    self._client.loop_read()
+    self._sync_writer()
+
+  def _on_writable(self):
+    """Called by the loop when the socket could be written.
+    """
+
+    self._client.loop_write()
+    self._sync_writer()
+
+  def _sync_writer(self):
+    """Registers or unregisters the socket writer based on what paho has to send and
+    detects a closed connection.
+    """
+
+    if self._fd is None:
+      return
+
+    # paho closes the socket itself on errors or once the disconnect packet has been written
+    if self._client.socket() is None:
+      return self._connection_lost()
+
+    want = self._client.want_write()
+
+    if want and not self._writing:
+      self._loop.add_writer(self._fd, self._on_writable)
+      self._writing = True
+    elif not want:
+      if self._writing:
+        self._loop.remove_writer(self._fd)
+        self._writing = False
+
+      self._wake_drain_waiters()
+
+  def _wake_drain_waiters(self):
+    waiters, self._drain_waiters = self._drain_waiters, []
+
+    for waiter in waiters:
+      if not waiter.done():
+        waiter.set_result(None)
+
+  async def _misc(self):
+    """Periodically handles keepalive.
+    """
+
+    while self._fd is not None:
+      await asyncio.sleep(MISC_INTERVAL)
+
+      self._client.loop_misc()
+      self._sync_writer()
+
+  def _connection_lost(self):
+    """Detaches the client from the loop.
+    """
+
+    self._loop.remove_reader(self._fd)
+
+    if self._writing:
+      self._loop.remove_writer(self._fd)
+      self._writing = False
+
+    self._fd = None
+    self._wake_drain_waiters()
+
+    if self._misc_task and self._misc_task is not asyncio.current_task(self._loop):
+      self._misc_task.cancel()
+
+    if not self._closed.done():
+      self.on_disconnect(self._client, None, 0)
+      self._closed.set_result(None)
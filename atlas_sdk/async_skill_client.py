@@ -0,0 +1,122 @@
+from .async_client import AsyncClient
+from .skill_client import SkillClient
+from .request import Request, AsyncRequest
+from . import i18n
+import asyncio, inspect, time
+
+def is_coroutine_handler(handler):
+  """Checks if the given handler is a coroutine function, or an object whose __call__ is one.
+
+  :param handler: Intent handler
+  :type handler: callable
+  :rtype: bool
+
+  """
+
+  return inspect.iscoroutinefunction(handler) or inspect.iscoroutinefunction(getattr(handler, '__call__', None))
+
+class AsyncSkillClient(AsyncClient, SkillClient):
+  """Skill client running on an asyncio event loop.
+
+  Intent handlers may be coroutine functions receiving an AsyncRequest. Plain functions
+  receive a Request, whose methods are not coroutines, and run on the loop so they should
+  not block. Requests for different sessions run concurrently on the loop whereas requests
+  sharing a session are handled in order.
+
+  """
+
+  def _ensure_pool(self):
+    pass # Handlers run on the event loop and are cancelled once expired
+
+  def _on_intent(self, intent, payload):
+    request = (AsyncRequest if is_coroutine_handler(intent.handler) else Request)(self, None, payload)
+
+    if self.env_cache is not None:
+      self._load_env(request)
+
+    if intent.cache and self._replay_cached(intent, request):
+      return
+
+    if self.admission and not self._admit_request(intent, request):
+      return
+
+    timeout = self._timeout_for(intent)
+
+    if timeout:
+      request.deadline = time.monotonic() + timeout
+
+    self.spawn(self._handle_async(intent, request), request.sid)
+
+  async def _handle_async(self, intent, request):
+    """Calls the intent handler and awaits it if needed.
+
+    :param intent: Intent to handle
+    :type intent: Intent
+    :param request: Request to handle
+    :type request: Request or AsyncRequest
+
+    """
+
+    # Each task has its own context so the translator will not leak to other requests
+    i18n.activate(request.translator)
+
+    start = time.perf_counter() if self.metrics is not None else None
+    failed = True
+
+    try:
+      result = intent.handler(request)
+
+      if inspect.isawaitable(result):
+        if request.deadline is None:
+          await result
+        else:
+          # Cancels the handler once the deadline has passed
+          await asyncio.wait_for(result, request.remaining)
+
+      failed = False
+
+      if intent.cache:
+        self._cache_responses(intent, request)
+    except asyncio.TimeoutError:
+      # Raised by the handler itself
+      if request.deadline is None or request.remaining > 0:
+        raise
+
+      failed = False
+      request.expired = True
+      self._timed_out(intent, request)
+    finally:
+      if not failed:
+        request._save_session()
+
+      # An expired request has already been released
+      if self.admission and not request.expired:
+        self.admission.release()
+
+      if start is not None:
+        self._record_intent(intent, time.perf_counter() - start, failed)
+
+  async def serve(self, config):
+    """Connects to the broker and waits for the connection to be closed.
+
+    :param config: Broker configuration
+    :type config: BrokerConfig
+
+    """
+
+    await self.start(config)
+    await self.wait_closed()
+
+  def run(self):
+    """Parses current os args and run the event loop.
+    """
+
+    config = self._parse_broker_config()
+
+    try:
+      asyncio.run(self.serve(config))
+    except KeyboardInterrupt:
+      pass # Do nothing on keyboard interrupt
+    except Exception as e:
+      self.log.debug(e)
+      self.log.info('Stopping %s' % self.name)
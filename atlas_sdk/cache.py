@@ -0,0 +1,142 @@
+"""Caching of intent responses, so idempotent intents do not run their handler again for
+the same question.
+"""
+
+from collections import OrderedDict
+import threading, time
+
+def freeze(value):
+  """Converts decoded JSON into a hashable value, dict keys order does not matter.
+
+  :param value: Decoded JSON value
+  :rtype: hashable
+
+  """
+
+  if isinstance(value, dict):
+    return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+
+  if isinstance(value, list):
+    return tuple(freeze(v) for v in value)
+
+  return value
+
+class CachePolicy():
+  """Declares an intent as cacheable: requests with the same slot values, language and
+  env values receive the same responses.
+  """
+
+  def __init__(self, ttl, slots=None, env=[]):
+    """Constructs a new cache policy.
+
+    :param ttl: Seconds a response stays valid
+    :type ttl: float
+    :param slots: Names of slots the response depends on, defaults to the slots declared by the intent
+    :type slots: list
+    :param env: Names of env keys the response depends on
+    :type env: list
+
+    """
+
+    self.ttl = ttl
+    self.slots = slots
+    self.env = env
+
+  def key(self, intent, request):
+    """Builds the cache key of a request.
+
+    :param intent: Requested intent
+    :type intent: Intent
+    :param request: Received request
+    :type request: Request
+    :rtype: tuple
+
+    """
+
+    slots = self.slots if self.slots is not None else [s.name for s in intent.slots]
+    data = request.data
+
+    return (
+      intent.name,
+      request.lang,
+      tuple(freeze(data.get(name)) for name in slots),
+      tuple(freeze(request.env(name)) for name in self.env),
+    )
+
+class ResponseCache():
+  """Bounded LRU of recorded responses, each one expiring after its own TTL.
+  """
+
+  def __init__(self, max_entries=1000, clock=time.monotonic):
+    """Constructs a new response cache.
+
+    :param max_entries: Maximum number of responses kept in memory
+    :type max_entries: int
+    :param clock: Function returning the current time in seconds
+    :type clock: callable
+
+    """
+
+    self.max_entries = max_entries
+    self.hits = 0
+    self.misses = 0
+
+    self._clock = clock
+    self._lock = threading.Lock()
+    self._entries = OrderedDict()
+
+  def __len__(self):
+    return len(self._entries)
+
+  def get(self, key):
+    """Retrieve the responses recorded for the given key.
+
+    :param key: Cache key
+    :type key: tuple
+    :returns: Recorded responses, None if there is none or they have expired
+    :rtype: list
+
+    """
+
+    with self._lock:
+      entry = self._entries.get(key)
+
+      if entry and entry[0] <= self._clock():
+        del self._entries[key]
+        entry = None
+
+      if entry:
+        self._entries.move_to_end(key)
+        self.hits += 1
+
+        return entry[1]
+
+      self.misses += 1
+
+    return None
+
+  def set(self, key, responses, ttl):
+    """Records responses, evicting the least recently used ones if the cache is full.
+
+    :param key: Cache key
+    :type key: tuple
+    :param responses: Recorded responses
+    :type responses: list
+    :param ttl: Seconds the responses stay valid
+    :type ttl: float
+
+    """
+
+    with self._lock:
+      self._entries[key] = (self._clock() + ttl, responses)
+      self._entries.move_to_end(key)
+
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def clear(self):
+    """Forgets every recorded response.
+    """
+
+    with self._lock:
+      self._entries.clear()
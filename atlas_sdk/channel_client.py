@@ -1,10 +1,16 @@
 from .client import Client, \
   CHANNEL_CREATE_TOPIC, CHANNEL_DESTROY_TOPIC, CHANNEL_ASK_TOPIC, CHANNEL_SHOW_TOPIC, \
   CHANNEL_TERMINATE_TOPIC, DIALOG_PARSE_TOPIC, CHANNEL_WORK_TOPIC, DISCOVERY_PING_TOPIC, \
-  CHANNEL_CREATED_TOPIC, CHANNEL_DESTROYED_TOPIC
-import json
+  CHANNEL_CREATED_TOPIC, CHANNEL_DESTROYED_TOPIC, ASSET_TOPIC
+from .scheduler import Stagger
+from .compression import CAPABILITIES_KEY
+from .tracing import TRACE_KEY
+from .utils import parse_utc_timestamp
 from datetime import datetime
-from dateutil.parser import parse
+
+# Shared by every channel of the process so a server restart does not trigger all
+# creations at the same time
+RECREATE_STAGGER = Stagger(rate=500, jitter=1.0)
 
 class ChannelClient(Client):
   """A channel client should be used by end client only. It leverages messages used by a channel.
@@ -14,7 +20,7 @@ class ChannelClient(Client):
 
   """
     
-  def __init__(self, client_id, user_id, on_ask=None, on_show=None, on_terminate=None, on_work=None, on_created=None, on_destroyed=None):
+  def __init__(self, client_id, user_id, on_ask=None, on_show=None, on_terminate=None, on_work=None, on_created=None, on_destroyed=None, codec=None, recreate_stagger=None, metrics=None, transport=None, assets=None, compression=None, persistent=False, offline_buffer=0, tracer=None):
     """Constructs a new ChannelClient.
     
     :param client_id: Client ID to use, it's commonly a session id
@@ -33,10 +39,28 @@ class ChannelClient(Client):
     :type on_created: callable
     :param on_destroyed: Handler when the channel has been destroyed by atlas
     :type on_destroyed: callable
+    :param codec: Codec used for JSON payloads
+    :type codec: JsonCodec
+    :param recreate_stagger: Used to spread channel recreations when atlas has been restarted, defaults to one shared by the process
+    :type recreate_stagger: Stagger
+    :param metrics: Registry where messages and publications are recorded
+    :type metrics: Metrics
+    :param transport: Factory creating the transport, defaults to MqttTransport
+    :type transport: callable
+    :param assets: If set, assets published by skills are received and stored in this cache so references used in cards could be resolved
+    :type assets: AssetCache
+    :param compression: If set, large payloads are compressed once atlas advertised it could read them
+    :type compression: Compression
+    :param persistent: Wether or not the broker should keep subscriptions and queued messages while disconnected (clean session off)
+    :type persistent: bool
+    :param offline_buffer: Maximum number of messages published while disconnected kept to be sent once reconnected, 0 to drop them
+    :type offline_buffer: int
+    :param tracer: If set, parsed messages are sent as JSON with a trace context and traces echoed back are recorded when ask and show handlers fire, atlas must forward it
+    :type tracer: Tracer
 
     """
 
-    super(ChannelClient, self).__init__(client_id, 'channel.' + client_id)
+    super(ChannelClient, self).__init__(client_id, 'channel.' + client_id, codec, metrics=metrics, transport=transport, compression=compression, persistent=persistent, offline_buffer=offline_buffer)
 
     self.CHANNEL_CREATE_TOPIC = CHANNEL_CREATE_TOPIC % client_id
     self.CHANNEL_CREATED_TOPIC = CHANNEL_CREATED_TOPIC % client_id
@@ -56,21 +80,53 @@ class ChannelClient(Client):
     self.on_created = on_created or self.handler_not_set
 
     self.uid = user_id
+    self.recreate_stagger = recreate_stagger or RECREATE_STAGGER
+    self.assets = assets
+    self.tracer = tracer
     self._created_at = None
+    self._recreating = False
 
   def on_connect(self, client, userdata, flags, rc):
     super(ChannelClient, self).on_connect(client, userdata, flags, rc)
 
-    self.subscribe_json(self.CHANNEL_ASK_TOPIC, self.on_ask)
-    self.subscribe_json(self.CHANNEL_SHOW_TOPIC, self.on_show)
+    if self.tracer:
+      self.subscribe_json(self.CHANNEL_ASK_TOPIC, self._traced('channel.ask', self.on_ask))
+      self.subscribe_json(self.CHANNEL_SHOW_TOPIC, self._traced('channel.show', self.on_show))
+    else:
+      self.subscribe_json(self.CHANNEL_ASK_TOPIC, self.on_ask)
+      self.subscribe_json(self.CHANNEL_SHOW_TOPIC, self.on_show)
     self.subscribe_json(DISCOVERY_PING_TOPIC, self._check_still_connected)
     self.subscribe_void(self.CHANNEL_TERMINATE_TOPIC, self.on_terminate)
     self.subscribe_void(self.CHANNEL_WORK_TOPIC, self.on_work)
     self.subscribe_void(self.CHANNEL_DESTROYED_TOPIC, self.on_destroyed)
     self.subscribe_json(self.CHANNEL_CREATED_TOPIC, self.on_created)
 
+    if self.assets is not None:
+      self.subscribe_message(ASSET_TOPIC % '+', self.assets.on_message)
+
+    # The broker kept the session so atlas still knows this channel
+    if self._session_present and self._created_at:
+      return
+
     self.create()
 
+  def _traced(self, stage, handler):
+    """Wraps a JSON handler so traces echoed back are recorded before calling it.
+
+    :param stage: Name of the stage reached
+    :type stage: str
+    :param handler: Handler to call
+    :type handler: callable
+    :rtype: callable
+
+    """
+
+    def traced(data, raw):
+      self.tracer.record(data.get(TRACE_KEY), stage, self.client_id)
+      handler(data, raw)
+
+    return traced
+
   def _check_still_connected(self, data, raw):
     """Checks if the channel is still connected to the client and if its not, reconnects it.
 
@@ -81,14 +137,19 @@ class ChannelClient(Client):
 
     """
 
+    if self.compression:
+      self.negotiate(data.get(CAPABILITIES_KEY))
+
     start_date_str = data.get('started_at')
 
-    if start_date_str:
-      start_date = parse(start_date_str)
+    if start_date_str and self._created_at and not self._recreating:
+      if parse_utc_timestamp(start_date_str) > self._created_at:
+        delay = self.recreate_stagger.delay()
 
-      if start_date > self._created_at:
-        self.log.info('Recreating the channel, looks like the server has been restarted')
-        self.create()
+        self.log.info('Recreating the channel in %.2fs, looks like the server has been restarted' % delay)
+
+        self._recreating = True
+        self.call_later(delay, self.create)
 
   def stop(self, destroy=True):
     if destroy:
@@ -103,8 +164,14 @@ class ChannelClient(Client):
     """
 
     self._created_at = datetime.utcnow()
+    self._recreating = False
         
-    self.publish(self.CHANNEL_CREATE_TOPIC, json.dumps({ 'uid': self.uid }))
+    payload = { 'uid': self.uid }
+
+    if self.capabilities:
+      payload[CAPABILITIES_KEY] = self.capabilities
+
+    self.publish_json(self.CHANNEL_CREATE_TOPIC, payload)
 
   def destroy(self):
     """Inform the atlas engine that this channel is going down.
@@ -120,4 +187,9 @@ class ChannelClient(Client):
 
     """
 
-    self.publish(self.DIALOG_PARSE_TOPIC, msg)
\ No newline at end of file
+    trace = self.tracer.start() if self.tracer else None
+
+    if trace is None:
+      return self.publish(self.DIALOG_PARSE_TOPIC, msg)
+
+    self.publish_json(self.DIALOG_PARSE_TOPIC, { 'text': msg, TRACE_KEY: trace })
\ No newline at end of file
@@ -0,0 +1,324 @@
+from .client import Client, \
+  CHANNEL_CREATE_TOPIC, CHANNEL_DESTROY_TOPIC, CHANNEL_ASK_TOPIC, CHANNEL_SHOW_TOPIC, \
+  CHANNEL_TERMINATE_TOPIC, DIALOG_PARSE_TOPIC, CHANNEL_WORK_TOPIC, DISCOVERY_PING_TOPIC, \
+  CHANNEL_CREATED_TOPIC, CHANNEL_DESTROYED_TOPIC, ASSET_TOPIC
+from .channel_client import RECREATE_STAGGER
+from .utils import parse_utc_timestamp
+from .compression import CAPABILITIES_KEY
+from .tracing import TRACE_KEY
+from datetime import datetime
+import threading
+
+# Topics handled by channels with the handler name and wether the payload is JSON
+CHANNEL_ROUTES = {
+  CHANNEL_ASK_TOPIC: ('on_ask', True),
+  CHANNEL_SHOW_TOPIC: ('on_show', True),
+  CHANNEL_CREATED_TOPIC: ('on_created', True),
+  CHANNEL_TERMINATE_TOPIC: ('on_terminate', False),
+  CHANNEL_WORK_TOPIC: ('on_work', False),
+  CHANNEL_DESTROYED_TOPIC: ('on_destroyed', False),
+}
+
+# Same routes keyed by the last topic level
+CHANNEL_KINDS = { t.split('/')[-1]: r for t, r in CHANNEL_ROUTES.items() }
+
+# Kinds of messages answering a user input, whose trace is recorded
+TRACED_KINDS = frozenset(['ask', 'show'])
+
+class Channel():
+  """Lightweight channel living inside a ChannelHub.
+
+  It exposes the same handlers and methods as a ChannelClient but does not own any
+  broker connection.
+
+  """
+
+  __slots__ = ('hub', 'client_id', 'uid', 'on_ask', 'on_show', 'on_terminate', 'on_work',
+    'on_created', 'on_destroyed', '_created_at', '_recreating')
+
+  def __init__(self, hub, client_id, user_id, on_ask=None, on_show=None, on_terminate=None, on_work=None, on_created=None, on_destroyed=None):
+    """Constructs a new Channel, you should use ChannelHub.channel instead.
+
+    :param hub: Hub owning this channel
+    :type hub: ChannelHub
+    :param client_id: Client ID to use, it's commonly a session id
+    :type client_id: str
+    :param user_id: User ID attached to this channel
+    :type user_id: str
+
+    See ChannelClient for the handlers documentation.
+
+    """
+
+    self.hub = hub
+    self.client_id = client_id
+    self.uid = user_id
+    self.on_ask = on_ask
+    self.on_show = on_show
+    self.on_terminate = on_terminate
+    self.on_work = on_work
+    self.on_created = on_created
+    self.on_destroyed = on_destroyed
+    self._created_at = None
+    self._recreating = False
+
+  def create(self):
+    """Inform the atlas engine of the channel creation.
+    """
+
+    self._created_at = datetime.utcnow()
+    self._recreating = False
+    self.hub._schedule(self.client_id, True)
+
+  def destroy(self):
+    """Inform the atlas engine that this channel is going down.
+    """
+
+    self.hub._schedule(self.client_id, False)
+
+  def parse(self, msg):
+    """Ask the dialog engine to parse the given message.
+
+    :param msg: Message to parse
+    :type msg: str
+
+    """
+
+    tracer = self.hub.tracer
+    trace = tracer.start() if tracer else None
+
+    if trace is None:
+      return self.hub.publish(DIALOG_PARSE_TOPIC % self.client_id, msg)
+
+    self.hub.publish_json(DIALOG_PARSE_TOPIC % self.client_id, { 'text': msg, TRACE_KEY: trace })
+
+class ChannelHub(Client):
+  """Multiplexes many channels over a single broker connection.
+
+  Instead of subscribing to each channel topics, the hub subscribes once per topic kind with
+  a wildcard (ie. `atlas/+/channel/show`) and routes messages to channels by their client id.
+  Creations and destructions are batched and sent at most every `batch_interval` seconds.
+
+  """
+
+  def __init__(self, client_id=None, batch_interval=0.05, codec=None, recreate_stagger=None, metrics=None, transport=None, assets=None, compression=None, persistent=False, offline_buffer=0, tracer=None):
+    """Constructs a new ChannelHub.
+
+    :param client_id: Client ID to use when connecting
+    :type client_id: str
+    :param batch_interval: Seconds to wait before sending pending creations and destructions, 0 to send them right away
+    :type batch_interval: float
+    :param codec: Codec used for JSON payloads
+    :type codec: JsonCodec
+    :param recreate_stagger: Used to spread channel recreations when atlas has been restarted, defaults to one shared by the process
+    :type recreate_stagger: Stagger
+    :param metrics: Registry where messages and publications are recorded
+    :type metrics: Metrics
+    :param transport: Factory creating the transport, defaults to MqttTransport
+    :type transport: callable
+    :param assets: If set, assets published by skills are received and stored in this cache so references used in cards could be resolved
+    :type assets: AssetCache
+    :param compression: If set, large payloads are compressed once atlas advertised it could read them
+    :type compression: Compression
+    :param persistent: Wether or not the broker should keep subscriptions and queued messages while disconnected (clean session off)
+    :type persistent: bool
+    :param offline_buffer: Maximum number of messages published while disconnected kept to be sent once reconnected, 0 to drop them
+    :type offline_buffer: int
+    :param tracer: If set, parsed messages are sent as JSON with a trace context and traces echoed back are recorded when ask and show handlers fire, atlas must forward it
+    :type tracer: Tracer
+
+    """
+
+    super(ChannelHub, self).__init__(client_id, 'hub.%s' % (client_id or 'channels'), codec, metrics=metrics, transport=transport, compression=compression, persistent=persistent, offline_buffer=offline_buffer)
+
+    self.batch_interval = batch_interval
+    self.recreate_stagger = recreate_stagger or RECREATE_STAGGER
+    self.assets = assets
+    self.tracer = tracer
+
+    self._channels = {}
+    self._lock = threading.Lock()
+    self._scheduled = {}
+    self._timer = None
+
+  def __len__(self):
+    return len(self._channels)
+
+  def get(self, client_id):
+    """Retrieve a channel by its client id.
+
+    :param client_id: Client ID of the channel
+    :type client_id: str
+    :rtype: Channel
+
+    """
+
+    return self._channels.get(client_id)
+
+  def channel(self, client_id, user_id, **handlers):
+    """Adds a channel to this hub and creates it if the hub is connected.
+
+    :param client_id: Client ID to use, it's commonly a session id
+    :type client_id: str
+    :param user_id: User ID attached to this channel
+    :type user_id: str
+    :param handlers: Handlers (on_ask, on_show, ...) as accepted by a ChannelClient
+    :type handlers: dict
+    :rtype: Channel
+
+    """
+
+    channel = Channel(self, client_id, user_id, **handlers)
+
+    self._channels[client_id] = channel
+
+    if self.connected:
+      channel.create()
+
+    return channel
+
+  def remove(self, client_id, destroy=True):
+    """Removes a channel from this hub.
+
+    :param client_id: Client ID of the channel
+    :type client_id: str
+    :param destroy: Wether or not atlas should be informed of the channel destruction
+    :type destroy: bool
+
+    """
+
+    channel = self._channels.pop(client_id, None)
+
+    if channel and destroy:
+      channel.destroy()
+
+  def on_connect(self, client, userdata, flags, rc):
+    super(ChannelHub, self).on_connect(client, userdata, flags, rc)
+
+    for topic in CHANNEL_ROUTES:
+      self.subscribe_message(topic % '+', self._on_channel_message)
+
+    self.subscribe_json(DISCOVERY_PING_TOPIC, self._check_still_connected)
+
+    if self.assets is not None:
+      self.subscribe_message(ASSET_TOPIC % '+', self.assets.on_message)
+
+    for channel in list(self._channels.values()):
+      # The broker kept the session so atlas still knows this channel
+      if not (self._session_present and channel._created_at):
+        channel.create()
+
+  def _on_channel_message(self, msg):
+    """Routes a channel message to the channel it belongs to.
+
+    :param msg: Received message
+    :type msg: MQTTMessage
+
+    """
+
+    _, client_id, _, kind = msg.topic.split('/')
+    channel = self._channels.get(client_id)
+
+    if not channel:
+      return self.log.debug('No channel found for %s' % msg.topic)
+
+    attr, with_data = CHANNEL_KINDS[kind]
+    handler = getattr(channel, attr) or self.handler_not_set
+
+    if with_data:
+      try:
+        data = self.loads(msg.payload)
+      except ValueError:
+        data = {}
+        self.log.warning('Could not decode payload %s' % msg.payload)
+
+      if self.tracer and kind in TRACED_KINDS:
+        self.tracer.record(data.get(TRACE_KEY), 'channel.' + kind, client_id)
+
+      handler(data, msg.payload)
+    else:
+      handler()
+
+  def _check_still_connected(self, data, raw):
+    """Recreates every channel created before the atlas server start.
+
+    :param data: JSON data received
+    :type data: dict
+    :param raw: Raw payload
+    :type raw: str
+
+    """
+
+    if self.compression:
+      self.negotiate(data.get(CAPABILITIES_KEY))
+
+    start_date_str = data.get('started_at')
+
+    if start_date_str:
+      start_date = parse_utc_timestamp(start_date_str)
+
+      outdated = [c for c in list(self._channels.values()) if c._created_at and not c._recreating and start_date > c._created_at]
+
+      if outdated:
+        self.log.info('Recreating %d channels, looks like the server has been restarted' % len(outdated))
+
+        for channel in outdated:
+          channel._recreating = True
+          self.call_later(self.recreate_stagger.delay(), channel.create)
+
+  def _schedule(self, client_id, create):
+    """Schedules a channel creation or destruction. The last call for a client id wins.
+
+    :param client_id: Client ID of the channel
+    :type client_id: str
+    :param create: True for a creation, False for a destruction
+    :type create: bool
+
+    """
+
+    with self._lock:
+      self._scheduled[client_id] = create
+
+      if self.batch_interval > 0:
+        if not self._timer:
+          self._timer = self.call_later(self.batch_interval, self.flush)
+
+        return
+
+    self.flush()
+
+  def flush(self):
+    """Sends pending creations and destructions right away.
+    """
+
+    with self._lock:
+      pending, self._scheduled = self._scheduled, {}
+
+      if self._timer:
+        self._timer.cancel()
+        self._timer = None
+
+    capabilities = self.capabilities
+
+    for client_id, create in pending.items():
+      if create:
+        channel = self._channels.get(client_id)
+
+        if channel:
+          payload = { 'uid': channel.uid }
+
+          if capabilities:
+            payload[CAPABILITIES_KEY] = capabilities
+
+          self.publish_json(CHANNEL_CREATE_TOPIC % client_id, payload)
+      else:
+        self.publish(CHANNEL_DESTROY_TOPIC % client_id)
+
+  def stop(self, destroy=True):
+    if destroy:
+      for channel in list(self._channels.values()):
+        channel.destroy()
+
+    self.flush()
+
+    super(ChannelHub, self).stop()
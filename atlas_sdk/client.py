@@ -3,14 +3,23 @@ is also used by atlas core itself.
 """
 
 from .broker import BrokerConfig
-import paho.mqtt.client as mqtt
-import logging, json
+from .router import TopicRouter, Route, split_shared
+from .codec import default_codec
+from .scheduler import default_scheduler
+from .metrics import SIZE_BUCKETS, normalize_topic
+from .compression import ZLIB, is_compressed, decompress
+from collections import deque
+from . import transport as transports
+import logging, threading, time
 
 # Discovery related topics
 
 DISCOVERY_PING_TOPIC = 'atlas/discovery/ping'
 DISCOVERY_PONG_TOPIC = 'atlas/discovery/pong'
 
+# Retained manifest of a skill, opt-in, so atlas could read it without a ping
+DISCOVERY_MANIFEST_TOPIC = 'atlas/discovery/manifest/%s'
+
 # Dialog related topics, communication with an agent
 
 DIALOG_TERMINATE_TOPIC = 'atlas/%s/dialog/terminate'
@@ -22,6 +31,14 @@ DIALOG_SHOW_TOPIC = 'atlas/%s/dialog/show'
 
 INTENT_TOPIC = 'atlas/intents/%s'
 
+# Retained content of an asset referenced by cards, by content hash
+
+ASSET_TOPIC = 'atlas/assets/%s'
+
+# Assets are binary and could start with anything, they are never compressed so a payload
+# looking like a compressed one is received as is
+ASSET_TOPIC_PREFIX = ASSET_TOPIC % ''
+
 # Channel related topics
 
 CHANNEL_ASK_TOPIC = 'atlas/%s/channel/ask'
@@ -33,17 +50,73 @@ CHANNEL_CREATED_TOPIC = 'atlas/%s/channel/created'
 CHANNEL_DESTROY_TOPIC = 'atlas/%s/channel/destroy'
 CHANNEL_DESTROYED_TOPIC = 'atlas/%s/channel/destroyed'
 
+# What to do when the outbound queue is full
+
+PUBLISH_BLOCK = 'block'
+PUBLISH_DROP = 'drop'
+PUBLISH_RAISE = 'raise'
+
+class PublishQueueFull(Exception):
+  """Raised when publishing while the outbound queue is full and the client has been
+  configured to raise.
+  """
+
+  pass
+
+def _identity(data):
+  return data
+
+def _passthrough(loads):
+  """Wraps a loads function so already decoded payloads are returned as is.
+  """
+
+  def decode(payload):
+    return payload if isinstance(payload, (dict, list)) else loads(payload)
+
+  return decode
+
+def _as_text(payload, codec):
+  """Converts a payload received from a transport passing objects to text.
+  """
+
+  if isinstance(payload, (dict, list)):
+    payload = codec.dumps(payload)
+
+  return payload.decode('utf-8') if isinstance(payload, bytes) else payload
+
 class Client:
   """Client is an helper class to handle messages management.
   """
 
-  def __init__(self, client_id=None, name=None):
+  def __init__(self, client_id=None, name=None, codec=None, qos=None, max_pending=0, on_full=PUBLISH_BLOCK, metrics=None, transport=None, compression=None, persistent=False, reconnect_delay=(1, 120), offline_buffer=0, subscribe_qos=None):
     """Constructs a new Client.
 
     :param client_id: Client ID to use when connecting
     :type client_id: str
     :param name: Name used by the logger
     :type name: str
+    :param codec: Codec used for JSON payloads, defaults to the fastest one installed
+    :type codec: JsonCodec
+    :param qos: QoS level to use when publishing keyed by topic filters (wildcards allowed), 0 when no filter matches
+    :type qos: dict
+    :param max_pending: Maximum number of published messages not yet written or acknowledged, 0 for no limit
+    :type max_pending: int
+    :param on_full: What to do when publishing and max_pending is reached (block, drop or raise)
+    :type on_full: str
+    :param metrics: Registry where messages and publications are recorded, nothing is recorded if not set
+    :type metrics: Metrics
+    :param transport: Factory called with the client id to create the transport, defaults to MqttTransport
+    :type transport: callable
+    :param compression: If set, large payloads are compressed once the peer advertised it could read them, compressed payloads are always read
+    :type compression: Compression
+    :param persistent: Wether or not the broker should keep subscriptions and queued messages while disconnected (clean session off), needs a client_id
+    :type persistent: bool
+    :param reconnect_delay: Minimum and maximum seconds to wait before reconnecting, doubled after each failed attempt
+    :type reconnect_delay: tuple
+    :param offline_buffer: Maximum number of messages published while disconnected kept to be sent once reconnected, the oldest ones are dropped first, 0 to drop them all
+    :type offline_buffer: int
+    :param subscribe_qos: QoS level of subscriptions, defaults to 1 for persistent sessions since brokers only queue messages of QoS > 0 subscriptions while disconnected, 0 otherwise
+    :type subscribe_qos: int
 
     """
 
@@ -51,20 +124,122 @@ class Client:
       name or client_id or __class__.__name__))
 
     self.client_id = client_id
+    self.connected = False
+    self.codec = codec or default_codec()
+    self.max_pending = max_pending
+    self.on_full = on_full
+    self.dropped = 0
+    self.metrics = metrics
+    self.compression = compression
+    self.persistent = persistent
+    self.subscribe_qos = subscribe_qos if subscribe_qos is not None else (1 if persistent else 0)
+    self.reconnect_delay = reconnect_delay
+    self.offline_dropped = 0
+
+    if persistent and not client_id:
+      raise ValueError('A persistent session needs a client_id')
+
+    # Set once the peer could read compressed payloads
+    self._compressor = None
+
+    self._transport = transport or transports.MqttTransport
+    self._client = self._create_transport()
+
+    # Messages published while disconnected, as (topic, payload, qos, retain)
+    self._offline = deque(maxlen=offline_buffer) if offline_buffer else None
+
+    # Subscribed topics, in order, and the ones the broker knew during the last connection
+    self._topics = {}
+    self._subscribed = set()
+    self._batching = False
+    self._session_present = False
+
+    # Decodes JSON payloads, measured when metrics are enabled
+    self.loads = self._measured_loads() if metrics is not None else self.codec.loads
+    self.dumps = self.codec.dumps
+
+    # Some transports carry python objects, no need to encode and decode them
+    if getattr(self._client, 'passes_objects', False):
+      self.loads = _passthrough(self.loads)
+      self.dumps = _identity
 
-    self._client = mqtt.Client(client_id)
-    self._client.on_message = self.on_message
-    self._client.on_connect = self.on_connect
+    # Represents subscribed handlers, each route knows how to decode its payload
+    self._router = TopicRouter()
 
-    # Represents subscribed handlers for each type of subscriptions
-    self._handlers = {
-      'void': {},
-      'raw': {},
-      'json': {},
-    }
+    # QoS policies, the level is stored as the route handler
+    self._qos = TopicRouter()
+
+    for topic, level in (qos or {}).items():
+      self._qos.add(Route(topic, 'qos', level, None))
+
+    self._pending = 0
+    self._waiting = 0
+    self._pending_cond = threading.Condition()
+    self._network_thread = None
+
+    if metrics is not None:
+      metrics.gauge('publish_in_flight', lambda: self._pending, (('client', self.log.name),))
+      metrics.gauge('publish_queued', lambda: self._waiting, (('client', self.log.name),))
+
+  def _create_transport(self):
+    """Creates the transport and binds its callbacks.
+
+    :returns: The transport
+
+    """
+
+    # Only given when needed so custom factories keep working with a single argument
+    client = self._transport(self.client_id, clean_session=False) if self.persistent else self._transport(self.client_id)
+    client.reconnect_delay_set(*self.reconnect_delay)
+    client.on_message = self.on_message
+    client.on_connect = self._on_connect
+    client.on_disconnect = self.on_disconnect
+    client.on_publish = self._on_publish
+
+    return client
+
+  def _after_fork(self):
+    """Called in a forked process before starting, threads and connections of the parent
+    could not be used anymore.
+    """
+
+    self._client = self._create_transport()
+
+  @property
+  def in_flight(self):
+    """Number of published messages not yet written to the socket (or acknowledged for QoS > 0).
+
+    :rtype: int
+
+    """
+
+    return self._pending
+
+  @property
+  def queued(self):
+    """Number of messages waiting for room in the outbound queue.
+
+    :rtype: int
+
+    """
+
+    return self._waiting
 
   def handler_not_set(self, data=None, raw=None):
-    self.log.warn('Handler not set correctly')
+    self.log.warning('Handler not set correctly')
+
+  def call_later(self, delay, fn, *args):
+    """Calls the given function after a delay.
+
+    :param delay: Delay in seconds
+    :type delay: float
+    :param fn: Function to call
+    :type fn: callable
+    :returns: An object with a cancel method
+
+    """
+
+    return default_scheduler().call_later(delay, fn, *args)
 
   def start(self, config, threaded=True):
     """Starts the broker client.
@@ -76,11 +251,13 @@ class Client:
 
     """
 
-    self._client.connect(config.host, config.port)
-
+    # Credentials are sent with the CONNECT packet so they must be set first
     if config.is_secured():
       self._client.username_pw_set(config.username, config.password)
 
+    # Later disconnections are recovered by the network loop, with backoff
+    self._client.connect(config.host, config.port)
+
     try:
       if threaded:
         self._client.loop_start()
@@ -99,7 +276,7 @@ class Client:
     self._client.disconnect()
     self._client.loop_stop()
 
-  def publish(self, topic, payload=None):
+  def publish(self, topic, payload=None, qos=None, retain=False):
     """Publish a message to the given topic.
 
     You must transform the payload before calling this method.
@@ -108,21 +285,300 @@ class Client:
     :type topic: str
     :param payload: Payload to publish
     :type payload: str
+    :param qos: QoS level, if not set, the client policy will be used
+    :type qos: int
+    :param retain: Wether or not the broker should retain the message
+    :type retain: bool
+    :rtype: bool
+
+    """
+
+    if self._offline is not None and not self.connected:
+      return self._buffer([(topic, payload, qos, retain)])
+
+    if not self._admit(1):
+      return False
+
+    self._send(topic, payload, qos, retain)
+
+    return True
+
+  def publish_many(self, messages):
+    """Publish many messages at once.
+
+    Messages are admitted together in the outbound queue and handed to the network
+    one after the other so they will be written in the same round.
+
+    :param messages: List of (topic, payload) tuples
+    :type messages: list
+    :rtype: bool
+
+    """
+
+    if self._offline is not None and not self.connected:
+      return self._buffer([(topic, payload, None, False) for topic, payload in messages])
+
+    if not self._admit(len(messages)):
+      return False
+
+    for topic, payload in messages:
+      self._send(topic, payload, None, False)
+
+    return True
+
+  def _buffer(self, messages):
+    """Keeps messages published while disconnected.
+
+    :param messages: List of (topic, payload, qos, retain) tuples
+    :type messages: list
+    :rtype: bool
+
+    """
+
+    with self._pending_cond:
+      overflow = max(0, len(self._offline) + len(messages) - self._offline.maxlen)
+      self._offline.extend(messages)
+      self.offline_dropped += overflow
+
+    if overflow:
+      self.log.warning('Offline buffer full, dropped %d message(s)' % overflow)
+
+      if self.metrics is not None:
+        self.metrics.inc('publish_dropped_total', value=overflow)
+
+    return True
+
+  def _flush_offline(self):
+    """Sends messages published while disconnected.
+    """
+
+    with self._pending_cond:
+      messages = list(self._offline)
+      self._offline.clear()
+
+    if messages:
+      self.log.info('Sending %d message(s) published while disconnected' % len(messages))
+
+    for topic, payload, qos, retain in messages:
+      # Not admitted since it's the network thread, it could not wait for room
+      with self._pending_cond:
+        self._pending += 1
+
+      self._send(topic, payload, qos, retain)
+
+  def _qos_for(self, topic):
+    """Retrieve the QoS level to use for the given topic.
+
+    :param topic: Topic
+    :type topic: str
+    :rtype: int
 
     """
 
-    self._client.publish(topic, payload)
+    if not len(self._qos):
+      return 0
+
+    return max([r.handler for r in self._qos.match(topic)] or [0])
+
+  def _admit(self, count):
+    """Reserves room in the outbound queue for the given number of messages.
+
+    :param count: Number of messages
+    :type count: int
+    :rtype: bool
+
+    """
+
+    with self._pending_cond:
+      if self.max_pending and self._pending + count > self.max_pending:
+        if self.on_full == PUBLISH_DROP:
+          self.dropped += count
+          self.log.warning('Outbound queue full, dropped %d message(s)' % count)
+
+          if self.metrics is not None:
+            self.metrics.inc('publish_dropped_total', value=count)
+
+          return False
+
+        if self.on_full == PUBLISH_RAISE:
+          raise PublishQueueFull('%d messages already pending' % self._pending)
+
+        # The network thread is the one emptying the queue so it could not wait
+        if threading.current_thread() is not self._network_thread:
+          self._waiting += count
+
+          self._pending_cond.wait_for(lambda: self._pending + count <= self.max_pending or not self._pending)
+
+          self._waiting -= count
+
+      self._pending += count
+
+    return True
+
+  def _send(self, topic, payload, qos, retain):
+    # Subscriptions made while connecting must reach the broker before any response
+    if self._batching:
+      self._flush_subscriptions()
+
+    if qos is None:
+      qos = self._qos_for(topic)
+
+    if self._compressor is not None and not topic.startswith(ASSET_TOPIC_PREFIX):
+      payload = self._compressor.compress(payload)
+
+    if self.metrics is not None:
+      labels = (('topic', normalize_topic(topic)),)
+      self.metrics.inc('published_total', labels)
+      self.metrics.observe('publish_bytes', labels, len(payload) if isinstance(payload, (bytes, str)) else 0, SIZE_BUCKETS)
+
+    info = self._client.publish(topic, payload, qos, retain)
+
+    # QoS 0 messages are discarded when not connected and others are only sent again on the
+    # next connection, which does not count what was pending before
+    if info.rc == transports.MQTT_ERR_NO_CONN:
+      self._release(1)
+
+  def _on_publish(self, client, userdata, mid):
+    self._release(1)
+
+  def _release(self, count):
+    """Frees room in the outbound queue.
+
+    :param count: Number of messages
+    :type count: int
+
+    """
+
+    with self._pending_cond:
+      self._pending = max(0, self._pending - count)
+      self._pending_cond.notify_all()
+
+  def publish_json(self, topic, data, qos=None, retain=False):
+    """Encodes the given data with the client codec and publish it.
+
+    :param topic: Where to publish the message
+    :type topic: str
+    :param data: Data to encode
+    :type data: dict
+    :param qos: QoS level, if not set, the client policy will be used
+    :type qos: int
+    :param retain: Wether or not the broker should retain the message
+    :type retain: bool
+    :rtype: bool
+
+    """
+
+    return self.publish(topic, self.dumps(data), qos, retain)
 
   def _subscribe(self, topic, ret, handler):
     """Inner subscribe which append the handler and subscribe to the topic.
     """
 
-    # TODO May be we should use client.message_callback_add
+    # Messages of a shared subscription are received on the topic without the $share prefix
+    _, route_topic = split_shared(topic)
+
+    self._router.add(Route(route_topic, ret, handler, self._compile(ret, handler)))
+    self._topics[topic] = True
 
-    self._handlers[ret][topic] = handler
-    self._client.subscribe(topic)
+    # Sent with every other subscription once connected
+    if self._batching:
+      return
+
+    self._client.subscribe(topic, self.subscribe_qos)
     self.log.debug('Subscribed to topic %s' % topic)
 
+  def _flush_subscriptions(self):
+    """Sends subscriptions made while connecting in a single SUBSCRIBE packet, along with
+    older ones so they are restored after a reconnection. Topics the broker kept in a
+    persistent session are skipped.
+    """
+
+    self._batching = False
+
+    topics = [t for t in self._topics if not (self._session_present and t in self._subscribed)]
+    self._subscribed = set(self._topics)
+
+    if topics:
+      self._client.subscribe([(t, self.subscribe_qos) for t in topics])
+      self.log.debug('Subscribed to %d topic(s)' % len(topics))
+
+  def _compile(self, ret, handler):
+    """Builds the callable which decodes a message payload and calls the handler.
+
+    :param ret: Subscription type
+    :type ret: str
+    :param handler: Handler to call
+    :type handler: callable
+    :rtype: callable
+
+    """
+
+    if ret == 'raw':
+      if self.dumps is _identity:
+        return lambda msg: handler(_as_text(msg.payload, self.codec))
+
+      return lambda msg: handler(msg.payload.decode('utf-8'))
+
+    if ret == 'void':
+      return lambda msg: handler()
+
+    if ret == 'json':
+      loads = self.loads
+
+      def invoke(msg):
+        try:
+          data = loads(msg.payload)
+        except ValueError:
+          data = {}
+          self.log.warning('Could not decode payload %s' % msg.payload)
+
+        handler(data, msg.payload)
+
+      return invoke
+
+    if ret == 'message':
+      return handler
+
+    raise ValueError('Unknown subscription type %s' % ret)
+
+  def _measured_loads(self):
+    """Builds a loads function which records decoding time and errors.
+
+    :rtype: callable
+
+    """
+
+    loads, metrics = self.codec.loads, self.metrics
+    labels = (('codec', self.codec.name),)
+
+    def measured(payload):
+      start = time.perf_counter()
+
+      try:
+        return loads(payload)
+      except ValueError:
+        metrics.inc('decode_errors_total', labels)
+        raise
+      finally:
+        metrics.observe('decode_seconds', labels, time.perf_counter() - start)
+
+    return measured
+
+  def unsubscribe(self, topic):
+    """Unsubscribe from a topic.
+
+    :param topic: Topic given when subscribing
+    :type topic: str
+
+    """
+
+    self._topics.pop(topic, None)
+    self._subscribed.discard(topic)
+
+    if self._router.remove(split_shared(topic)[1]):
+      self._client.unsubscribe(topic)
+      self.log.debug('Unsubscribed from topic %s' % topic)
+
   def subscribe_json(self, topic, handler):
     """Subscribe to a topic with the given handler.
 
@@ -167,34 +623,120 @@ class Client:
 
     self._subscribe(topic, 'raw', handler)
 
+  def subscribe_message(self, topic, handler):
+    """Subscribe to a topic with the given handler.
+
+    Using this subscription type, the handler will receive the message itself with its `topic`
+    and `payload` attributes, handy with wildcard subscriptions.
+
+    :param topic: Topic to subscribe to, may contains wildcards or be a shared subscription
+    :type topic: str
+    :param handler: Handler to call
+    :type handler: callable
+
+    """
+
+    self._subscribe(topic, 'message', handler)
+
+  def _on_connect(self, client, userdata, flags, rc):
+    """Called by the transport once connected, subscriptions made by on_connect are batched.
+    """
+
+    self._session_present = self.persistent and bool((flags or {}).get('session present'))
+    self._batching = True
+
+    # Messages pending before the connection, written or not, would not be acknowledged
+    # on this one so they should not hold room in the outbound queue anymore
+    self._release(self._pending)
+
+    try:
+      self.on_connect(client, userdata, flags, rc)
+    finally:
+      if self._batching:
+        self._flush_subscriptions()
+
+    if self._offline is not None:
+      self._flush_offline()
+
   def on_connect(self, client, userdata, flags, rc):
     self.log.info('✔️ Connected to broker')
 
+    self.connected = True
+    self._network_thread = threading.current_thread()
+
   def on_disconnect(self, client, userdata, rc):
     self.log.info('❌ Disconnected')
 
+    self.connected = False
+
+    # Messages being written have been lost with the connection
+    self._release(self._pending)
+
+  @property
+  def capabilities(self):
+    """Features this client could use, advertised to its peers.
+
+    :rtype: list
+
+    """
+
+    return [self.compression.name] if self.compression else []
+
+  def negotiate(self, capabilities):
+    """Enables features supported by both this client and its peer.
+
+    :param capabilities: Capabilities advertised by the peer
+    :type capabilities: list
+
+    """
+
+    # Transports passing objects have nothing to compress
+    enabled = bool(self.compression) and ZLIB in (capabilities or ()) and self.dumps is not _identity
+
+    if enabled != (self._compressor is not None):
+      self.log.info('Compression %s' % ('enabled' if enabled else 'disabled'))
+      self._compressor = self.compression if enabled else None
+
   def on_message(self, client, userdata, msg):
-    self.log.debug('Received message %s - %s' % (msg.topic, msg.payload))
+    self.log.debug('Received message %s - %s', msg.topic, msg.payload)
 
-    handler = self._handlers['raw'].get(msg.topic)
+    if is_compressed(msg.payload) and not msg.topic.startswith(ASSET_TOPIC_PREFIX):
+      try:
+        msg.payload = decompress(msg.payload)
+      except ValueError:
+        return self.log.warning('Could not decompress payload on %s' % msg.topic)
 
-    if handler:
-      handler(msg.payload.decode('utf-8'))
-    else:
-      handler = self._handlers['void'].get(msg.topic)
+    routes = self._router.match(msg.topic)
 
-      if handler:
-        handler()
-      else:
-        handler = self._handlers['json'].get(msg.topic)
-
-        if handler:
-          try:
-            data = json.loads(msg.payload)
-          except json.decoder.JSONDecodeError:
-            data = {}
-            self.log.warn('Could not decode payload %s' % msg.payload)
-
-          handler(data, msg.payload)
-        else:
-            self.log.warn('No handler found for %s' % msg.topic)
+    if self.metrics is not None:
+      return self._dispatch_measured(routes, msg)
+
+    if not routes:
+      return self.log.warning('No handler found for %s' % msg.topic)
+
+    for route in routes:
+      route.invoke(msg)
+
+  def _dispatch_measured(self, routes, msg):
+    """Same as the end of on_message but records counts, errors and durations, labelled
+    by the subscribed topic filter.
+    """
+
+    metrics = self.metrics
+
+    if not routes:
+      metrics.inc('messages_unhandled_total')
+      return self.log.warning('No handler found for %s' % msg.topic)
+
+    for route in routes:
+      labels = (('topic', route.topic),)
+      metrics.inc('messages_received_total', labels)
+      start = time.perf_counter()
+
+      try:
+        route.invoke(msg)
+      except Exception:
+        metrics.inc('handler_errors_total', labels)
+        raise
+      finally:
+        metrics.observe('dispatch_seconds', labels, time.perf_counter() - start)
@@ -0,0 +1,88 @@
+"""Codecs used to encode and decode JSON payloads.
+
+The fastest installed library is used by default: orjson, then ujson and finally the
+python builtin json module.
+
+Libraries are imported when their codec is created.
+"""
+
+from collections.abc import Mapping
+
+def encode_default(obj):
+  """Encodes objects the JSON libraries do not know about. Mappings which are not dicts,
+  such as slot values, are encoded as dicts.
+
+  :param obj: Object to encode
+  :rtype: dict
+
+  """
+
+  if isinstance(obj, Mapping):
+    return dict(obj)
+
+  raise TypeError('Object of type %s is not JSON serializable' % type(obj).__name__)
+
+class JsonCodec():
+  """Codec based on the python builtin json module.
+
+  Every codec exposes `loads` and `dumps`. `loads` accepts bytes or str and raises a
+  ValueError when the payload is not valid, `dumps` returns bytes or str and encodes
+  mappings, such as slot values, as dicts.
+
+  """
+
+  name = 'json'
+
+  def __init__(self):
+    import json
+    from functools import partial
+
+    self.loads = json.loads
+    self.dumps = partial(json.dumps, default=encode_default)
+
+class OrjsonCodec(JsonCodec):
+  """Codec based on orjson.
+  """
+
+  name = 'orjson'
+
+  def __init__(self):
+    import orjson
+
+    self.loads = orjson.loads
+    self.dumps = lambda obj: orjson.dumps(obj, default=encode_default)
+
+class UjsonCodec(JsonCodec):
+  """Codec based on ujson.
+  """
+
+  name = 'ujson'
+
+  def __init__(self):
+    import ujson
+
+    self.loads = ujson.loads
+    self.dumps = lambda obj: ujson.dumps(obj, default=encode_default)
+
+_default = None
+
+def default_codec():
+  """Retrieve the fastest available codec.
+
+  :rtype: JsonCodec
+
+  """
+
+  global _default
+
+  if not _default:
+    for codec_class in (OrjsonCodec, UjsonCodec):
+      try:
+        _default = codec_class()
+        break
+      except ImportError:
+        pass
+    else:
+      _default = JsonCodec()
+
+  return _default
@@ -0,0 +1,79 @@
+"""Opt-in compression of large payloads.
+
+Compressed payloads start with a marker which could not start a JSON document nor UTF-8
+text, so receivers tell them apart without any header. Peers advertise what they support
+through the `capabilities` key of discovery pings, pongs and channel creations, and
+payloads are only compressed once the other side said it could read them.
+"""
+
+import zlib
+
+# Capability advertised by peers able to read zlib payloads
+ZLIB = 'zlib'
+
+# Key of the capabilities list in discovery and creation payloads
+CAPABILITIES_KEY = 'capabilities'
+
+# Starts every compressed payload
+MARKER = b'\x00z'
+
+def is_compressed(payload):
+  """Checks if the given payload has been compressed.
+
+  :param payload: Received payload
+  :rtype: bool
+
+  """
+
+  return type(payload) is bytes and payload.startswith(MARKER)
+
+def decompress(payload):
+  """Decompresses a payload, is_compressed must be checked first. Raises a ValueError if
+  the payload is corrupted.
+
+  :param payload: Compressed payload
+  :type payload: bytes
+  :rtype: bytes
+
+  """
+
+  try:
+    return zlib.decompress(memoryview(payload)[len(MARKER):])
+  except zlib.error as e:
+    raise ValueError('Could not decompress payload: %s' % e)
+
+class Compression():
+  """Compresses payloads big enough to be worth it.
+  """
+
+  name = ZLIB
+
+  def __init__(self, threshold=1024, level=1):
+    """Constructs a new compression policy.
+
+    :param threshold: Payloads smaller than this number of bytes are sent as is
+    :type threshold: int
+    :param level: zlib level, from 1 (fastest) to 9 (smallest)
+    :type level: int
+
+    """
+
+    self.threshold = threshold
+    self.level = level
+
+  def compress(self, payload):
+    """Compresses the payload if it's big enough and compression actually makes it smaller.
+
+    :param payload: Payload to publish
+    :type payload: bytes or str
+    :rtype: bytes or str
+
+    """
+
+    if not isinstance(payload, (bytes, str)) or len(payload) < self.threshold:
+      return payload
+
+    data = payload.encode('utf-8') if isinstance(payload, str) else payload
+    compressed = MARKER + zlib.compress(data, self.level)
+
+    return compressed if len(compressed) < len(data) else payload
@@ -1,22 +1,183 @@
+from collections import OrderedDict
+import logging, threading
+
+# Capability advertised by skills which keep env values per user, atlas may then only
+# send __env when they change
+ENV_DELTA = 'env_delta'
+
+TRUE_VALUES = frozenset(['1', 'true', 'yes', 'on', 'y'])
+
+def to_bool(value):
+  """Converts an env value to a boolean, strings such as "false" or "0" are falsy.
+
+  :param value: Raw value
+  :rtype: bool
+
+  """
+
+  if isinstance(value, str):
+    return value.strip().lower() in TRUE_VALUES
+
+  return bool(value)
+
 class Env():
   """Represents a single configuration parameter needed by a skill to work
   as correctly.
   """
 
-  def __init__(self, name, description=None, var_type=str):
+  def __init__(self, name, description=None, var_type=str, default=None):
     """Constructs a new env requirement.
 
     :param name: Name of the configuration parameter
     :type name: str
     :param description: Description of the parameter
     :type description: str
-    :param var_type: Type of the parameter
+    :param var_type: Type of the parameter, values are converted to it
     :type var_type: type
+    :param default: Value used when the parameter is not set or could not be converted
     """
 
     self.name = name
     self.description = description
     self.type = var_type
+    self.default = default
+
+  def converter(self):
+    """Retrieve the function converting a raw value to the type of this parameter.
+
+    :rtype: callable
+
+    """
+
+    if self.type is bool:
+      return to_bool
+
+    return self.type
 
   def __str__(self):
-    return 'Env parameter %s %s - %s' % (self.name, self.type, self.description or 'No description')
\ No newline at end of file
+    return 'Env parameter %s %s - %s' % (self.name, self.type, self.description or 'No description')
+
+class EnvConfig(dict):
+  """Typed env values of a request. Declared parameters are converted and always present,
+  other values are kept as sent by atlas. Values could also be read as attributes.
+  """
+
+  __slots__ = ()
+
+  def __getattr__(self, name):
+    try:
+      return self[name]
+    except KeyError:
+      raise AttributeError(name)
+
+class EnvSchema():
+  """Declared env parameters of a skill, compiled once into converters.
+  """
+
+  def __init__(self, env):
+    """Compiles the given env parameters.
+
+    :param env: Env parameters declared by the skill
+    :type env: list
+
+    """
+
+    self.log = logging.getLogger('atlas.env')
+
+    # (name, converter, default) of each parameter
+    self._fields = [(e.name, e.converter(), e.default) for e in env]
+
+  def parse(self, values):
+    """Converts raw env values sent by atlas.
+
+    :param values: Raw values
+    :type values: dict
+    :rtype: EnvConfig
+
+    """
+
+    config = EnvConfig(values or ())
+
+    for name, convert, default in self._fields:
+      value = config.get(name)
+
+      if value is None:
+        config[name] = default
+        continue
+
+      try:
+        config[name] = convert(value)
+      except (TypeError, ValueError):
+        self.log.warning('Env parameter %s could not be converted: %r' % (name, value))
+        config[name] = default
+
+    return config
+
+class EnvCache():
+  """Keeps the last env values received for each user, in a LRU, so atlas only has to
+  send them when they change.
+  """
+
+  def __init__(self, max_users=10000):
+    """Constructs a new env cache.
+
+    :param max_users: Maximum number of users kept, least recently seen ones are evicted first
+    :type max_users: int
+
+    """
+
+    self.max_users = max_users
+    self.hits = 0
+    self.misses = 0
+
+    self._lock = threading.Lock()
+    self._configs = OrderedDict()
+
+  def __len__(self):
+    return len(self._configs)
+
+  def get(self, uid):
+    """Retrieve the env of a user.
+
+    :param uid: User id
+    :type uid: str
+    :returns: Its typed env, None if it's unknown
+    :rtype: EnvConfig
+
+    """
+
+    with self._lock:
+      config = self._configs.get(uid)
+
+      if config is None:
+        self.misses += 1
+        return None
+
+      self._configs.move_to_end(uid)
+      self.hits += 1
+
+      return config
+
+  def set(self, uid, config):
+    """Stores the env of a user.
+
+    :param uid: User id
+    :type uid: str
+    :param config: Its typed env
+    :type config: EnvConfig
+
+    """
+
+    with self._lock:
+      self._configs[uid] = config
+      self._configs.move_to_end(uid)
+
+      while len(self._configs) > self.max_users:
+        self._configs.popitem(last=False)
+
+  def clear(self):
+    """Forgets every env, atlas should send them again.
+    """
+
+    with self._lock:
+      self._configs.clear()
@@ -0,0 +1,137 @@
+"""Localization helpers built on top of the python builtin gettext module.
+
+Translators are loaded lazily on first use of a language and cached. The translator of
+the request being handled is kept in a context variable so the builtin `_` could be
+installed once and still be safe when many requests are handled concurrently, on threads
+or asyncio tasks.
+
+gettext itself is only imported when a translator is first needed.
+"""
+
+import builtins, contextvars, functools, os
+
+I18N_LOCALE_DIR = 'locale'
+I18N_DOMAIN_NAME = 'messages'
+
+_null = None
+
+def null_translations():
+  """Retrieve the translator used when there is no catalog, it returns messages as is.
+
+  :rtype: gettext.NullTranslations
+
+  """
+
+  global _null
+
+  if _null is None:
+    import gettext
+
+    _null = gettext.NullTranslations()
+
+  return _null
+
+def __getattr__(name):
+  # Kept for compatibility, NULL_TRANSLATIONS used to be created at import time
+  if name == 'NULL_TRANSLATIONS':
+    return null_translations()
+
+  raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+_current = contextvars.ContextVar('atlas_translator', default=None)
+
+def current():
+  """Retrieve the translator of the request being handled.
+
+  :rtype: gettext.NullTranslations
+
+  """
+
+  return _current.get() or null_translations()
+
+def activate(translator):
+  """Makes the given translator the current one for this context.
+
+  :param translator: Translator to use
+  :type translator: gettext.NullTranslations
+  :rtype: contextvars.Token
+
+  """
+
+  return _current.set(translator)
+
+def deactivate(token):
+  """Restores the translator active before the matching activate call.
+
+  :param token: Token returned by activate
+  :type token: contextvars.Token
+
+  """
+
+  _current.reset(token)
+
+def _gettext(message):
+  return (_current.get() or null_translations()).gettext(message)
+
+def _ngettext(singular, plural, n):
+  return (_current.get() or null_translations()).ngettext(singular, plural, n)
+
+def install():
+  """Installs `_` and `ngettext` in builtins, they will use the current translator.
+  """
+
+  builtins._ = _gettext
+  builtins.ngettext = _ngettext
+
+class Translations():
+  """Lazily loaded and cached translators for a skill.
+  """
+
+  def __init__(self, locale_dir, domain=I18N_DOMAIN_NAME, max_size=32):
+    """Constructs a new translations cache.
+
+    :param locale_dir: Directory containing one folder per language
+    :type locale_dir: str
+    :param domain: Gettext domain name
+    :type domain: str
+    :param max_size: Maximum number of translators kept in memory
+    :type max_size: int
+
+    """
+
+    self.locale_dir = locale_dir
+    self.domain = domain
+
+    # Retrieve the translator of a language, loading it on first use
+    self.get = functools.lru_cache(maxsize=max_size)(self._load)
+
+  def languages(self):
+    """Retrieve languages available in the locale directory.
+
+    :rtype: list
+
+    """
+
+    if not os.path.isdir(self.locale_dir):
+      return []
+
+    return os.listdir(self.locale_dir)
+
+  def _load(self, lang):
+    """Loads the translator for the given language.
+
+    :param lang: Language to load
+    :type lang: str
+    :rtype: gettext.NullTranslations
+
+    """
+
+    if not lang or not os.path.isdir(self.locale_dir):
+      return null_translations()
+
+    import gettext
+
+    try:
+      return gettext.translation(self.domain, localedir=self.locale_dir, languages=[lang])
+    except OSError:
+      return null_translations()
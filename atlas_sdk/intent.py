@@ -2,21 +2,27 @@ class Intent():
   """Represents a single intent.
   """
 
-  def __init__(self, name, handler, slots=[]):
+  def __init__(self, name, handler, slots=[], timeout=None, cache=None):
     """Instantiates a new intent.
 
     :param name: Name of the intent
     :type name: str
-    :param handler: Handler for this intent, it will receive a Message object with handy methods in it
+    :param handler: Handler for this intent, it will receive a Message object with handy methods in it, may be a coroutine function when used by an AsyncSkillClient
     :type handler: callable
     :param slots: Slots needed by the skill for this intent
     :type slots: list
+    :param timeout: Seconds the handler has to answer, defaults to the skill one
+    :type timeout: float
+    :param cache: If set, responses are cached and replayed to similar requests without calling the handler
+    :type cache: CachePolicy
 
     """
 
     self.name = name
     self.handler = handler
     self.slots = slots
+    self.timeout = timeout
+    self.cache = cache
 
   def __str__(self):
     return 'Intent %s\n\t%s' % (self.name, '\n\t'.join([s.__str__() for s in self.slots]))
\ No newline at end of file
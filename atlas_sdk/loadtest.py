@@ -0,0 +1,330 @@
+"""Load generator finding the limits of the SDK before production.
+
+It runs, in a single process, simulated channels sending inputs at a target rate, a stub
+dialog router standing for atlas which turns each input into an intent, and skills answering
+them after a configurable latency. Once done, it reports the end-to-end latency of answered
+inputs, the throughput and how many inputs were lost.
+
+Run it with `python -m atlas_sdk.loadtest`, `--help` lists the options. Clients talk through
+an in-process loopback broker by default, give `--host` to use a local MQTT broker instead.
+"""
+
+from .client import Client, DIALOG_PARSE_TOPIC, DIALOG_SHOW_TOPIC, CHANNEL_SHOW_TOPIC, INTENT_TOPIC
+from .channel_client import ChannelClient
+from .skill_client import SkillClient
+from .intent import Intent
+from .broker import BrokerConfig
+import logging, math, threading, time
+
+INTENT_NAME = 'loadtest_%d'
+
+def percentile(values, p):
+  """Computes a percentile with the nearest rank method.
+
+  :param values: Sorted values
+  :type values: list
+  :param p: Percentile, between 0 and 100
+  :type p: float
+  :rtype: float
+
+  """
+
+  if not values:
+    return None
+
+  return values[max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))]
+
+class StubRouter(Client):
+  """Stands for atlas: each parsed input is sent to the intent of a skill, in turn, and
+  shows of skills are forwarded to channels.
+  """
+
+  def __init__(self, skills, transport=None):
+    """Constructs a new stub router.
+
+    :param skills: Number of skills inputs are spread to
+    :type skills: int
+    :param transport: Factory creating the transport, defaults to MqttTransport
+    :type transport: callable
+
+    """
+
+    super(StubRouter, self).__init__(name='loadtest.router', transport=transport)
+
+    self.skills = skills
+    self._count = 0
+
+  def on_connect(self, client, userdata, flags, rc):
+    super(StubRouter, self).on_connect(client, userdata, flags, rc)
+
+    self.subscribe_message(DIALOG_PARSE_TOPIC % '+', self.on_parse)
+    self.subscribe_message(DIALOG_SHOW_TOPIC % '+', self.on_show)
+
+  def on_parse(self, msg):
+    sid = msg.topic.split('/')[1]
+    text = msg.payload.decode('utf-8') if isinstance(msg.payload, bytes) else msg.payload
+
+    # Only the network thread of the router calls it
+    self._count += 1
+
+    self.publish_json(INTENT_TOPIC % (INTENT_NAME % (self._count % self.skills)), {
+      '__cid': text,
+      '__sid': sid,
+      '__uid': sid,
+      '__lang': 'en',
+      'text': [{ 'value': text }],
+    })
+
+  def on_show(self, msg):
+    self.publish(CHANNEL_SHOW_TOPIC % msg.topic.split('/')[1], msg.payload)
+
+class LoadTest():
+  """Runs channels, a stub router and skills against the same broker and measures how
+  inputs sent by channels are answered.
+  """
+
+  def __init__(self, channels=10, skills=1, rate=100, duration=10, latency=0, workers=None, config=None, transport=None):
+    """Constructs a new load test.
+
+    :param channels: Number of simulated channels
+    :type channels: int
+    :param skills: Number of skills, inputs are spread among them
+    :type skills: int
+    :param rate: Inputs sent per second, by all channels
+    :type rate: float
+    :param duration: Seconds during which inputs are sent
+    :type duration: float
+    :param latency: Seconds spent by skill handlers before answering
+    :type latency: float
+    :param workers: Number of handler threads of each skill, handlers run on the network thread if not set
+    :type workers: int
+    :param config: Broker configuration, a loopback broker is used if not set
+    :type config: BrokerConfig
+    :param transport: Factory creating the transport, overrides the one matching the configuration
+    :type transport: callable
+
+    """
+
+    if config is None and transport is None:
+      from .transport import LoopbackBroker
+
+      transport = LoopbackBroker().transport
+
+    self.rate = rate
+    self.duration = duration
+    self.latency = latency
+    self.config = config or BrokerConfig()
+
+    self.router = StubRouter(skills, transport=transport)
+    self.skills = [SkillClient(
+      'loadtest_%d' % i,
+      '1.0.0',
+      intents=[Intent(INTENT_NAME % i, self._handle)],
+      workers=workers,
+      transport=transport,
+    ) for i in range(skills)]
+    self.channels = [ChannelClient(
+      'loadtest_%d' % i,
+      'loadtest_%d' % i,
+      on_show=self._on_show,
+      transport=transport,
+    ) for i in range(channels)]
+
+    self.sent = 0
+    self.latencies = []
+
+    # Input id -> time at which it has been sent
+    self._pending = {}
+    self._lock = threading.Lock()
+
+  @property
+  def clients(self):
+    return [self.router] + self.skills + self.channels
+
+  def _handle(self, request):
+    if self.latency:
+      time.sleep(self.latency)
+
+    request.show(request.slot('text').first().value)
+
+  def _on_show(self, data, raw):
+    received_at = time.perf_counter()
+
+    with self._lock:
+      sent_at = self._pending.pop(data.get('text'), None)
+
+      if sent_at is not None:
+        self.latencies.append(received_at - sent_at)
+
+  def start(self, timeout=10):
+    """Connects every client and waits for them to be ready.
+
+    :param timeout: Maximum seconds to wait
+    :type timeout: float
+
+    """
+
+    for client in self.clients:
+      client.start(self.config)
+
+    deadline = time.monotonic() + timeout
+
+    while not all(c.connected for c in self.clients):
+      if time.monotonic() > deadline:
+        raise TimeoutError('Clients could not connect in %ss' % timeout)
+
+      time.sleep(0.01)
+
+  def stop(self):
+    """Disconnects every client.
+    """
+
+    for client in self.clients:
+      client.stop()
+
+  def send(self):
+    """Sends inputs from channels, in turn, at the target rate until the duration is over.
+    """
+
+    interval = 1 / self.rate
+    start = time.perf_counter()
+    end = start + self.duration
+
+    while True:
+      # Catches up when late so the average rate is kept
+      next_at = start + self.sent * interval
+
+      if next_at >= end:
+        break
+
+      now = time.perf_counter()
+
+      if next_at > now:
+        time.sleep(next_at - now)
+
+      text = str(self.sent)
+      channel = self.channels[self.sent % len(self.channels)]
+
+      with self._lock:
+        self._pending[text] = time.perf_counter()
+
+      channel.parse(text)
+      self.sent += 1
+
+  def run(self, drain=5):
+    """Runs the load test and builds its report.
+
+    :param drain: Maximum seconds to wait for answers once every input has been sent
+    :type drain: float
+    :rtype: dict
+
+    """
+
+    self.start()
+
+    try:
+      start = time.perf_counter()
+      self.send()
+
+      deadline = time.monotonic() + drain
+
+      while self._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+      elapsed = time.perf_counter() - start
+    finally:
+      self.stop()
+
+    return self.report(elapsed)
+
+  def report(self, elapsed):
+    """Summarizes what has been measured.
+
+    :param elapsed: Seconds between the first input and the last answer
+    :type elapsed: float
+    :rtype: dict
+
+    """
+
+    with self._lock:
+      latencies = sorted(self.latencies)
+      unanswered = len(self._pending)
+
+    def ms(value):
+      return value * 1000 if value is not None else None
+
+    return {
+      'channels': len(self.channels),
+      'skills': len(self.skills),
+      'rate': self.rate,
+      'sent': self.sent,
+      'answered': len(latencies),
+      'unanswered': unanswered,
+      'dropped': sum(c.dropped + c.offline_dropped for c in self.clients),
+      'throughput': len(latencies) / elapsed if elapsed else 0,
+      'p50_ms': ms(percentile(latencies, 50)),
+      'p99_ms': ms(percentile(latencies, 99)),
+      'max_ms': ms(latencies[-1] if latencies else None),
+    }
+
+def format_report(report):
+  """Formats a report to be printed.
+
+  :param report: Report built by LoadTest.report
+  :type report: dict
+  :rtype: str
+
+  """
+
+  def ms(value):
+    return '%.2fms' % value if value is not None else '-'
+
+  return '\n'.join([
+    '%d channel(s), %d skill(s), %g inputs/s' % (report['channels'], report['skills'], report['rate']),
+    'sent        %d' % report['sent'],
+    'answered    %d' % report['answered'],
+    'unanswered  %d' % report['unanswered'],
+    'dropped     %d' % report['dropped'],
+    'throughput  %.1f answers/s' % report['throughput'],
+    'latency     p50 %s, p99 %s, max %s' % (ms(report['p50_ms']), ms(report['p99_ms']), ms(report['max_ms'])),
+  ])
+
+def main(args=None):
+  import argparse, json
+
+  parser = argparse.ArgumentParser(prog='python -m atlas_sdk.loadtest', description='Measures how the SDK copes with many channels and skills.')
+  parser.add_argument('-c', '--channels', type=int, default=10, help='Number of simulated channels')
+  parser.add_argument('-s', '--skills', type=int, default=1, help='Number of skills')
+  parser.add_argument('-r', '--rate', type=float, default=100, help='Inputs sent per second, by all channels')
+  parser.add_argument('-d', '--duration', type=float, default=10, help='Seconds during which inputs are sent')
+  parser.add_argument('-l', '--latency', type=float, default=0, help='Seconds spent by skill handlers before answering')
+  parser.add_argument('-w', '--workers', type=int, help='Number of handler threads of each skill, handlers run on the network thread if not set')
+  parser.add_argument('--drain', type=float, default=5, help='Maximum seconds to wait for answers once every input has been sent')
+  parser.add_argument('--host', help='Host of a MQTT broker, an in-process loopback broker is used if not set')
+  parser.add_argument('--port', type=int, default=1883, help='Port of the MQTT broker')
+  parser.add_argument('--json', action='store_true', help='Prints the report as JSON')
+
+  args = parser.parse_args(args)
+
+  logging.basicConfig(level=logging.WARNING)
+
+  load_test = LoadTest(
+    channels=args.channels,
+    skills=args.skills,
+    rate=args.rate,
+    duration=args.duration,
+    latency=args.latency,
+    workers=args.workers,
+    config=BrokerConfig(args.host, args.port) if args.host else None,
+  )
+
+  report = load_test.run(args.drain)
+
+  print(json.dumps(report) if args.json else format_report(report))
+
+  return 0 if not report['unanswered'] and not report['dropped'] else 1
+
+if __name__ == '__main__':
+  import sys
+
+  sys.exit(main())
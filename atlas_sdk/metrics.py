@@ -0,0 +1,248 @@
+"""Lightweight instrumentation for clients.
+
+Give a Metrics instance to a client to record message counts, decoding time, handler
+latency, errors and publish sizes. Nothing is recorded when no instance is given.
+"""
+
+from bisect import bisect_left
+import threading
+
+METRICS_PREFIX = 'atlas_'
+
+# Upper bounds, in seconds, of latency histograms buckets
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Upper bounds, in bytes, of size histograms buckets
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+def normalize_topic(topic):
+  """Replaces the session or client id of atlas dialog and channel topics with a wildcard
+  so each topic does not create its own serie.
+
+  :param topic: Topic to normalize
+  :type topic: str
+  :rtype: str
+
+  """
+
+  levels = topic.split('/')
+
+  if len(levels) > 2 and levels[0] == 'atlas' and levels[2] in ('dialog', 'channel'):
+    levels[1] = '+'
+    return '/'.join(levels)
+
+  return topic
+
+class Histogram():
+  """Counts observed values in fixed buckets.
+  """
+
+  __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+  def __init__(self, buckets):
+    """Constructs a new histogram.
+
+    :param buckets: Sorted upper bounds of each bucket
+    :type buckets: tuple
+
+    """
+
+    self.buckets = buckets
+    self.counts = [0] * (len(buckets) + 1)
+    self.count = 0
+    self.sum = 0
+
+  def observe(self, value):
+    self.counts[bisect_left(self.buckets, value)] += 1
+    self.count += 1
+    self.sum += value
+
+  def cumulative(self):
+    """Retrieve cumulative counts for each upper bound, the last one being +Inf.
+
+    :rtype: list
+
+    """
+
+    total = 0
+    result = []
+
+    for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+      total += count
+      result.append((bound, total))
+
+    return result
+
+def _format_labels(labels, extra=None):
+  pairs = list(labels) + ([extra] if extra else [])
+
+  if not pairs:
+    return ''
+
+  return '{%s}' % ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs)
+
+def _format_value(value):
+  return ('%d' % value) if float(value).is_integer() else repr(float(value))
+
+class Metrics():
+  """Thread safe registry of counters, histograms and gauges.
+
+  Series are identified by a name and labels given as a tuple of (key, value) pairs.
+
+  """
+
+  def __init__(self, prefix=METRICS_PREFIX):
+    """Constructs a new registry.
+
+    :param prefix: Prefix added to every name when exporting
+    :type prefix: str
+
+    """
+
+    self.prefix = prefix
+
+    self._lock = threading.Lock()
+    self._counters = {}
+    self._histograms = {}
+    self._gauges = {}
+
+  def inc(self, name, labels=(), value=1):
+    """Increments a counter.
+
+    :param name: Counter name
+    :type name: str
+    :param labels: Labels of the serie
+    :type labels: tuple
+    :param value: Value to add
+    :type value: int
+
+    """
+
+    key = (name, labels)
+
+    with self._lock:
+      self._counters[key] = self._counters.get(key, 0) + value
+
+  def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+    """Records a value in an histogram.
+
+    :param name: Histogram name
+    :type name: str
+    :param labels: Labels of the serie
+    :type labels: tuple
+    :param value: Observed value
+    :type value: float
+    :param buckets: Buckets used when the histogram does not exist yet
+    :type buckets: tuple
+
+    """
+
+    key = (name, labels)
+
+    with self._lock:
+      histogram = self._histograms.get(key)
+
+      if not histogram:
+        histogram = self._histograms[key] = Histogram(buckets)
+
+      histogram.observe(value)
+
+  def gauge(self, name, fn, labels=()):
+    """Registers a gauge whose value is read when exporting.
+
+    :param name: Gauge name
+    :type name: str
+    :param fn: Function returning the current value
+    :type fn: callable
+    :param labels: Labels of the serie
+    :type labels: tuple
+
+    """
+
+    self._gauges[(name, labels)] = fn
+
+  def counter(self, name, labels=()):
+    """Retrieve the current value of a counter.
+
+    :rtype: int
+
+    """
+
+    return self._counters.get((name, labels), 0)
+
+  def histogram(self, name, labels=()):
+    """Retrieve an histogram.
+
+    :rtype: Histogram
+
+    """
+
+    return self._histograms.get((name, labels))
+
+  def _snapshot(self):
+    with self._lock:
+      counters = dict(self._counters)
+      histograms = { k: (h.cumulative(), h.count, h.sum) for k, h in self._histograms.items() }
+
+    gauges = { k: fn() for k, fn in list(self._gauges.items()) }
+
+    return counters, histograms, gauges
+
+  def to_dict(self):
+    """Exports a snapshot as a plain dict.
+
+    :rtype: dict
+
+    """
+
+    counters, histograms, gauges = self._snapshot()
+
+    def key(name, labels):
+      return self.prefix + name + _format_labels(labels)
+
+    return {
+      'counters': { key(*k): v for k, v in counters.items() },
+      'gauges': { key(*k): v for k, v in gauges.items() },
+      'histograms': { key(*k): {
+        'count': count,
+        'sum': total,
+        'buckets': { str(b): c for b, c in cumulative },
+      } for k, (cumulative, count, total) in histograms.items() },
+    }
+
+  def to_prometheus(self):
+    """Exports a snapshot in the Prometheus text format.
+
+    :rtype: str
+
+    """
+
+    counters, histograms, gauges = self._snapshot()
+    lines = []
+    typed = set()
+
+    def declare(name, kind):
+      if name not in typed:
+        typed.add(name)
+        lines.append('# TYPE %s %s' % (name, kind))
+
+    for (name, labels), value in sorted(counters.items()):
+      declare(self.prefix + name, 'counter')
+      lines.append('%s%s %s' % (self.prefix + name, _format_labels(labels), _format_value(value)))
+
+    for (name, labels), value in sorted(gauges.items()):
+      declare(self.prefix + name, 'gauge')
+      lines.append('%s%s %s' % (self.prefix + name, _format_labels(labels), _format_value(value)))
+
+    for (name, labels), (cumulative, count, total) in sorted(histograms.items()):
+      full_name = self.prefix + name
+      declare(full_name, 'histogram')
+
+      for bound, c in cumulative:
+        le = '+Inf' if bound == float('inf') else repr(float(bound))
+        lines.append('%s_bucket%s %d' % (full_name, _format_labels(labels, ('le', le)), c))
+
+      lines.append('%s_sum%s %s' % (full_name, _format_labels(labels), _format_value(total)))
+      lines.append('%s_count%s %d' % (full_name, _format_labels(labels), count))
+
+    return '\n'.join(lines) + '\n'
@@ -1,6 +1,10 @@
 from .client import DIALOG_ASK_TOPIC, DIALOG_SHOW_TOPIC, DIALOG_TERMINATE_TOPIC
 from .slot_data import SlotData
-import json, random
+from .codec import default_codec
+from .i18n import null_translations
+from .env import EnvConfig
+from .tracing import TRACE_KEY, mark
+import random, time
 
 CID_KEY = '__cid'
 SID_KEY = '__sid'
@@ -26,6 +30,9 @@ def random_select(element):
 class Request():
   """Represents a wrapper around a single message request with handy methods
   to ease the development of skills.
+
+  When constructed from a raw payload only, the payload is decoded on first access.
+
   """
   
   def __init__(self, client, data, raw):
@@ -33,25 +40,248 @@ class Request():
 
     :param client: Skill client to use
     :type client: SkillClient
-    :param data: Json data of the message
+    :param data: Json data of the message, None to decode it lazily from the raw payload
     :type data: dict
     :param raw: Raw message
-    :type raw: str
+    :type raw: bytes
 
     """
 
     self._client = client
+    self._data = data
+    self._slots = {}
 
-    self.data = data
     self.raw = raw
 
-    # Extract common properties
+    # Monotonic time (see time.monotonic) at which the handler should have answered
+    self.deadline = None
+
+    # Set once the deadline has passed and a fallback response has been sent, responses are then dropped
+    self.expired = False
+
+    # When a list, responses are also recorded in it as (topic, payload) so they could be replayed
+    self.responses = None
+
+    self._session = None
+    self._session_ended = False
+
+    # Typed env, built on first access unless the client already knows it
+    self._config = None
+
+    # Echoed in responses when atlas forwarded a trace context, see tracing
+    self.received_at = time.time()
+    self._trace = None
+    self._trace_checked = False
+
+  @property
+  def remaining(self):
+    """Seconds left before the deadline, None if there is no deadline.
+
+    :rtype: float
+
+    """
+
+    if self.deadline is None:
+      return None
+
+    return max(0, self.deadline - time.monotonic())
+
+  def fallback(self):
+    """Retrieve a copy of this request which could still respond synchronously, used by the
+    SDK to respond itself, for example once the request has expired.
+
+    :rtype: Request
+
+    """
+
+    copy = Request(self._client, self._data, self.raw)
+    copy._config = self._config
+    copy.received_at = self.received_at
+
+    return copy
+
+  def _dropped(self):
+    """Checks if responses should be dropped because the request has expired.
+
+    :rtype: bool
+
+    """
+
+    if self.expired:
+      self._client.log.warning('Request %s has expired, its response has been dropped' % self.cid)
+
+    return self.expired
+
+  @property
+  def trace(self):
+    """Trace context of this request, with its reception marked, None if it's not traced.
+
+    :rtype: dict
+
+    """
+
+    if not self._trace_checked:
+      self._trace_checked = True
+      trace = self.data.get(TRACE_KEY)
+
+      if isinstance(trace, dict):
+        self._trace = mark(trace, 'skill.received', self.received_at)
+
+    return self._trace
+
+  def _traced(self, payload, stage):
+    """Retrieve the payload to send, with the trace context echoed if there is one.
+
+    :param payload: Response payload
+    :type payload: dict
+    :param stage: Name of the stage reached
+    :type stage: str
+    :rtype: dict
+
+    """
+
+    trace = self.trace
+
+    if trace is None:
+      return payload
+
+    # Recorded payloads should not keep the trace of this request
+    payload = dict(payload)
+    payload[TRACE_KEY] = mark(trace, stage)
+
+    return payload
+
+  @property
+  def session(self):
+    """State of the session of this request, kept between turns of the dialog until it's
+    terminated. It's loaded on first access and saved once the handler returns without
+    raising, so a failed turn does not leave a partial state. It should only contain JSON
+    serializable values. Requests without a session id get an empty state which is never
+    saved.
+
+    :rtype: dict
+
+    """
+
+    if self._session is None:
+      self._session = self._client.sessions.load(self.sid) if self.sid is not None else {}
+
+    return self._session
+
+  def _save_session(self):
+    """Saves the session state if it has been accessed and the dialog is still running.
+    """
+
+    # An expired request has already been terminated by its fallback
+    if self._session is not None and not self._session_ended and not self.expired and self.sid is not None:
+      self._client.sessions.save(self.sid, self._session)
+
+  def _end_session(self):
+    """Forgets the session state since the dialog is over.
+    """
+
+    self._session_ended = True
+
+    sessions = getattr(self._client, 'sessions', None)
+
+    if sessions is not None and self.sid is not None:
+      sessions.delete(self.sid)
+
+  @property
+  def data(self):
+    """Json data of the message, decoded on first access.
+
+    :rtype: dict
+
+    """
+
+    if self._data is None:
+      loads = self._client.loads if self._client else default_codec().loads
+
+      try:
+        self._data = loads(self.raw) if self.raw else {}
+      except ValueError:
+        self._data = {}
 
-    self.cid = data.get(CID_KEY)
-    self.sid = data.get(SID_KEY)
-    self.uid = data.get(UID_KEY)
-    self.lang = data.get(LANG_KEY)
-    self.version = data.get(VERSION_KEY)
+    return self._data
+
+  @property
+  def cid(self):
+    return self.data.get(CID_KEY)
+
+  @property
+  def sid(self):
+    return self.data.get(SID_KEY)
+
+  @property
+  def uid(self):
+    return self.data.get(UID_KEY)
+
+  @property
+  def lang(self):
+    return self.data.get(LANG_KEY)
+
+  @property
+  def version(self):
+    return self.data.get(VERSION_KEY)
+
+  @property
+  def translator(self):
+    """Translator matching the request language.
+
+    :rtype: gettext.NullTranslations
+
+    """
+
+    translations = getattr(self._client, 'translations', None)
+
+    return translations.get(self.lang) if translations else null_translations()
+
+  def gettext(self, message):
+    """Translates the given message in the request language.
+
+    :param message: Message to translate
+    :type message: str
+    :rtype: str
+
+    """
+
+    return self.translator.gettext(message)
+
+  _ = gettext
+
+  def ngettext(self, singular, plural, n):
+    """Translates the given message in the request language, taking plural forms into account.
+
+    :param singular: Singular form of the message
+    :type singular: str
+    :param plural: Plural form of the message
+    :type plural: str
+    :param n: Number used to choose the form
+    :type n: int
+    :rtype: str
+
+    """
+
+    return self.translator.ngettext(singular, plural, n)
+
+  @property
+  def config(self):
+    """Env values of this request, converted to the types declared by the skill. It's
+    built once per request, or once per user when the skill keeps env values, and should
+    not be mutated.
+
+    :rtype: EnvConfig
+
+    """
+
+    if self._config is None:
+      schema = getattr(self._client, 'env_schema', None)
+      values = self.data.get(ENV_KEY)
+
+      self._config = schema.parse(values) if schema else EnvConfig(values or ())
+
+    return self._config
 
   def env(self, key):
     """Retrieve a configuration key for this request.
@@ -61,12 +291,13 @@ class Request():
 
     """
 
-    return self.data.get(ENV_KEY, {}).get(key)
+    return self.config.get(key)
 
   def slot(self, name):
     """Handy method to retrieve a slot for this request.
 
-    A slot is always a list of dict with keys retrieved by the interpreter.
+    A slot is always a list of dict with keys retrieved by the interpreter. The SlotData
+    is created once per request so you can call this method as many times as you want.
 
     :param name: Slot name to retrieve
     :type name: str
@@ -74,7 +305,12 @@ class Request():
     
     """
 
-    return SlotData(self.data.get(name))
+    slot = self._slots.get(name)
+
+    if slot is None:
+      slot = self._slots[name] = SlotData(self.data.get(name))
+
+    return slot
 
   def ask(self, slot, text, choices=None, additional_data={}):
     """Asks a question to the user to require its inputs.
@@ -90,14 +326,20 @@ class Request():
 
     """
 
-    additional_data.update({
+    if self._dropped():
+      return
+
+    # The payload may be given to subscribers as is, so never reuse the given dict
+    payload = dict(additional_data)
+    payload.update({
       CID_KEY: self.cid,
       'text': random_select(text),
       'slot': slot,
       'choices': choices,
     })
 
-    self._client.publish(DIALOG_ASK_TOPIC % self.sid, json.dumps(additional_data))
+    self._record(DIALOG_ASK_TOPIC, payload)
+    self._client.publish_json(DIALOG_ASK_TOPIC % self.sid, self._traced(payload, 'skill.ask'))
 
   def show(self, text, cards=None, additional_data={}, terminate=False):
     """Presents data to the user.
@@ -113,20 +355,36 @@ class Request():
 
     """
 
+    if self._dropped():
+      return
+
     # Ensure we got a list here
     if cards and type(cards) is not list:
       cards = [cards]
 
-    additional_data.update({
+    payload = dict(additional_data)
+    payload.update({
       CID_KEY: self.cid,
       'text': random_select(text),
       'cards': cards,
     })
-    
-    self._client.publish(DIALOG_SHOW_TOPIC % self.sid, json.dumps(additional_data))
 
-    if terminate:
-      self.terminate()
+    self._record(DIALOG_SHOW_TOPIC, payload)
+    payload = self._traced(payload, 'skill.show')
+
+    if not terminate:
+      return self._client.publish_json(DIALOG_SHOW_TOPIC % self.sid, payload)
+
+    self._record(DIALOG_TERMINATE_TOPIC, {})
+    self._end_session()
+
+    # Both messages are sent together since they represent a single response
+    dumps = self._client.dumps
+
+    self._client.publish_many([
+      (DIALOG_SHOW_TOPIC % self.sid, dumps(payload)),
+      (DIALOG_TERMINATE_TOPIC % self.sid, dumps(self._traced({ CID_KEY: self.cid }, 'skill.terminate'))),
+    ])
 
   def terminate(self):
     """Terminates the dialog for this request. It informs the system that the skill
@@ -134,6 +392,63 @@ class Request():
     
     """
 
-    self._client.publish(DIALOG_TERMINATE_TOPIC % self.sid, json.dumps({
+    if self._dropped():
+      return
+
+    self._record(DIALOG_TERMINATE_TOPIC, {})
+    self._end_session()
+    self._client.publish_json(DIALOG_TERMINATE_TOPIC % self.sid, self._traced({
       CID_KEY: self.cid,
-    }))
\ No newline at end of file
+    }, 'skill.terminate'))
+
+  def _record(self, topic, payload):
+    if self.responses is not None:
+      self.responses.append((topic, payload))
+
+  def replay(self, responses):
+    """Sends responses recorded for another request as if they were made for this one.
+
+    :param responses: Recorded responses, see Request.responses
+    :type responses: list
+
+    """
+
+    if self._dropped():
+      return
+
+    dumps = self._client.dumps
+    messages = []
+
+    for topic, payload in responses:
+      if topic == DIALOG_TERMINATE_TOPIC:
+        self._end_session()
+
+      payload = self._traced(payload, 'skill.replay')
+      payload = dict(payload)
+      payload[CID_KEY] = self.cid
+      messages.append((topic % self.sid, dumps(payload)))
+
+    self._client.publish_many(messages)
+
+class AsyncRequest(Request):
+  """Request given to handlers of an AsyncSkillClient.
+
+  Its methods are coroutines which return once the message has been written to the
+  broker connection.
+
+  """
+
+  async def ask(self, slot, text, choices=None, additional_data={}):
+    super(AsyncRequest, self).ask(slot, text, choices, additional_data)
+
+    await self._client.drain()
+
+  async def show(self, text, cards=None, additional_data={}, terminate=False):
+    super(AsyncRequest, self).show(text, cards, additional_data, terminate)
+
+    await self._client.drain()
+
+  async def terminate(self):
+    super(AsyncRequest, self).terminate()
+
+    await self._client.drain()
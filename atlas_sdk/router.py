@@ -0,0 +1,223 @@
+SINGLE_LEVEL_WILDCARD = '+'
+MULTI_LEVEL_WILDCARD = '#'
+SEPARATOR = '/'
+
+# Prefix of shared subscriptions, messages are then load balanced among subscribers of a group
+SHARED_PREFIX = '$share/'
+
+class Route():
+  """Represents a single subscription with its handler.
+  """
+
+  __slots__ = ('topic', 'mode', 'handler', 'invoke', 'matches')
+
+  def __init__(self, topic, mode, handler, invoke):
+    """Constructs a new route.
+
+    :param topic: Topic filter, may contains wildcards
+    :type topic: str
+    :param mode: How the payload should be decoded (void, raw, json, ...)
+    :type mode: str
+    :param handler: Handler given by the subscriber
+    :type handler: callable
+    :param invoke: Precompiled callable which takes the received message and calls the handler
+    :type invoke: callable
+
+    """
+
+    self.topic = topic
+    self.mode = mode
+    self.handler = handler
+    self.invoke = invoke
+    self.matches = (self,)
+
+  def __str__(self):
+    return 'Route %s (%s)' % (self.topic, self.mode)
+
+class _Node():
+  __slots__ = ('children', 'route')
+
+  def __init__(self):
+    self.children = {}
+    self.route = None
+
+def is_wildcard(topic):
+  """Checks if the given topic filter contains wildcards.
+
+  :param topic: Topic filter
+  :type topic: str
+  :rtype: bool
+
+  """
+
+  return SINGLE_LEVEL_WILDCARD in topic or MULTI_LEVEL_WILDCARD in topic
+
+def shared_topic(group, topic):
+  """Builds a shared subscription topic filter.
+
+  :param group: Share group name, without /, + nor #
+  :type group: str
+  :param topic: Topic filter
+  :type topic: str
+  :rtype: str
+
+  """
+
+  return SHARED_PREFIX + group + SEPARATOR + topic
+
+def split_shared(topic):
+  """Splits a subscription topic filter in its share group, None if not shared, and the
+  filter messages will be matched against.
+
+  :param topic: Subscription topic filter
+  :type topic: str
+  :rtype: tuple
+
+  """
+
+  if not topic.startswith(SHARED_PREFIX):
+    return None, topic
+
+  group, _, topic = topic[len(SHARED_PREFIX):].partition(SEPARATOR)
+
+  return group, topic
+
+class TopicRouter():
+  """Matches topics against subscribed topic filters with MQTT semantics.
+
+  Exact filters live in a dict so the common case is a single lookup. Filters with
+  wildcards are stored in a trie keyed by topic levels, so matching cost depends on
+  the topic depth and not on the number of subscriptions.
+
+  """
+
+  def __init__(self):
+    self._exact = {}
+    self._root = _Node()
+    self._wildcards = 0
+
+  def __len__(self):
+    return len(self._exact) + self._wildcards
+
+  def __iter__(self):
+    yield from self._exact.values()
+    yield from self._iter_wildcards(self._root)
+
+  def _iter_wildcards(self, node):
+    if node.route:
+      yield node.route
+
+    for child in node.children.values():
+      yield from self._iter_wildcards(child)
+
+  def add(self, route):
+    """Adds a route, replacing any route registered for the same topic filter.
+
+    :param route: Route to add
+    :type route: Route
+
+    """
+
+    if not is_wildcard(route.topic):
+      self._exact[route.topic] = route
+      return
+
+    node = self._root
+
+    for level in route.topic.split(SEPARATOR):
+      child = node.children.get(level)
+
+      if not child:
+        child = node.children[level] = _Node()
+
+      node = child
+
+    if not node.route:
+      self._wildcards += 1
+
+    node.route = route
+
+  def remove(self, topic):
+    """Removes the route registered for the given topic filter.
+
+    :param topic: Topic filter
+    :type topic: str
+    :rtype: Route
+
+    """
+
+    if not is_wildcard(topic):
+      return self._exact.pop(topic, None)
+
+    levels = topic.split(SEPARATOR)
+    path = [self._root]
+
+    for level in levels:
+      node = path[-1].children.get(level)
+
+      if not node:
+        return None
+
+      path.append(node)
+
+    route, path[-1].route = path[-1].route, None
+
+    if route:
+      self._wildcards -= 1
+
+    # Prune empty nodes
+    for i in range(len(levels), 0, -1):
+      if path[i].route or path[i].children:
+        break
+
+      del path[i - 1].children[levels[i - 1]]
+
+    return route
+
+  def match(self, topic):
+    """Retrieve routes matching the given topic.
+
+    :param topic: Topic of a received message
+    :type topic: str
+    :rtype: tuple
+
+    """
+
+    exact = self._exact.get(topic)
+
+    if not self._wildcards:
+      return exact.matches if exact else ()
+
+    matches = [exact] if exact else []
+
+    # Per MQTT, topics starting with $ should not be matched by a wildcard on the first level
+    self._match(self._root, topic.split(SEPARATOR), 0, matches, topic.startswith('$'))
+
+    return matches
+
+  def _match(self, node, levels, index, matches, system):
+    children = node.children
+
+    if not system:
+      multi = children.get(MULTI_LEVEL_WILDCARD)
+
+      # `a/#` matches `a`, `a/b` and so on
+      if multi and multi.route:
+        matches.append(multi.route)
+
+    if index == len(levels):
+      if node.route:
+        matches.append(node.route)
+
+      return
+
+    child = children.get(levels[index])
+
+    if child:
+      self._match(child, levels, index + 1, matches, False)
+
+    if not system:
+      child = children.get(SINGLE_LEVEL_WILDCARD)
+
+      if child:
+        self._match(child, levels, index + 1, matches, False)
@@ -0,0 +1,155 @@
+import heapq, itertools, logging, os, random, threading, time
+
+class Timer():
+  """Handle of a delayed call.
+  """
+
+  __slots__ = ('due', 'fn', 'args', 'cancelled')
+
+  def __init__(self, due, fn, args):
+    self.due = due
+    self.fn = fn
+    self.args = args
+    self.cancelled = False
+
+  def cancel(self):
+    """Cancels the call if it has not been made yet.
+    """
+
+    self.cancelled = True
+
+class Scheduler():
+  """Runs delayed calls on a single thread, so many pending calls do not need
+  as many threads.
+  """
+
+  def __init__(self, clock=time.monotonic):
+    """Constructs a new scheduler, its thread is started on the first call.
+
+    :param clock: Function returning the current time in seconds
+    :type clock: callable
+
+    """
+
+    self.log = logging.getLogger('atlas.scheduler')
+
+    self._clock = clock
+    self._cond = threading.Condition()
+    self._heap = []
+    self._counter = itertools.count()
+    self._thread = None
+
+  def __len__(self):
+    return len(self._heap)
+
+  def call_later(self, delay, fn, *args):
+    """Calls the given function after a delay.
+
+    :param delay: Delay in seconds
+    :type delay: float
+    :param fn: Function to call
+    :type fn: callable
+    :rtype: Timer
+
+    """
+
+    timer = Timer(self._clock() + delay, fn, args)
+
+    with self._cond:
+      heapq.heappush(self._heap, (timer.due, next(self._counter), timer))
+
+      if not self._thread:
+        self._thread = threading.Thread(target=self._run, name='atlas-scheduler', daemon=True)
+        self._thread.start()
+
+      # Only wake the thread if this call is the next one
+      if self._heap[0][2] is timer:
+        self._cond.notify()
+
+    return timer
+
+  def _run(self):
+    while True:
+      with self._cond:
+        while not self._heap or self._heap[0][0] > self._clock():
+          self._cond.wait(self._heap[0][0] - self._clock() if self._heap else None)
+
+        _, _, timer = heapq.heappop(self._heap)
+
+      if timer.cancelled:
+        continue
+
+      try:
+        timer.fn(*timer.args)
+      except Exception:
+        self.log.exception('Delayed call to %s failed' % timer.fn)
+
+class Stagger():
+  """Spreads calls over time by adding a random jitter and enforcing a maximum rate.
+
+  It's used to avoid flooding atlas when many clients react to the same event.
+
+  """
+
+  def __init__(self, rate=500, jitter=1.0, clock=time.monotonic):
+    """Constructs a new stagger.
+
+    :param rate: Maximum number of calls per second, 0 for no limit
+    :type rate: float
+    :param jitter: Maximum random delay in seconds added to each call
+    :type jitter: float
+    :param clock: Function returning the current time in seconds
+    :type clock: callable
+
+    """
+
+    self.rate = rate
+    self.jitter = jitter
+
+    self._clock = clock
+    self._lock = threading.Lock()
+    self._next_slot = 0
+
+  def delay(self):
+    """Reserves a slot and retrieve the delay to wait before making the call.
+
+    :rtype: float
+
+    """
+
+    now = self._clock()
+    delay = random.uniform(0, self.jitter) if self.jitter > 0 else 0
+
+    if self.rate > 0:
+      with self._lock:
+        slot = max(now + delay, self._next_slot)
+        self._next_slot = slot + 1 / self.rate
+
+      return slot - now
+
+    return delay
+
+_default = None
+
+def default_scheduler():
+  """Retrieve the scheduler shared by clients of this process.
+
+  :rtype: Scheduler
+
+  """
+
+  global _default
+
+  if _default is None:
+    _default = Scheduler()
+
+  return _default
+
+def _reset_default():
+  global _default
+
+  # Its thread does not exist in a forked process
+  _default = None
+
+if hasattr(os, 'register_at_fork'):
+  os.register_at_fork(after_in_child=_reset_default)
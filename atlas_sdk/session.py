@@ -0,0 +1,213 @@
+"""Conversation state kept by skills between the turns of a dialog, keyed by session id.
+"""
+
+from collections import OrderedDict
+from .codec import default_codec
+from abc import ABC, abstractmethod
+from copy import deepcopy
+import threading, time
+
+class SessionStore(ABC):
+  """Base class of session stores, it counts hits and misses.
+
+  States are plain dicts. A state is loaded when `request.session` is first accessed,
+  saved once the handler returns without raising and deleted when the dialog is terminated.
+
+  """
+
+  def __init__(self, ttl=900, max_sessions=10000, clock=time.time):
+    """Constructs a new session store.
+
+    :param ttl: Seconds a state is kept after its last save
+    :type ttl: float
+    :param max_sessions: Maximum number of states kept, least recently used ones are evicted first
+    :type max_sessions: int
+    :param clock: Function returning the current time in seconds
+    :type clock: callable
+
+    """
+
+    self.ttl = ttl
+    self.max_sessions = max_sessions
+    self.hits = 0
+    self.misses = 0
+
+    self._clock = clock
+    self._lock = threading.Lock()
+
+  @property
+  def hit_rate(self):
+    """Ratio of loads which found a state, None if nothing has been loaded yet.
+
+    :rtype: float
+
+    """
+
+    total = self.hits + self.misses
+
+    return self.hits / total if total else None
+
+  def load(self, sid):
+    """Retrieve the state of a session, a new one if there is none.
+
+    :param sid: Session id
+    :type sid: str
+    :rtype: dict
+
+    """
+
+    state = self._get(sid)
+
+    with self._lock:
+      if state is None:
+        self.misses += 1
+      else:
+        self.hits += 1
+
+    return state if state is not None else {}
+
+  @abstractmethod
+  def _get(self, sid):
+    pass
+
+  @abstractmethod
+  def save(self, sid, state):
+    """Saves the state of a session.
+
+    :param sid: Session id
+    :type sid: str
+    :param state: State to save
+    :type state: dict
+
+    """
+
+  @abstractmethod
+  def delete(self, sid):
+    """Forgets the state of a session.
+
+    :param sid: Session id
+    :type sid: str
+
+    """
+
+class MemorySessionStore(SessionStore):
+  """Keeps states in memory, in a LRU. States are only known by the process which saved
+  them, replicas of a skill should use a SqliteSessionStore.
+
+  Loaded states are copies so changes made by a failed handler are not kept.
+
+  """
+
+  def __init__(self, ttl=900, max_sessions=10000, clock=time.time):
+    super(MemorySessionStore, self).__init__(ttl, max_sessions, clock)
+
+    self._states = OrderedDict()
+
+  def __len__(self):
+    return len(self._states)
+
+  def _get(self, sid):
+    with self._lock:
+      entry = self._states.get(sid)
+
+      if entry is None:
+        return None
+
+      if entry[0] <= self._clock():
+        del self._states[sid]
+        return None
+
+      self._states.move_to_end(sid)
+
+      return deepcopy(entry[1])
+
+  def save(self, sid, state):
+    with self._lock:
+      self._states[sid] = (self._clock() + self.ttl, state)
+      self._states.move_to_end(sid)
+
+      while len(self._states) > self.max_sessions:
+        self._states.popitem(last=False)
+
+  def delete(self, sid):
+    with self._lock:
+      self._states.pop(sid, None)
+
+class SqliteSessionStore(SessionStore):
+  """Keeps states in a local sqlite database so they survive restarts and could be shared
+  by processes of the same host. States are encoded as JSON.
+  """
+
+  # Saves between two purges of expired and exceeding states
+  PURGE_EVERY = 100
+
+  def __init__(self, path, ttl=900, max_sessions=100000, codec=None, clock=time.time):
+    """Constructs a new sqlite session store, the database is opened on first use.
+
+    :param path: Path of the database file
+    :type path: str
+    :param codec: Codec used to encode states, defaults to the fastest one installed
+    :type codec: JsonCodec
+
+    """
+
+    super(SqliteSessionStore, self).__init__(ttl, max_sessions, clock)
+
+    self.path = path
+    self.codec = codec or default_codec()
+
+    self._db = None
+    self._saves = 0
+
+  def _connection(self):
+    """Retrieve the database connection, must be called with the lock held.
+    """
+
+    if self._db is None:
+      import sqlite3 # Only needed when this store is used
+
+      self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+      self._db.execute('PRAGMA journal_mode=WAL')
+      self._db.execute('CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, state BLOB, expires REAL)')
+      self._db.execute('CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)')
+
+    return self._db
+
+  def __len__(self):
+    with self._lock:
+      return self._connection().execute('SELECT COUNT(*) FROM sessions WHERE expires > ?', (self._clock(),)).fetchone()[0]
+
+  def _get(self, sid):
+    with self._lock:
+      row = self._connection().execute('SELECT state FROM sessions WHERE sid = ? AND expires > ?', (sid, self._clock())).fetchone()
+
+    return self.codec.loads(row[0]) if row else None
+
+  def save(self, sid, state):
+    payload = self.codec.dumps(state)
+
+    with self._lock:
+      db = self._connection()
+      now = self._clock()
+
+      db.execute('INSERT OR REPLACE INTO sessions (sid, state, expires) VALUES (?, ?, ?)', (sid, payload, now + self.ttl))
+
+      self._saves += 1
+
+      if self._saves % self.PURGE_EVERY == 0:
+        db.execute('DELETE FROM sessions WHERE expires <= ?', (now,))
+        # Every state has the same ttl so the soonest to expire are the least recently saved
+        db.execute('DELETE FROM sessions WHERE sid IN (SELECT sid FROM sessions ORDER BY expires DESC LIMIT -1 OFFSET ?)', (self.max_sessions,))
+
+  def delete(self, sid):
+    with self._lock:
+      self._connection().execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+  def close(self):
+    """Closes the database connection.
+    """
+
+    with self._lock:
+      if self._db is not None:
+        self._db.close()
+        self._db = None
@@ -1,19 +1,85 @@
-from .client import Client, INTENT_TOPIC, DISCOVERY_PING_TOPIC, DISCOVERY_PONG_TOPIC
-from .request import Request
+from .client import Client, INTENT_TOPIC, DISCOVERY_PING_TOPIC, DISCOVERY_PONG_TOPIC, DISCOVERY_MANIFEST_TOPIC, ASSET_TOPIC
+from .request import Request, ENV_KEY
+from .env import EnvSchema, ENV_DELTA
 from .broker import BrokerConfig
+from .worker_pool import WorkerPool
+from .cache import ResponseCache
+from .assets import AssetRegistry
+from .session import MemorySessionStore
+from .compression import CAPABILITIES_KEY
+from .i18n import Translations, I18N_LOCALE_DIR, I18N_DOMAIN_NAME
+from . import i18n
+from .router import shared_topic
 from .version import __version__, __version_requirements__
-from semantic_version import Version, Spec
-import logging, argparse, sys, json, os, gettext, sys
+import sys, os, random, signal, threading, time
 
-I18N_LOCALE_DIR = 'locale'
-I18N_DOMAIN_NAME = 'messages'
+class _Deadline():
+  """Tracks a request which should be answered before its deadline.
+
+  The request settles once, either because the handler returned or because the deadline
+  passed first.
+
+  """
+
+  __slots__ = ('intent', 'request', 'timer', 'worker', 'done', '_lock')
+
+  def __init__(self, intent, request):
+    self.intent = intent
+    self.request = request
+    self.timer = None
+    self.worker = None
+    self.done = False
+    self._lock = threading.Lock()
+
+  def start(self):
+    """Called when the handler is about to run, returns False if it's already too late.
+    """
+
+    with self._lock:
+      if self.request.expired:
+        return False
+
+      self.worker = threading.current_thread()
+
+      return True
+
+  def finish(self):
+    """Called when the handler has returned.
+    """
+
+    with self._lock:
+      self.done = True
+
+    if self.timer:
+      self.timer.cancel()
+
+  def expire(self, pool=None):
+    """Called when the deadline has passed, the worker running the handler is abandoned.
+
+    :param pool: Pool running the handler
+    :type pool: WorkerPool
+    :rtype: bool
+
+    """
+
+    with self._lock:
+      if self.done or self.request.expired:
+        return False
+
+      self.request.expired = True
+
+      # Inside the lock so the worker could not pick another task in the meantime
+      if pool and self.worker:
+        pool.abandon(self.worker)
+
+      return True
 
 class SkillClient(Client):
   """Main class when you want to describe and register an Atlas skill.
 
   """
   
-  def __init__(self, name, version, author=None, description=None, intents=[], env=[]):
+  def __init__(self, name, version, author=None, description=None, intents=[], env=[], workers=None, codec=None, discovery_jitter=0, retain_manifest=False, metrics=None, transport=None, timeout=None, timeout_message=None, admission=None, share_group=None, response_cache=None, compression=None, sessions=None, offline_buffer=0, env_cache=None):
     """Initialize a new Skill.
 
     :param name: Name of the skill
@@ -28,19 +94,87 @@ class SkillClient(Client):
     :type intents: list
     :param env: List of configuration variables needed by this skill
     :type env: list
+    :param workers: If set, intent handlers will run on this number of threads instead of the network one, requests sharing the same session are still handled in order
+    :type workers: int
+    :param codec: Codec used for JSON payloads
+    :type codec: JsonCodec
+    :param discovery_jitter: Maximum random delay in seconds before answering a discovery ping, spreads responses of many skills
+    :type discovery_jitter: float
+    :param retain_manifest: Wether or not the skill manifest should also be published as a retained message on DISCOVERY_MANIFEST_TOPIC
+    :type retain_manifest: bool
+    :param metrics: Registry where messages and intents handling are recorded
+    :type metrics: Metrics
+    :param transport: Factory creating the transport, defaults to MqttTransport
+    :type transport: callable
+    :param timeout: Default number of seconds handlers have to answer, no limit if not set, handlers then run on a worker thread even if workers is not set
+    :type timeout: float
+    :param timeout_message: Text shown to the user, translated, when a handler did not answer in time, the dialog is terminated anyway
+    :type timeout_message: str
+    :param admission: Limits applied to incoming requests, every request is handled if not set
+    :type admission: AdmissionControl
+    :param share_group: If set, intents are received through shared subscriptions of this group so replicas of the skill, on this node or others, split the load, the broker must support them
+    :type share_group: str
+    :param response_cache: Where responses of cacheable intents are kept, defaults to a ResponseCache of 1000 entries
+    :type response_cache: ResponseCache
+    :param compression: If set, large payloads are compressed once atlas advertised it could read them
+    :type compression: Compression
+    :param sessions: Where session states (request.session) are kept, defaults to a MemorySessionStore which replicas of a share group could not share, give them a SqliteSessionStore
+    :type sessions: SessionStore
+    :param offline_buffer: Maximum number of messages published while disconnected kept to be sent once reconnected, 0 to drop them
+    :type offline_buffer: int
+    :param env_cache: If set, env values are kept per user and atlas is told it only has to send them when they change, not available with a share_group since replicas would not see every change
+    :type env_cache: EnvCache
 
     """
 
-    super(SkillClient, self).__init__(name='sdk')
+    super(SkillClient, self).__init__(name='sdk', codec=codec, metrics=metrics, transport=transport, compression=compression, offline_buffer=offline_buffer)
 
     self.name = name
     self.author = author
     self.version = version
     self.description = description
-    self.intents = intents
-    self.env = env
-    self._version_specs = Spec(__version_requirements__)
-    self._translations = {}
+    self.discovery_jitter = discovery_jitter
+    self.retain_manifest = retain_manifest
+    self.timeout = timeout
+    self.timeout_message = timeout_message
+    self.timeouts = 0
+    self.admission = admission
+    self.share_group = share_group
+    self.env_cache = env_cache
+
+    # Every replica of a share group negotiates with atlas but only one should answer its pings
+    self.answers_pings = True
+    self.response_cache = response_cache if response_cache is not None else ResponseCache()
+    self.assets = AssetRegistry()
+    self.sessions = sessions if sessions is not None else MemorySessionStore()
+    self.env_schema = EnvSchema(env)
+    self._pong_payload = None
+    self._intents = intents
+    self._env = env
+    self._version_specs = None
+    self._checked_version = None
+    self._workers = workers
+    self._pool = None
+    self._ensure_pool()
+    self._env_resync_at = None
+
+    if metrics is not None and self._pool:
+      metrics.gauge('worker_queue_depth', lambda: self._pool.queue_depth, (('skill', name),))
+
+    if metrics is not None and admission:
+      metrics.gauge('intents_in_flight', lambda: admission.in_flight, (('skill', name),))
+
+    if metrics is not None:
+      labels = (('skill', name),)
+      metrics.gauge('intent_cache_entries', lambda: len(self.response_cache), labels)
+
+      metrics.gauge('session_hits', lambda: self.sessions.hits, labels)
+      metrics.gauge('session_misses', lambda: self.sessions.misses, labels)
+
+      if env_cache is not None:
+        metrics.gauge('env_cache_users', lambda: len(env_cache), labels)
+
+    self._check_share_group()
 
     self.log.info('Created skill %s\n\t%s' % (self, '\n\t'.join([s.__str__() for s in self.env])))
     
@@ -49,90 +183,568 @@ class SkillClient(Client):
   def __str__(self):
     return '%s %s - %s' % (self.name, self.version, self.description or 'No description')
 
+  @property
+  def intents(self):
+    return self._intents
+
+  @intents.setter
+  def intents(self, value):
+    self._intents = value
+    self._ensure_pool()
+    self.refresh_manifest()
+
+  @property
+  def env(self):
+    return self._env
+
+  @env.setter
+  def env(self, value):
+    self._env = value
+    self.env_schema = EnvSchema(value)
+
+    # Kept values have been converted with the previous declarations
+    if self.env_cache is not None:
+      self.env_cache.clear()
+
+    self.refresh_manifest()
+
+  def refresh_manifest(self):
+    """Clears the cached manifest so it will be rebuilt on the next pong.
+
+    It's called when assigning intents or env, call it yourself if you mutate
+    them in place.
+
+    """
+
+    self._pong_payload = None
+
+    if self.retain_manifest and self.connected:
+      self._publish_manifest()
+
+  def manifest(self):
+    """Builds the skill manifest sent to atlas.
+
+    :rtype: dict
+
+    """
+
+    manifest = {
+      'name': self.name,
+      'author': self.author,
+      'description': self.description,
+      'version': self.version,
+      'intents': { i.name: [s.name for s in i.slots] for i in self.intents },
+      'env': { e.name: str(e.type) for e in self.env }
+    }
+
+    # Only sent when there is something to advertise so older atlas versions see the same manifest
+    if self.capabilities:
+      manifest[CAPABILITIES_KEY] = self.capabilities
+
+    return manifest
+
+  def _encoded_manifest(self):
+    """Retrieve the encoded manifest, built once until the next refresh_manifest call.
+    """
+
+    payload = self._pong_payload
+
+    if payload is None:
+      payload = self._pong_payload = self.codec.dumps(self.manifest())
+
+    return payload
+
+  def _publish_manifest(self):
+    self.publish(DISCOVERY_MANIFEST_TOPIC % self.name, self._encoded_manifest(), 1, True)
+
+  @property
+  def queue_depth(self):
+    """Number of requests waiting for a worker, always 0 when handlers are called inline.
+
+    :rtype: int
+
+    """
+
+    return self._pool.queue_depth if self._pool else 0
+
+  def start(self, config, threaded=True):
+    # Clears the retained manifest if the skill goes away without saying goodbye, replicas
+    # could not since the others are still there
+    if self.retain_manifest and not self.share_group:
+      self._client.will_set(DISCOVERY_MANIFEST_TOPIC % self.name, None, 1, True)
+
+    # The timeout or share group may have been set after the construction
+    self._check_share_group()
+    self._ensure_pool()
+
+    super(SkillClient, self).start(config, threaded)
+
+  def stop(self):
+    if self.retain_manifest and not self.share_group:
+      self.publish(DISCOVERY_MANIFEST_TOPIC % self.name, None, 1, True)
+
+    super(SkillClient, self).stop()
+
+    if self._pool:
+      self._pool.shutdown()
+
   def _load_translations(self):
-    """Load translations for this skill by using python builtin gettext.
+    """Prepare translations for this skill by using python builtin gettext.
+
+    Catalogs are only loaded when a request for their language is received.
     """
 
     script_dir = sys.path[0]
     locale_dir = os.path.join(script_dir, I18N_LOCALE_DIR)
 
-    self.log.info('Loading translations from %s' % locale_dir)
+    self.log.info('Translations will be loaded from %s' % locale_dir)
+
+    self.translations = Translations(locale_dir, I18N_DOMAIN_NAME)
 
-    if os.path.isdir(locale_dir):
-      for ldir in os.listdir(locale_dir):
-        self._translations[ldir] = gettext.translation(I18N_DOMAIN_NAME, localedir=I18N_LOCALE_DIR, languages=[ldir])
-        self.log.debug('Loaded translations for %s' % ldir)
+    i18n.install()
 
   def on_connect(self, client, userdata, flags, rc):
     super(SkillClient, self).on_connect(client, userdata, flags, rc)
 
+    # Never shared so every replica knows what atlas could read
     self.subscribe_json(DISCOVERY_PING_TOPIC, self.on_discovery_request)
 
-    def make_handler(handler):
-      return lambda d, r: self._on_intent(handler, d, r)
+    def make_handler(intent):
+      return lambda msg: self._on_intent(intent, msg.payload)
 
+    # Intents are subscribed as raw messages so the request only decodes them when needed
     for intent in self.intents:
       topic = INTENT_TOPIC % intent.name  
-      self.subscribe_json(topic, make_handler(intent.handler))
+      self.subscribe_message(self._shared(topic), make_handler(intent))
+
+    if self.retain_manifest:
+      self._publish_manifest()
+
+    self.publish_assets()
 
     # Sends a pong immediately so skill could attach to atlas asap
+    if self.answers_pings:
+      self._pong()
+
+  def publish_assets(self):
+    """Publishes assets registered since the last call as retained messages, so channels
+    could resolve references used in cards. It's called once connected, call it yourself
+    if you register assets later on.
+    """
+
+    for asset in self.assets.unpublished():
+      self.log.debug('Publishing %s' % asset)
+      self.publish(ASSET_TOPIC % asset.digest, asset.content(), 1, True)
+
+  def _shared(self, topic):
+    """Retrieve the topic filter to subscribe to, shared among replicas if a share group is set.
+
+    :param topic: Topic filter
+    :type topic: str
+    :rtype: str
+
+    """
+
+    return shared_topic(self.share_group, topic) if self.share_group else topic
+
+  def _check_share_group(self):
+    """Checks that state kept by this skill could be split among replicas of its share group.
+    """
+
+    if self.share_group and self.env_cache is not None:
+      raise ValueError('An env cache could not be used by replicas of a share group since each one would only see some env changes')
+
+    # Turns of a dialog may reach different replicas
+    if self.share_group and isinstance(self.sessions, MemorySessionStore):
+      self.log.warning('Session states are kept in memory, replicas of group %s will not see the ones saved by the others, use a SqliteSessionStore' % self.share_group)
+
+  def _ensure_pool(self):
+    """Creates the pool handlers run on, if needed.
+
+    Handlers with a deadline always run on a worker, even if no workers were asked for, since
+    the network thread could not send the fallback response while it's stuck in a handler.
+    """
+
+    if self._pool:
+      return
+
+    if not self._workers and (self.timeout or any(i.timeout for i in self.intents)):
+      self._workers = 1
+
+    if self._workers:
+      self._pool = WorkerPool(self._workers, 'atlas-%s' % self.name)
+
+  def _after_fork(self):
+    super(SkillClient, self)._after_fork()
+
+    # Threads of the parent do not exist in the child
+    if self._workers:
+      self._pool = WorkerPool(self._workers, 'atlas-%s' % self.name)
+
+  def _on_intent(self, intent, payload):
+    """Called when an intent handler should be called.
+
+    :param intent: Intent to handle
+    :type intent: Intent
+    :param payload: Raw payload
+    :type payload: bytes
+
+    """
+
+    request = Request(self, None, payload)
+
+    if self.env_cache is not None:
+      self._load_env(request)
+
+    if intent.cache and self._replay_cached(intent, request):
+      return
+
+    if self.admission and not self._admit_request(intent, request):
+      return
+
+    deadline = None
+    timeout = self._timeout_for(intent)
+
+    if timeout:
+      request.deadline = time.monotonic() + timeout
+      deadline = _Deadline(intent, request)
+      deadline.timer = self.call_later(timeout, self._on_deadline, deadline)
+
+    if self._pool:
+      self._pool.submit(request.sid, self._handle, intent, request, deadline)
+    else:
+      self._handle(intent, request, deadline)
+
+  @property
+  def capabilities(self):
+    capabilities = super(SkillClient, self).capabilities
+
+    return capabilities + [ENV_DELTA] if self.env_cache is not None else capabilities
+
+  def _load_env(self, request):
+    """Gives its env to the request, from the cache unless atlas sent a new one.
+
+    :param request: Received request
+    :type request: Request
+
+    """
+
+    uid = request.uid
+    values = request.data.get(ENV_KEY)
+
+    # Atlas only sends env values when they change
+    if values is not None:
+      request._config = self.env_schema.parse(values)
+
+      if uid is not None:
+        self.env_cache.set(uid, request._config)
+
+      return
+
+    config = self.env_cache.get(uid) if uid is not None else None
+
+    if config is None:
+      config = self.env_schema.parse(None)
+      self._env_resync()
+
+    request._config = config
+
+  def _env_resync(self):
+    """Sends a pong, at most once per second, when the env of a user is unknown so atlas
+    forgets what it has sent and sends env values again.
+    """
+
+    now = time.monotonic()
+
+    if self._env_resync_at is not None and now - self._env_resync_at < 1:
+      return
+
+    self._env_resync_at = now
+    self.log.warning('Received a request without env for an unknown user, asking atlas to send them again')
     self._pong()
 
-  def _on_intent(self, handler, data, raw):
-    """Called when a handler should be called.
+  def _replay_cached(self, intent, request):
+    """Replays cached responses if there are some for this request, otherwise the request
+    will record its responses.
+
+    :param intent: Requested intent
+    :type intent: Intent
+    :param request: Received request
+    :type request: Request
+    :returns: True if responses have been replayed and the handler should not be called
+    :rtype: bool
+
+    """
+
+    responses = self.response_cache.get(intent.cache.key(intent, request))
+
+    if self.metrics is not None:
+      self.metrics.inc('intent_cache_hits_total' if responses is not None else 'intent_cache_misses_total', (('intent', intent.name),))
+
+    if responses is None:
+      request.responses = []
+
+      return False
+
+    self.log.debug('Replaying cached responses of intent %s for session %s' % (intent.name, request.sid))
+
+    request.replay(responses)
+
+    return True
+
+  def _cache_responses(self, intent, request):
+    """Keeps responses of a successfully handled request of a cacheable intent.
+
+    :param intent: Handled intent
+    :type intent: Intent
+    :param request: Handled request
+    :type request: Request
+
+    """
+
+    if request.responses and not request.expired:
+      self.response_cache.set(intent.cache.key(intent, request), request.responses, intent.cache.ttl)
+
+  def _admit_request(self, intent, request):
+    """Checks if the request should be handled, if not, a canned response is sent right away.
 
-    :param handler: Handler to call
-    :type handler: callable
-    :param data: JSON data received
-    :type data: dict
-    :param raw: Raw payload
-    :type raw: str
+    :param intent: Requested intent
+    :type intent: Intent
+    :param request: Received request
+    :type request: Request
+    :rtype: bool
 
     """
 
-    # TODO i'm not sure if it's good for the localization part
+    reason = self.admission.admit(request)
+
+    if not reason:
+      return True
+
+    if self.metrics is not None:
+      self.metrics.inc('intents_shed_total', (('intent', intent.name), ('reason', reason)))
+
+    self.log.debug('Shed intent %s for session %s (%s)' % (intent.name, request.sid, reason))
+
+    self.on_shed(intent, request.fallback(), reason)
+
+    return False
+
+  def on_shed(self, intent, request, reason):
+    """Sends the response of a request which will not be handled because of admission
+    limits, override it to customize the response.
+
+    :param intent: Requested intent
+    :type intent: Intent
+    :param request: Request to respond to
+    :type request: Request
+    :param reason: Why it has been shed (in_flight, session or user)
+    :type reason: str
+
+    """
+
+    if self.admission.message:
+      request.show(request._(self.admission.message), terminate=True)
+    else:
+      request.terminate()
+
+  def _timeout_for(self, intent):
+    """Retrieve the number of seconds the intent handler has to answer.
+
+    :param intent: Intent
+    :type intent: Intent
+    :rtype: float
+
+    """
+
+    return intent.timeout if intent.timeout is not None else self.timeout
+
+  def _handle(self, intent, request, deadline=None):
+    """Calls the intent handler with the given request.
+
+    :param intent: Intent to handle
+    :type intent: Intent
+    :param request: Request to handle
+    :type request: Request
+    :param deadline: Deadline of the request if any
+    :type deadline: _Deadline
+
+    """
+
+    # Expired while waiting for a worker, the fallback response has already been sent
+    if deadline and not deadline.start():
+      return
+
+    token = i18n.activate(request.translator)
+    start = time.perf_counter() if self.metrics is not None else None
+    failed = True
+
+    try:
+      result = intent.handler(request)
+      failed = False
+
+      if intent.cache:
+        self._cache_responses(intent, request)
+
+      return result
+    finally:
+      i18n.deactivate(token)
+
+      if not failed:
+        request._save_session()
+
+      if deadline:
+        deadline.finish()
+
+      # An expired request has already been released
+      if self.admission and not request.expired:
+        self.admission.release()
+
+      if start is not None:
+        self._record_intent(intent, time.perf_counter() - start, failed)
+
+  def _on_deadline(self, deadline):
+    """Called when a request deadline has passed.
+
+    :param deadline: Deadline of the request
+    :type deadline: _Deadline
+
+    """
+
+    if deadline.expire(self._pool):
+      self._timed_out(deadline.intent, deadline.request)
+
+  def _timed_out(self, intent, request):
+    """Records a request which did not get an answer in time and sends the fallback response.
+
+    :param intent: Intent being handled
+    :type intent: Intent
+    :param request: Expired request
+    :type request: Request
+
+    """
+
+    self.timeouts += 1
+
+    if self.admission:
+      self.admission.release()
+
+    if self.metrics is not None:
+      self.metrics.inc('intent_timeouts_total', (('intent', intent.name),))
+
+    self.log.warning('Intent %s did not answer in %ss for session %s' % (intent.name, self._timeout_for(intent), request.sid))
 
-    request = Request(self, data, raw)
+    self.on_timeout(intent, request.fallback())
 
-    self._translations.get(request.lang, gettext).install(I18N_DOMAIN_NAME)
+  def on_timeout(self, intent, request):
+    """Sends the response of a request whose handler did not answer in time, override it
+    to customize the fallback response.
 
-    handler(request)
+    :param intent: Intent being handled
+    :type intent: Intent
+    :param request: Request to respond to
+    :type request: Request
+
+    """
+
+    if self.timeout_message:
+      request.show(request._(self.timeout_message), terminate=True)
+    else:
+      request.terminate()
+
+  def _record_intent(self, intent, elapsed, failed):
+    """Records the handling of an intent in the metrics registry.
+
+    :param intent: Handled intent
+    :type intent: Intent
+    :param elapsed: Time spent in the handler, in seconds
+    :type elapsed: float
+    :param failed: Wether or not the handler raised an exception
+    :type failed: bool
+
+    """
+
+    labels = (('intent', intent.name),)
+
+    self.metrics.inc('intents_total', labels)
+    self.metrics.observe('intent_seconds', labels, elapsed)
+
+    if failed:
+      self.metrics.inc('intent_errors_total', labels)
 
   def on_discovery_request(self, data, raw):
     self.log.debug('Discovery request from %s' % data)
 
+    if self.compression:
+      self.negotiate(data.get(CAPABILITIES_KEY))
+
     version_str = data.get('version')
 
-    if version_str:
-      if not self._version_specs.match(Version(version_str)):
-        self.log.warn('atlas version %s did not match skill requirements %s! Things could go wrong!' % (version_str, __version_requirements__))
+    # atlas sends the same version on each ping, no need to check it again
+    if version_str and version_str != self._checked_version:
+      self._checked_version = version_str
 
-    self._pong()
+      if not self._version_matches(version_str):
+        self.log.warning('atlas version %s did not match skill requirements %s! Things could go wrong!' % (version_str, __version_requirements__))
+
+    if not self.answers_pings:
+      return
+
+    if self.discovery_jitter > 0:
+      self.call_later(random.uniform(0, self.discovery_jitter), self._pong)
+    else:
+      self._pong()
+
+  def _version_matches(self, version_str):
+    """Checks if the given atlas version matches the SDK requirements.
+
+    :param version_str: atlas version
+    :type version_str: str
+    :rtype: bool
+
+    """
+
+    from semantic_version import Version, Spec # Only needed once atlas has been discovered
+
+    if not self._version_specs:
+      self._version_specs = Spec(__version_requirements__)
+
+    return self._version_specs.match(Version(version_str))
 
   def _pong(self):
     """Sends a discovery pong.
     """
 
-    self.publish(DISCOVERY_PONG_TOPIC, json.dumps({
-      'name': self.name,
-      'author': self.author,
-      'description': self.description,
-      'version': self.version,
-      'intents': { i.name: [s.name for s in i.slots] for i in self.intents },
-      'env': { e.name: str(e.type) for e in self.env }
-    }))
+    self.publish(DISCOVERY_PONG_TOPIC, self._encoded_manifest())
+
+  def _parse_args(self):
+    """Parses current os args.
+
+    :rtype: argparse.Namespace
 
-  def run(self):
-    """Parses current os args and run the MQTT loop.
     """
 
+    import argparse # Only needed when running from the command line
+
     parser = argparse.ArgumentParser(description='Atlas SDK %s' % __version__)
 
     parser.add_argument('-H', '--host', help='MQTT host address')
     parser.add_argument('-p', '--port', help='MQTT port', type=int)
     parser.add_argument('-u', '--user', help='Username and password for the mqtt in the form user:password')
+    parser.add_argument('-w', '--workers', help='Number of processes to fork, they share intents and discovery pings through shared subscriptions', type=int, default=1)
+
+    return parser.parse_args(sys.argv[1:])
+
+  def _parse_broker_config(self, args=None):
+    """Parses current os args to build the broker configuration.
 
-    args = parser.parse_args(sys.argv[1:])
+    :param args: Already parsed args
+    :type args: argparse.Namespace
+    :rtype: BrokerConfig
+
+    """
+
+    args = args or self._parse_args()
 
     # TODO yeah I know that's a bit ugly
 
@@ -144,9 +756,73 @@ class SkillClient(Client):
       'username': user,
       'password': pwd,
     }
-    
+
+    return BrokerConfig(**{ k: v for k,v in args_dict.items() if v != None })
+
+  def run(self):
+    """Parses current os args and run the MQTT loop, in as many processes as asked.
+    """
+
+    args = self._parse_args()
+    config = self._parse_broker_config(args)
+
+    if args.workers > 1:
+      self._run_replicas(config, args.workers)
+    else:
+      self._run(config)
+
+  def _run(self, config):
     try:
-      self.start(BrokerConfig(**{ k: v for k,v in args_dict.items() if v != None }), False)
+      self.start(config, False)
     except Exception as e:
       self.log.debug(e)
-      self.log.info('Stopping %s' % self.name)
\ No newline at end of file
+      self.log.info('Stopping %s' % self.name)
+
+  def _run_replicas(self, config, count):
+    """Forks the given number of processes, each one running the skill, and waits for them.
+
+    :param config: Broker configuration
+    :type config: BrokerConfig
+    :param count: Number of processes
+    :type count: int
+
+    """
+
+    if not hasattr(os, 'fork'):
+      raise RuntimeError('Running many workers needs os.fork which is not available on this platform')
+
+    if not self.share_group:
+      self.share_group = ''.join('_' if c in '/+#' else c for c in self.name)
+
+    # Fails before forking rather than in every replica
+    self._check_share_group()
+
+    children = []
+
+    for index in range(count):
+      pid = os.fork()
+
+      if pid == 0:
+        try:
+          self.answers_pings = index == 0
+          self._after_fork()
+          self._run(config)
+        except KeyboardInterrupt:
+          pass
+        finally:
+          os._exit(0)
+
+      children.append(pid)
+
+    self.log.info('Started %d workers of %s in group %s' % (count, self.name, self.share_group))
+
+    try:
+      for pid in children:
+        os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+      for pid in children:
+        try:
+          os.kill(pid, signal.SIGTERM)
+          os.waitpid(pid, 0)
+        except OSError:
+          pass # Already gone
@@ -1,3 +1,7 @@
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+import re
+
 class AttrDict(dict):
   """Tiny readonly wrapper around a dict to provide attribute like access.
   """
@@ -12,10 +16,213 @@ class AttrDict(dict):
   def empty(cls):
     return AttrDict({ 'value': None })
 
+# ISO 8601 durations such as P1DT2H or PT30M
+DURATION_RE = re.compile(r'^P(?:(\d+(?:\.\d+)?)W)?(?:(\d+(?:\.\d+)?)D)?(?:T(?:(\d+(?:\.\d+)?)H)?(?:(\d+(?:\.\d+)?)M)?(?:(\d+(?:\.\d+)?)S)?)?$')
+DURATION_KEYS = ('weeks', 'days', 'hours', 'minutes', 'seconds')
+
+_MISSING = object()
+
+def parse_date(value):
+  """Parses a date value as returned by the interpreter.
+
+  :param value: Value to parse
+  :type value: str
+  :rtype: datetime
+
+  """
+
+  try:
+    return datetime.fromisoformat(value)
+  except ValueError:
+    from dateutil.parser import parse # Only needed for non ISO values
+
+    return parse(value)
+
+def parse_number(value):
+  """Parses a number value.
+
+  :param value: Value to parse
+  :type value: str or int or float
+  :rtype: int or float
+
+  """
+
+  if isinstance(value, (int, float)):
+    return value
+
+  try:
+    return int(value)
+  except ValueError:
+    return float(value)
+
+def parse_duration(value):
+  """Parses a duration given as seconds, an ISO 8601 string or a dict with weeks, days,
+  hours, minutes or seconds keys.
+
+  :param value: Value to parse
+  :type value: int or float or str or dict
+  :rtype: timedelta
+
+  """
+
+  if isinstance(value, (int, float)):
+    return timedelta(seconds=value)
+
+  if isinstance(value, dict):
+    return timedelta(**{ k: float(value[k]) for k in DURATION_KEYS if value.get(k) })
+
+  match = DURATION_RE.match(value)
+
+  if not match or not value.strip('PT'):
+    return timedelta(seconds=parse_number(value))
+
+  return timedelta(**{ k: float(v) for k, v in zip(DURATION_KEYS, match.groups()) if v })
+
+class SlotValue(Mapping):
+  """Readonly view over a single slot value with attribute like access.
+
+  Nested dicts are wrapped once and typed values are parsed once, both are then cached
+  in the view. Methods take precedence over keys of the value with the same name, use
+  `value['key']` to reach them.
+
+  It's a mapping so `dict(value)`, `{**value}`, `keys` and `items` work as with a dict and
+  client codecs encode it as one. Use `to_dict` to give it to other JSON libraries.
+
+  """
+
+  __slots__ = ('_data', '_cache')
+
+  def __init__(self, data):
+    """Constructs a new view, the data is not copied.
+
+    :param data: Raw slot value
+    :type data: dict
+
+    """
+
+    _set_data(self, data)
+    _set_cache(self, None)
+
+  def __getattribute__(self, name):
+    # Resolving keys first avoids the costly failed lookup done before calling __getattr__
+    if name not in _OWN_ATTRIBUTES:
+      data = _get_data(self)
+
+      if name in data:
+        value = data[name]
+
+        return _wrap(self, name, value) if type(value) is dict else value
+
+    return object.__getattribute__(self, name)
+
+  def __setattr__(self, name, value):
+    raise AttributeError('Slot values are readonly')
+
+  def __getitem__(self, key):
+    value = _get_data(self)[key]
+
+    return _wrap(self, key, value) if type(value) is dict else value
+
+  def __contains__(self, key):
+    return key in self._data
+
+  def __iter__(self):
+    return iter(self._data)
+
+  def __len__(self):
+    return len(self._data)
+
+  def __eq__(self, other):
+    return self._data == (other._data if isinstance(other, SlotValue) else other)
+
+  def __repr__(self):
+    return 'SlotValue(%r)' % self._data
+
+  def get(self, key, default=None):
+    return self[key] if key in self._data else default
+
+  def to_dict(self):
+    """Retrieve the underlying raw value.
+
+    :rtype: dict
+
+    """
+
+    return self._data
+
+  def as_date(self):
+    """Parses the value as a datetime, None if there is no value.
+
+    :rtype: datetime
+
+    """
+
+    return _cached(self, '__date', lambda: _parse(self, parse_date))
+
+  def as_number(self):
+    """Parses the value as an int or a float, None if there is no value.
+
+    :rtype: int or float
+
+    """
+
+    return _cached(self, '__number', lambda: _parse(self, parse_number))
+
+  def as_duration(self):
+    """Parses the value as a timedelta, None if there is no value.
+
+    :rtype: timedelta
+
+    """
+
+    return _cached(self, '__duration', lambda: _parse(self, parse_duration))
+
+_get_data, _set_data = SlotValue._data.__get__, SlotValue._data.__set__
+_get_cache, _set_cache = SlotValue._cache.__get__, SlotValue._cache.__set__
+_OWN_ATTRIBUTES = frozenset(dir(SlotValue))
+
+def _cached(view, key, factory):
+  """Retrieve a value from the view cache, computing it with the factory if needed.
+  """
+
+  cache = _get_cache(view)
+
+  if cache is None:
+    cache = {}
+    _set_cache(view, cache)
+
+  value = cache.get(key, _MISSING)
+
+  if value is _MISSING:
+    value = cache[key] = factory()
+
+  return value
+
+def _wrap(view, key, value):
+  """Wraps a nested dict in a view, only once per key.
+  """
+
+  return _cached(view, key, lambda: SlotValue(value))
+
+def _parse(view, parser):
+  """Parses the value of a view with the given parser.
+  """
+
+  value = _get_data(view).get('value')
+
+  return parser(value) if value is not None else None
+
+EMPTY_VALUE = SlotValue({ 'value': None })
+
 class SlotData():
   """Represents slot data and exposes some utility methods.
+
+  Views over each value are created once, on first access.
+
   """
 
+  __slots__ = ('data', '_values')
+
   def __init__(self, data=None):
     """Constructs a new slot data from raw slot values.
 
@@ -25,14 +232,44 @@ class SlotData():
     """
 
     self.data = data or []
+    self._values = None
+
+  def values(self):
+    """Retrieve views over every value, values themselves are never copied.
+
+    :rtype: list
+
+    """
+
+    return [self[i] for i in range(len(self.data))]
 
   def __getitem__(self, x):
-    """Retrieve an element at the given index.
+    """Retrieve an element at the given index, its view is created on first access.
 
-    :rtype: AttrDict
+    :param x: Index of the element, or a slice to retrieve a list of them
+    :type x: int or slice
+    :rtype: SlotValue
 
     """
-    return AttrDict(self.data[x])
+
+    if type(x) is slice:
+      return [self[i] for i in range(*x.indices(len(self.data)))]
+
+    values = self._values
+
+    if values is None:
+      values = self._values = [None] * len(self.data)
+
+    value = values[x]
+
+    if value is None:
+      value = values[x] = SlotValue(self.data[x])
+
+    return value
+
+  def __iter__(self):
+    for i in range(len(self.data)):
+      yield self[i]
 
   def __len__(self):
     return len(self.data)
@@ -40,21 +277,21 @@ class SlotData():
   def first(self):
     """Retrieve the first value of a slot.
 
-    If there is no value, an empty AttrDict will be returned.
+    If there is no value, an empty SlotValue will be returned.
 
-    :rtype: AttrDict
+    :rtype: SlotValue
 
     """
 
-    return AttrDict(self.data[0]) if len(self.data) > 0 else AttrDict.empty()
+    return self[0] if self.data else EMPTY_VALUE
 
   def last(self):
     """Retrieve the last value of a slot.
 
-    If there is no value, an empty AttrDict will be returned.
-    
-    :rtype: AttrDict
+    If there is no value, an empty SlotValue will be returned.
+
+    :rtype: SlotValue
 
     """
 
-    return AttrDict(self.data[len(self.data) - 1]) if len(self.data) > 0 else AttrDict.empty()
\ No newline at end of file
+    return self[-1] if self.data else EMPTY_VALUE
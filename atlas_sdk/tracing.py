@@ -0,0 +1,169 @@
+"""Opt-in tracing of user inputs, from the channel to atlas, the skill and back.
+
+A traced input is sent by the channel as JSON with a `__trace` context holding a trace id
+and the list of stages it went through, as `[stage, timestamp]` marks. Each component
+appends its own marks and skills echo the context in their responses, so the channel ends
+up with every timestamp and records them in a sink when its handlers fire.
+
+Timestamps come from the wall clock of each host, per-stage latencies crossing hosts are
+only as good as their clocks synchronization.
+"""
+
+from collections import deque
+from .codec import default_codec
+import os, random, threading, time
+
+TRACE_KEY = '__trace'
+
+def new_trace_id():
+  """Generates a random trace id.
+
+  :rtype: str
+
+  """
+
+  return os.urandom(8).hex()
+
+def mark(trace, stage, timestamp=None):
+  """Retrieve a copy of a trace context with a new mark appended.
+
+  :param trace: Trace context
+  :type trace: dict
+  :param stage: Name of the stage reached
+  :type stage: str
+  :param timestamp: When it has been reached, defaults to now
+  :type timestamp: float
+  :rtype: dict
+
+  """
+
+  return {
+    'id': trace.get('id'),
+    'marks': list(trace.get('marks') or ()) + [[stage, timestamp if timestamp is not None else time.time()]],
+  }
+
+def durations(marks):
+  """Computes the time spent between consecutive marks.
+
+  :param marks: Marks of a trace, as [stage, timestamp] pairs
+  :type marks: list
+  :returns: List of (from stage, to stage, seconds) tuples
+  :rtype: list
+
+  """
+
+  return [(a[0], b[0], b[1] - a[1]) for a, b in zip(marks, marks[1:])]
+
+class MemorySink():
+  """Keeps the last recorded traces in memory.
+  """
+
+  def __init__(self, max_records=10000):
+    """Constructs a new memory sink.
+
+    :param max_records: Maximum number of records kept, oldest ones are dropped first
+    :type max_records: int
+
+    """
+
+    self.records = deque(maxlen=max_records)
+
+  def write(self, record):
+    self.records.append(record)
+
+class JsonLinesSink():
+  """Appends recorded traces to a file, one JSON object per line.
+  """
+
+  def __init__(self, path, codec=None):
+    """Constructs a new JSON lines sink, the file is opened on first write.
+
+    :param path: Path of the file
+    :type path: str
+    :param codec: Codec used to encode records, defaults to the fastest one installed
+    :type codec: JsonCodec
+
+    """
+
+    self.path = path
+    self.codec = codec or default_codec()
+
+    self._file = None
+    self._lock = threading.Lock()
+
+  def write(self, record):
+    line = self.codec.dumps(record)
+
+    if isinstance(line, str):
+      line = line.encode('utf-8')
+
+    with self._lock:
+      if self._file is None:
+        self._file = open(self.path, 'ab')
+
+      self._file.write(line + b'\n')
+      self._file.flush()
+
+  def close(self):
+    """Closes the file.
+    """
+
+    with self._lock:
+      if self._file is not None:
+        self._file.close()
+        self._file = None
+
+class Tracer():
+  """Starts traces of user inputs sent by channels and records them once answered.
+  """
+
+  def __init__(self, sink, sample_rate=1.0):
+    """Constructs a new tracer.
+
+    :param sink: Where traces are recorded, a MemorySink or JsonLinesSink
+    :param sample_rate: Ratio of inputs which should be traced
+    :type sample_rate: float
+
+    """
+
+    self.sink = sink
+    self.sample_rate = sample_rate
+
+  def start(self, stage='channel.parse'):
+    """Starts a new trace, if sampled.
+
+    :param stage: Name of the first stage
+    :type stage: str
+    :returns: A trace context, None if this input should not be traced
+    :rtype: dict
+
+    """
+
+    if self.sample_rate < 1 and random.random() >= self.sample_rate:
+      return None
+
+    return { 'id': new_trace_id(), 'marks': [[stage, time.time()]] }
+
+  def record(self, trace, stage, channel=None):
+    """Records a trace which reached its last stage.
+
+    :param trace: Trace context echoed back, nothing is recorded if it's not a dict
+    :type trace: dict
+    :param stage: Name of the last stage
+    :type stage: str
+    :param channel: Client id of the channel which received it
+    :type channel: str
+
+    """
+
+    if not isinstance(trace, dict):
+      return
+
+    trace = mark(trace, stage)
+
+    self.sink.write({
+      'trace': trace['id'],
+      'channel': channel,
+      'stage': stage,
+      'marks': trace['marks'],
+    })
@@ -0,0 +1,382 @@
+"""Transports carry messages between clients.
+
+A transport exposes the subset of the paho client interface used by clients, so a paho
+client is a transport as is. The loopback transport delivers messages to clients living in
+the same process without any network, broker or serialization.
+
+paho is only imported when MqttTransport is first used.
+"""
+
+from .router import TopicRouter, Route, split_shared
+import itertools, logging, queue, threading
+
+# Same values as paho ones, so results of both transports could be compared to them
+MQTT_ERR_SUCCESS = 0
+MQTT_ERR_NO_CONN = 4
+
+def __getattr__(name):
+  if name != 'MqttTransport':
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+  import paho.mqtt.client as mqtt
+
+  class MqttTransport(mqtt.Client):
+    """Transport over a MQTT broker, this is the paho client itself.
+    """
+
+    # Payloads must be encoded before being published
+    passes_objects = False
+
+  MqttTransport.__qualname__ = name
+  globals()[name] = MqttTransport
+
+  return MqttTransport
+
+class LoopbackMessage():
+  """Message delivered by a loopback transport, mimics paho messages.
+  """
+
+  __slots__ = ('topic', 'payload', 'qos', 'retain')
+
+  def __init__(self, topic, payload, qos=0, retain=False):
+    self.topic = topic
+    self.payload = payload
+    self.qos = qos
+    self.retain = retain
+
+class LoopbackInfo():
+  """Result of a publish, mimics paho MQTTMessageInfo.
+  """
+
+  __slots__ = ('rc', 'mid')
+
+  def __init__(self, rc, mid):
+    self.rc = rc
+    self.mid = mid
+
+def to_payload(payload):
+  """Converts a payload the way paho does before sending it, except for dicts and lists
+  which are given as is to subscribers.
+
+  :param payload: Payload to convert
+  :rtype: bytes or dict or list
+
+  """
+
+  if payload is None:
+    return b''
+
+  if isinstance(payload, (bytes, dict, list)):
+    return payload
+
+  if isinstance(payload, str):
+    return payload.encode('utf-8')
+
+  if isinstance(payload, (int, float)):
+    return str(payload).encode('ascii')
+
+  raise TypeError('payload must be a string, bytearray, int, float, dict, list or None.')
+
+# Marks the end of a transport loop
+_STOP = object()
+
+class LoopbackBroker():
+  """In process broker which routes messages between loopback transports with MQTT topic
+  semantics: wildcards, `$` topics, retained messages and shared subscriptions.
+
+  Each transport has its own queue and thread, as with paho, so handlers of a client are
+  never called from the thread of the publisher.
+
+  """
+
+  def __init__(self):
+    self.log = logging.getLogger('atlas.loopback')
+
+    self._lock = threading.Lock()
+    self._subscriptions = TopicRouter()
+    self._shared = TopicRouter()
+    self._groups = {}
+    self._filters = {}
+    self._retained = {}
+    self._transports = set()
+
+  def transport(self, client_id=None, clean_session=True):
+    """Creates a transport attached to this broker, could be given to clients as their
+    transport factory.
+
+    :param client_id: Client ID
+    :type client_id: str
+    :param clean_session: Not used, sessions are never kept in process
+    :type clean_session: bool
+    :rtype: LoopbackTransport
+
+    """
+
+    return LoopbackTransport(self, client_id)
+
+  def _attach(self, transport):
+    with self._lock:
+      self._transports.add(transport)
+
+  def _detach(self, transport):
+    with self._lock:
+      self._transports.discard(transport)
+
+      for topic in list(self._filters):
+        self._remove_subscriber(topic, transport)
+
+  def subscribe(self, transport, topic):
+    """Subscribes a transport to a topic filter and delivers matching retained messages.
+
+    :param transport: Subscriber
+    :type transport: LoopbackTransport
+    :param topic: Topic filter
+    :type topic: str
+
+    """
+
+    group, shared_filter = split_shared(topic)
+
+    with self._lock:
+      route = self._filters.get(topic)
+
+      # Members of each group are stored in the handler of the route of their filter
+      if group is not None:
+        route = self._groups.get(shared_filter)
+
+        if not route:
+          route = self._groups[shared_filter] = Route(shared_filter, 'groups', {}, None)
+          self._shared.add(route)
+
+        self._filters[topic] = route
+        members = route.handler.setdefault(group, [])
+
+        if transport not in members:
+          members.append(transport)
+
+        # Retained messages are not sent to shared subscriptions
+        return
+
+      # Subscribers are stored as the route handler
+      if not route:
+        route = self._filters[topic] = Route(topic, 'subscribers', {}, None)
+        self._subscriptions.add(route)
+
+      route.handler[transport] = True
+
+      retained = list(self._retained.values())
+
+    if retained:
+      matcher = TopicRouter()
+      matcher.add(Route(topic, 'retained', None, None))
+
+      for msg in retained:
+        if matcher.match(msg.topic):
+          transport._deliver(msg)
+
+  def unsubscribe(self, transport, topic):
+    """Unsubscribes a transport from a topic filter.
+
+    :param transport: Subscriber
+    :type transport: LoopbackTransport
+    :param topic: Topic filter
+    :type topic: str
+
+    """
+
+    with self._lock:
+      self._remove_subscriber(topic, transport)
+
+  def _remove_subscriber(self, topic, transport):
+    route = self._filters.get(topic)
+    group, shared_filter = split_shared(topic)
+
+    if route and group is not None:
+      members = route.handler.get(group, ())
+
+      if transport in members:
+        members.remove(transport)
+
+      if not members:
+        del self._filters[topic]
+        route.handler.pop(group, None)
+
+      if not route.handler:
+        del self._groups[shared_filter]
+        self._shared.remove(shared_filter)
+    elif route:
+      route.handler.pop(transport, None)
+
+      if not route.handler:
+        del self._filters[topic]
+        self._subscriptions.remove(topic)
+
+  def publish(self, topic, payload, qos=0, retain=False):
+    """Delivers a message to every subscriber, once per subscriber even if many of its
+    filters match, and to one member of every matching share group.
+
+    :param topic: Topic of the message
+    :type topic: str
+    :param payload: Converted payload
+    :type payload: bytes or dict or list
+    :param qos: QoS level
+    :type qos: int
+    :param retain: Wether or not the message should be retained
+    :type retain: bool
+
+    """
+
+    msg = LoopbackMessage(topic, payload, qos)
+
+    with self._lock:
+      if retain:
+        if payload == b'':
+          self._retained.pop(topic, None)
+        else:
+          self._retained[topic] = LoopbackMessage(topic, payload, qos, True)
+
+      subscribers = {}
+
+      for route in self._subscriptions.match(topic):
+        subscribers.update(route.handler)
+
+      # Each group gets the message once, its members take turns
+      for route in self._shared.match(topic):
+        for members in route.handler.values():
+          members.append(members.pop(0))
+          subscribers[members[-1]] = True
+
+    for transport in subscribers:
+      transport._deliver(msg)
+
+  def join(self):
+    """Waits until every message published so far, and the ones they led to, have been
+    handled by running transports. Mostly useful in tests.
+    """
+
+    while True:
+      with self._lock:
+        transports = list(self._transports)
+
+      for transport in transports:
+        transport._queue.join()
+
+      if all(not t._queue.unfinished_tasks for t in transports):
+        return
+
+class LoopbackTransport():
+  """Transport attached to a LoopbackBroker.
+
+  Dicts and lists published through it are delivered as is, so they should not be
+  mutated once published nor by subscribers.
+
+  """
+
+  passes_objects = True
+
+  _mids = itertools.count(1)
+
+  def __init__(self, broker, client_id=None):
+    self.broker = broker
+    self.client_id = client_id
+
+    self.on_connect = None
+    self.on_disconnect = None
+    self.on_message = None
+    self.on_publish = None
+
+    self._connected = False
+    self._queue = queue.Queue()
+    self._thread = None
+
+  def username_pw_set(self, username, password=None):
+    pass # No authentication in process
+
+  def will_set(self, topic, payload=None, qos=0, retain=False):
+    pass # In process clients could not vanish without disconnecting
+
+  def reconnect_delay_set(self, min_delay=1, max_delay=120):
+    pass # In process connections could not be lost
+
+  def connect(self, host=None, port=None, keepalive=60):
+    self._connected = True
+    self.broker._attach(self)
+    self._queue.put((self._call, ('on_connect', { 'session present': 0 }, 0)))
+
+    return MQTT_ERR_SUCCESS
+
+  def disconnect(self):
+    if not self._connected:
+      return MQTT_ERR_NO_CONN
+
+    self._connected = False
+    self.broker._detach(self)
+    self._queue.put((self._call, ('on_disconnect', 0)))
+    self._queue.put(_STOP)
+
+    return MQTT_ERR_SUCCESS
+
+  def publish(self, topic, payload=None, qos=0, retain=False):
+    mid = next(self._mids)
+
+    if not self._connected:
+      return LoopbackInfo(MQTT_ERR_NO_CONN, mid)
+
+    self.broker.publish(topic, to_payload(payload), qos, retain)
+
+    # Delivered to every subscriber queue, so it's already acknowledged
+    if self.on_publish:
+      self.on_publish(self, None, mid)
+
+    return LoopbackInfo(MQTT_ERR_SUCCESS, mid)
+
+  def subscribe(self, topic, qos=0):
+    # Many topics could be given at once as a list of (topic, qos), as with paho
+    for t in (topic if isinstance(topic, list) else [(topic, qos)]):
+      self.broker.subscribe(self, t[0])
+
+    return (MQTT_ERR_SUCCESS, next(self._mids))
+
+  def unsubscribe(self, topic):
+    self.broker.unsubscribe(self, topic)
+
+    return (MQTT_ERR_SUCCESS, next(self._mids))
+
+  def loop_start(self):
+    if not self._thread:
+      self._thread = threading.Thread(target=self.loop_forever, name='atlas-loopback-%s' % self.client_id, daemon=True)
+      self._thread.start()
+
+  def loop_stop(self, force=False):
+    thread, self._thread = self._thread, None
+
+    if thread and thread.is_alive() and thread is not threading.current_thread():
+      self._queue.put(_STOP)
+      thread.join()
+
+  def loop_forever(self, *args, **kwargs):
+    """Handles queued events on the calling thread until disconnected.
+    """
+
+    while True:
+      item = self._queue.get()
+
+      try:
+        if item is _STOP:
+          return
+
+        fn, args = item
+        fn(*args)
+      except Exception:
+        self.broker.log.exception('Handler of %s failed' % self.client_id)
+      finally:
+        self._queue.task_done()
+
+  def _deliver(self, msg):
+    self._queue.put((self._call, ('on_message', msg)))
+
+  def _call(self, name, *args):
+    callback = getattr(self, name)
+
+    if callback:
+      callback(self, None, *args)
@@ -1,9 +1,19 @@
+from datetime import datetime, timezone
 import os, base64
 
+# Last parsed timestamp, the same value is commonly parsed by many clients in a row
+_last_timestamp = (None, None)
+
+# Data uris by path, along with the modification time and size of the file they were built from
+_data_uris = {}
+
 def svgs_to_data_uri(files):
   """Converts given files to base64 data uri and make a dictionary where
   keys are filenames.
 
+  Each file is only read again when it has changed. Prefer SkillClient.assets which
+  publishes files once instead of embedding them in every response.
+
   :param files: Files to read
   :type files: list
   :rtype: dict
@@ -15,9 +25,48 @@ def svgs_to_data_uri(files):
   result = {}
 
   for path in files:
-    with open(path, mode='rb') as f:
-      name, _ = os.path.splitext(os.path.basename(path))
+    name, _ = os.path.splitext(os.path.basename(path))
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _data_uris.get(path)
+
+    if not cached or cached[0] != version:
+      with open(path, mode='rb') as f:
+        cached = _data_uris[path] = (version, 'data:image/svg+xml;base64,' + base64.b64encode(f.read()).decode())
+
+    result[name] = cached[1]
+
+  return result
+
+def parse_utc_timestamp(value):
+  """Parses a timestamp and returns it as a naive UTC datetime.
+
+  ISO 8601 strings are parsed without dateutil which is only used as a fallback. The
+  last parsed value is cached since every client of a process receives the same ping.
+
+  :param value: Timestamp to parse
+  :type value: str
+  :rtype: datetime
+
+  """
+
+  global _last_timestamp
+
+  raw, parsed = _last_timestamp
+
+  if raw == value:
+    return parsed
+
+  try:
+    parsed = datetime.fromisoformat(value)
+  except ValueError:
+    from dateutil.parser import parse
+
+    parsed = parse(value)
+
+  if parsed.tzinfo:
+    parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
 
-      result[name] = 'data:image/svg+xml;base64,' + base64.b64encode(f.read()).decode()
+  _last_timestamp = (value, parsed)
 
-  return result
\ No newline at end of file
+  return parsed
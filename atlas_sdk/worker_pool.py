@@ -0,0 +1,213 @@
+from collections import deque
+import logging, threading
+
+class WorkerPool():
+  """Runs tasks on a fixed number of threads while keeping tasks which share the same
+  key in order.
+
+  Each key (commonly a session id) owns its own queue. Only one task per key is running at
+  any given time and keys are served in a round robin fashion so a busy session could not
+  starve the other ones.
+
+  """
+
+  def __init__(self, workers, name='atlas-worker'):
+    """Constructs a new worker pool and starts its threads.
+
+    :param workers: Number of threads to spawn
+    :type workers: int
+    :param name: Prefix used to name threads
+    :type name: str
+
+    """
+
+    if workers < 1:
+      raise ValueError('A worker pool needs at least one worker')
+
+    self.log = logging.getLogger('atlas.workers')
+
+    self.name = name
+    self.abandoned = 0
+
+    self._cond = threading.Condition()
+    self._ready = deque()
+    self._pending = {}
+    self._queued = 0
+    self._active = 0
+    self._stopped = False
+    self._threads = []
+    self._running = {}
+    self._spawned = 0
+
+    for _ in range(workers):
+      self._spawn()
+
+  def _spawn(self):
+    t = threading.Thread(target=self._work, name='%s-%d' % (self.name, self._spawned), daemon=True)
+    self._spawned += 1
+    self._threads.append(t)
+    t.start()
+
+  @property
+  def workers(self):
+    """Number of threads owned by this pool.
+
+    :rtype: int
+
+    """
+
+    return len(self._threads)
+
+  @property
+  def queue_depth(self):
+    """Number of tasks waiting for a worker.
+
+    :rtype: int
+
+    """
+
+    return self._queued
+
+  @property
+  def active(self):
+    """Number of tasks currently running.
+
+    :rtype: int
+
+    """
+
+    return self._active
+
+  @property
+  def sessions(self):
+    """Number of keys with at least one task running or waiting.
+
+    :rtype: int
+
+    """
+
+    return len(self._pending)
+
+  def submit(self, key, fn, *args):
+    """Schedules a task.
+
+    Tasks sharing the same key will be run one after the other in submission order. A key of
+    `None` means the task has no ordering constraint.
+
+    :param key: Ordering key of the task
+    :type key: hashable
+    :param fn: Callable to run
+    :type fn: callable
+
+    """
+
+    if key is None:
+      key = object()
+
+    with self._cond:
+      if self._stopped:
+        raise RuntimeError('Could not submit a task to a stopped worker pool')
+
+      tasks = self._pending.get(key)
+
+      if tasks is None:
+        self._pending[key] = deque([(fn, args)])
+        self._ready.append(key)
+        self._cond.notify()
+      else:
+        tasks.append((fn, args))
+
+      self._queued += 1
+
+  def _work(self):
+    """Worker thread loop.
+    """
+
+    current = threading.current_thread()
+
+    while True:
+      with self._cond:
+        while not self._ready and not self._stopped:
+          self._cond.wait()
+
+        if not self._ready:
+          return
+
+        key = self._ready.popleft()
+        fn, args = self._pending[key].popleft()
+        self._queued -= 1
+        self._active += 1
+        self._running[current] = key
+
+      try:
+        fn(*args)
+      except Exception:
+        self.log.exception('Task %s failed' % fn)
+      finally:
+        with self._cond:
+          # Replaced while running, the key has already been released
+          if self._running.pop(current, None) is None:
+            return
+
+          self._release(key)
+
+  def _release(self, key):
+    """Marks the running task of the given key as done, must be called with the lock held.
+    """
+
+    self._active -= 1
+
+    if self._pending[key]:
+      self._ready.append(key)
+      self._cond.notify()
+    else:
+      del self._pending[key]
+
+  def abandon(self, thread):
+    """Gives up on the task run by the given thread, for example because it's stuck.
+
+    Threads could not be killed so the task keeps running, but a new thread takes its place,
+    next tasks of the same key are not held anymore and the thread will exit once the task
+    returns.
+
+    :param thread: Thread running the task
+    :type thread: threading.Thread
+    :rtype: bool
+
+    """
+
+    with self._cond:
+      key = self._running.pop(thread, None)
+
+      if key is None:
+        return False
+
+      self._threads.remove(thread)
+      self.abandoned += 1
+      self._release(key)
+
+      if not self._stopped:
+        self._spawn()
+
+    self.log.warning('Abandoned task running on %s' % thread.name)
+
+    return True
+
+  def shutdown(self, wait=True):
+    """Stops the pool. Tasks already submitted will still be processed.
+
+    :param wait: Wether or not it should wait for threads to finish
+    :type wait: bool
+
+    """
+
+    with self._cond:
+      self._stopped = True
+      self._cond.notify_all()
+
+    if wait:
+      current = threading.current_thread()
+
+      for t in list(self._threads):
+        if t is not current:
+          t.join()
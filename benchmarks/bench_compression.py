@@ -0,0 +1,72 @@
+"""Measures size and CPU tradeoffs of payload compression on realistic show and ask payloads.
+
+Run it with `python benchmarks/bench_compression.py`, no broker needed. For each payload
+and zlib level, it prints the compressed size and the time needed to compress and
+decompress it, so the threshold and level of a Compression could be chosen for a link.
+"""
+
+import os, sys, timeit, json
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from atlas_sdk.compression import Compression, decompress
+
+NUMBER = 2000
+
+def card(i):
+  return {
+    'media': 'https://cdn.example.com/weather/icons/%s.svg' % ('sunny', 'cloudy', 'rain')[i % 3],
+    'header': '%d°C - %s' % (18 + i, ('Sunny', 'Cloudy', 'Rainy')[i % 3]),
+    'header_link': 'https://www.example.com/forecast/paris/2018-05-%02d' % (1 + i),
+    'subhead': 'Paris, %02d/05/2018' % (1 + i),
+    'text': 'Wind %d km/h from the north west, humidity %d%%, sunrise at 06:%02d and sunset at 21:%02d.' % (10 + i, 60 + i, 10 + i, 30 + i),
+  }
+
+def show(cards):
+  return json.dumps({
+    '__cid': 'c0a8f1e2-4b6d-4e8a-9c3f-2d1e0b9a8c7d',
+    'text': 'Here is the forecast for the next %d days' % cards,
+    'cards': [card(i) for i in range(cards)],
+  }).encode('utf-8')
+
+def ask(choices):
+  return json.dumps({
+    '__cid': 'c0a8f1e2-4b6d-4e8a-9c3f-2d1e0b9a8c7d',
+    'text': 'Which city?',
+    'slot': 'city',
+    'choices': ['%s (%s)' % (name, region) for name, region in (
+      ('Saint-%s-sur-%s' % (a, b), 'Region %d' % i) for i, (a, b) in enumerate(
+        (a, b) for a in ('Martin', 'Jean', 'Pierre', 'Germain', 'Laurent') for b in ('Loire', 'Mer', 'Seine', 'Marne')))][:choices],
+  }).encode('utf-8')
+
+PAYLOADS = [
+  ('show, 1 card', show(1)),
+  ('show, 7 cards', show(7)),
+  ('show, 30 cards', show(30)),
+  ('ask, 20 choices', ask(20)),
+]
+
+def measure(fn):
+  return min(timeit.repeat(fn, number=NUMBER, repeat=3)) / NUMBER * 1e6
+
+if __name__ == '__main__':
+  print('%-18s %7s %5s %8s %7s %12s %14s' % ('payload', 'bytes', 'level', 'zbytes', 'ratio', 'compress µs', 'decompress µs'))
+
+  for name, payload in PAYLOADS:
+    for level in (1, 6, 9):
+      compression = Compression(threshold=0, level=level)
+      compressed = compression.compress(payload)
+
+      if compressed is payload:
+        print('%-18s %7d %5d %8s' % (name, len(payload), level, 'as is'))
+        continue
+
+      print('%-18s %7d %5d %8d %6.0f%% %12.1f %14.1f' % (
+        name,
+        len(payload),
+        level,
+        len(compressed),
+        len(compressed) / len(payload) * 100,
+        measure(lambda: compression.compress(payload)),
+        measure(lambda: decompress(compressed)),
+      ))
@@ -0,0 +1,32 @@
+"""Measures the per request cost of localization.
+
+Run it with `python benchmarks/bench_i18n.py`, no broker needed.
+"""
+
+import os, sys, timeit, gettext
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from atlas_sdk import i18n
+from atlas_sdk.i18n import Translations, I18N_DOMAIN_NAME
+
+LOCALE_DIR = os.path.join(os.path.dirname(__file__), '..', 'example', 'locale')
+NUMBER = 200000
+
+def measure(fn):
+  return min(timeit.repeat(fn, number=NUMBER, repeat=3)) / NUMBER * 1e9
+
+if __name__ == '__main__':
+  # What SkillClient used to do: every catalog loaded upfront and installed on each request
+  catalogs = { l: gettext.translation(I18N_DOMAIN_NAME, localedir=LOCALE_DIR, languages=[l]) for l in ('en', 'fr') }
+
+  def legacy():
+    catalogs.get('fr', gettext).install(I18N_DOMAIN_NAME)
+
+  translations = Translations(LOCALE_DIR)
+
+  def current():
+    i18n.deactivate(i18n.activate(translations.get('fr')))
+
+  print('%-32s %10.0f ns/op' % ('gettext.install per request', measure(legacy)))
+  print('%-32s %10.0f ns/op' % ('cached translator activation', measure(current)))
@@ -0,0 +1,62 @@
+"""Measures how long importing the SDK takes and which heavy dependencies it loads.
+
+Run it with `python benchmarks/bench_import.py`. Each statement runs in a fresh interpreter
+with `-X importtime`, the best of a few runs is kept.
+"""
+
+import os, subprocess, sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+STATEMENTS = [
+  'import atlas_sdk',
+  'from atlas_sdk import ChannelClient',
+  'from atlas_sdk import SkillClient',
+  'from atlas_sdk import AsyncSkillClient',
+]
+
+# Dependencies which should only be imported when actually used
+HEAVY_MODULES = ('paho', 'semantic_version', 'dateutil', 'argparse', 'gettext', 'asyncio')
+
+REPEAT = 5
+
+def import_time(statement):
+  """Retrieve the time spent importing atlas_sdk modules in microseconds, with the heavy
+  modules loaded by the statement.
+
+  :param statement: Python statement to run
+  :type statement: str
+  :rtype: tuple
+
+  """
+
+  code = '%s\nimport sys\nprint(",".join(m for m in %r if m in sys.modules))' % (statement, HEAVY_MODULES)
+  result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+    cwd=ROOT, capture_output=True, text=True, check=True)
+
+  total = 0
+
+  for line in result.stderr.splitlines():
+    if not line.startswith('import time:') or 'self [us]' in line:
+      continue
+
+    _, cumulative, name = line.split('|')
+
+    # Only top level imports, nested ones are already in their parent cumulative time
+    if name.startswith(' atlas_sdk'):
+      total += int(cumulative)
+
+  loaded = result.stdout.strip()
+
+  return total, loaded.split(',') if loaded else []
+
+def best_import_time(statement, repeat=REPEAT):
+  runs = [import_time(statement) for _ in range(repeat)]
+
+  return min(t for t, _ in runs), runs[0][1]
+
+if __name__ == '__main__':
+  for statement in STATEMENTS:
+    total, loaded = best_import_time(statement)
+
+    print('%-40s %8.1f ms   heavy modules: %s' % (statement, total / 1000, ', '.join(loaded) or '-'))
@@ -0,0 +1,54 @@
+"""Measures Client.on_message dispatch cost as the number of subscriptions grows.
+
+Run it with `python benchmarks/bench_router.py`, no broker needed.
+"""
+
+import os, sys, timeit, logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from collections import namedtuple
+from atlas_sdk.client import Client, INTENT_TOPIC, CHANNEL_SHOW_TOPIC
+
+Message = namedtuple('Message', ['topic', 'payload'])
+
+SIZES = [10, 100, 1000, 10000, 50000]
+NUMBER = 100000
+
+def noop(*args):
+  pass
+
+def build(size, wildcards):
+  client = Client('bench')
+  client.log.setLevel(logging.ERROR)
+
+  for i in range(size):
+    client.subscribe_void(INTENT_TOPIC % ('intent_%d' % i), noop)
+
+    # As many wildcard filters to grow the trie too
+    if wildcards:
+      client.subscribe_message('atlas/+/custom_%d' % i, noop)
+
+  if wildcards:
+    client.subscribe_message(CHANNEL_SHOW_TOPIC % '+', noop)
+
+  return client
+
+def measure(client, topic):
+  msg = Message(topic, b'')
+  return min(timeit.repeat(lambda: client.on_message(None, None, msg), number=NUMBER, repeat=3)) / NUMBER * 1e9
+
+if __name__ == '__main__':
+  print('%12s %16s %16s %16s' % ('subscriptions', 'exact (ns/op)', 'exact+wc (ns/op)', 'wildcard (ns/op)'))
+
+  for size in SIZES:
+    exact = build(size, False)
+    mixed = build(size, True)
+    topic = INTENT_TOPIC % ('intent_%d' % (size // 2))
+
+    print('%12d %16.0f %16.0f %16.0f' % (
+      size,
+      measure(exact, topic),
+      measure(mixed, topic),
+      measure(mixed, CHANNEL_SHOW_TOPIC % 'a_session'),
+    ))
@@ -0,0 +1,56 @@
+"""Compares slot values access against the former AttrDict copying implementation.
+
+Run it with `python benchmarks/bench_slot_data.py`, no broker needed.
+"""
+
+import os, sys, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from atlas_sdk.slot_data import AttrDict, SlotData
+
+NUMBER = 100000
+
+VALUES = [
+  { 'value': '2018-05-25T10:30:00', 'grain': 'day', 'meta': { 'source': 'duckling', 'confidence': 0.9 } },
+  { 'value': '2018-05-26T10:30:00', 'grain': 'day', 'meta': { 'source': 'duckling', 'confidence': 0.8 } },
+  { 'value': '2018-05-27T10:30:00', 'grain': 'day', 'meta': { 'source': 'duckling', 'confidence': 0.7 } },
+]
+
+class LegacySlotData():
+  """Slot data as implemented before views, every access copies the value.
+  """
+
+  def __init__(self, data=None):
+    self.data = data or []
+
+  def __getitem__(self, x):
+    return AttrDict(self.data[x])
+
+  def __len__(self):
+    return len(self.data)
+
+  def first(self):
+    return AttrDict(self.data[0]) if len(self.data) > 0 else AttrDict.empty()
+
+def measure(fn):
+  return min(timeit.repeat(fn, number=NUMBER, repeat=3)) / NUMBER * 1e9
+
+def walk(data):
+  for i in range(len(data)):
+    data[i].value
+    data[i].meta.confidence
+
+if __name__ == '__main__':
+  legacy = LegacySlotData(VALUES)
+  current = SlotData(VALUES)
+
+  for name, fn_legacy, fn_current in [
+    ('first().value', lambda: legacy.first().value, lambda: current.first().value),
+    ('nested first().meta.source', lambda: legacy.first().meta.source, lambda: current.first().meta.source),
+    ('walk all values', lambda: walk(legacy), lambda: walk(current)),
+    ('construct + first().value', lambda: LegacySlotData(VALUES).first().value, lambda: SlotData(VALUES).first().value),
+  ]:
+    print('%-28s legacy %8.0f ns/op   current %8.0f ns/op' % (name, measure(fn_legacy), measure(fn_current)))
+
+  print('%-28s current %7.0f ns/op' % ('cached as_date()', measure(lambda: current.first().as_date())))
@@ -0,0 +1,245 @@
+"""Measures the SDK hot paths, no broker needed.
+
+Run it with `python benchmarks/suite.py`. Each case prints its cost in ns/op and the peak
+memory allocated by a single operation.
+
+Results could be saved and later compared to catch regressions:
+
+    python benchmarks/suite.py --save baseline.json
+    python benchmarks/suite.py --compare baseline.json --threshold 0.2
+
+When comparing, the exit code is 1 if a case is slower than the baseline by more than the
+threshold.
+"""
+
+import os, sys, timeit, tracemalloc, argparse, json, logging, platform
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from collections import namedtuple
+from atlas_sdk import SkillClient, ChannelClient, Intent, Slot, Env
+from atlas_sdk.client import Client, INTENT_TOPIC, CHANNEL_SHOW_TOPIC, DISCOVERY_PING_TOPIC
+from atlas_sdk.compression import Compression, ZLIB
+from atlas_sdk.request import Request
+from atlas_sdk.slot_data import SlotData
+
+Message = namedtuple('Message', ['topic', 'payload'])
+Info = namedtuple('Info', ['rc'])
+
+# Representative intent payload, with every header, env and a multi values slot
+INTENT_DATA = {
+  '__cid': 'c0a8f1e2-4b6d-4e8a-9c3f-2d1e0b9a8c7d',
+  '__sid': '5f2e8d1c-3a4b-4c6d-8e9f-0a1b2c3d4e5f',
+  '__uid': '9e8d7c6b-5a4f-4e3d-2c1b-0a9f8e7d6c5b',
+  '__lang': 'fr',
+  '__version': '1.0.0',
+  '__env': { 'API_KEY': 'a-secret-key', 'UNITS': 'metric', 'TIMEOUT': '30' },
+  'date': [
+    { 'value': '2018-05-25T10:30:00', 'grain': 'day', 'meta': { 'source': 'duckling', 'confidence': 0.9 } },
+    { 'value': '2018-05-26T10:30:00', 'grain': 'day', 'meta': { 'source': 'duckling', 'confidence': 0.8 } },
+    { 'value': '2018-05-27T10:30:00', 'grain': 'day', 'meta': { 'source': 'duckling', 'confidence': 0.7 } },
+  ],
+  'city': [
+    { 'value': 'Paris' },
+    { 'value': 'Lyon' },
+  ],
+}
+
+NUMBER = 20000
+REPEAT = 5
+
+class NullMQTT():
+  """Stands for a paho client, published messages go nowhere.
+  """
+
+  OK = Info(0)
+
+  def publish(self, topic, payload=None, qos=0, retain=False):
+    return self.OK
+
+  def subscribe(self, topic, qos=0):
+    return (0, 1)
+
+  def will_set(self, topic, payload=None, qos=0, retain=False):
+    pass
+
+def quiet(client):
+  client.log.setLevel(logging.ERROR)
+  client._client = NullMQTT()
+  return client
+
+def noop(*args):
+  pass
+
+def walk(slot):
+  for value in slot:
+    value.value
+    value.meta.confidence
+
+def build_cases():
+  """Builds benchmark cases as a list of (name, callable).
+  """
+
+  payload = json.dumps(INTENT_DATA).encode('utf-8')
+
+  skill = quiet(SkillClient('bench', '1.0.0', intents=[
+    Intent('weather', noop, [Slot('date'), Slot('city')]),
+  ], env=[Env('API_KEY'), Env('UNITS'), Env('TIMEOUT')]))
+  skill.on_connect(None, None, None, 0)
+
+  intent_msg = Message(INTENT_TOPIC % 'weather', payload)
+
+  json_client = quiet(Client('bench'))
+  json_client.subscribe_json(CHANNEL_SHOW_TOPIC % '+', noop)
+  show_msg = Message(CHANNEL_SHOW_TOPIC % 'a_session', b'{"text": "It will be sunny", "cards": null, "__cid": "c0a8f1e2"}')
+
+  channel = quiet(ChannelClient('bench_channel', 'a_user', on_show=noop))
+  channel.on_connect(None, None, None, 0)
+  ping_msg = Message(DISCOVERY_PING_TOPIC, b'{"version": "2.0.0", "started_at": "2018-01-01T00:00:00Z"}')
+
+  request = Request(skill, None, payload)
+  request.data # Already decoded so only serialization is measured
+
+  slot = SlotData(INTENT_DATA['date'])
+
+  # Seven cards, as a week of forecast
+  cards = [{ 'media': 'https://cdn.example.com/icons/sunny.svg', 'header': '%d°C' % (18 + i), 'subhead': 'Paris, day %d' % i, 'text': 'Wind 10 km/h, humidity 60%%' } for i in range(7)]
+
+  compressed_client = quiet(Client('bench_compressed', compression=Compression(threshold=0)))
+  compressed_client.negotiate([ZLIB])
+  compressed_client.subscribe_json(CHANNEL_SHOW_TOPIC % '+', noop)
+  compressed_show = Compression(threshold=0).compress(json.dumps({ '__cid': 'c0a8f1e2', 'text': 'Forecast', 'cards': cards }).encode('utf-8'))
+
+  class CompressedMessage():
+    topic = CHANNEL_SHOW_TOPIC % 'a_session'
+
+    @property
+    def payload(self):
+      return compressed_show
+
+    @payload.setter
+    def payload(self, value):
+      pass # Decompressed again on every run
+
+  def uncached_pong():
+    skill._pong_payload = None
+    skill._pong()
+
+  return [
+    ('on_message.intent', lambda: skill.on_message(None, None, intent_msg)),
+    ('on_message.json', lambda: json_client.on_message(None, None, show_msg)),
+    ('request.decode', lambda: Request(skill, None, payload).data),
+    ('request.slot', lambda: walk(Request(skill, None, payload).slot('date'))),
+    ('request.env', lambda: Request(skill, None, payload).env('UNITS')),
+    ('slot_data.first', lambda: slot.first().value),
+    ('slot_data.walk', lambda: walk(slot)),
+    ('request.ask', lambda: request.ask('city', 'Which city?', additional_data={})),
+    ('request.show', lambda: request.show('It will be sunny', { 'header': 'Paris' }, additional_data={})),
+    ('request.show_terminate', lambda: request.show('It will be sunny', additional_data={}, terminate=True)),
+    ('publish.compressed', lambda: compressed_client.publish_json(CHANNEL_SHOW_TOPIC % 'a_session', { '__cid': 'c0a8f1e2', 'text': 'Forecast', 'cards': cards })),
+    ('on_message.compressed', lambda: json_client.on_message(None, None, CompressedMessage())),
+    ('skill.pong', skill._pong),
+    ('skill.pong_uncached', uncached_pong),
+    ('channel.ping', lambda: channel.on_message(None, None, ping_msg)),
+  ]
+
+def measure_time(fn, number=NUMBER, repeat=REPEAT):
+  """Retrieve the best time per call in nanoseconds.
+  """
+
+  return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e9
+
+def measure_memory(fn, repeat=REPEAT):
+  """Retrieve the lowest peak of memory, in bytes, allocated while making a single call.
+  """
+
+  fn() # Warm caches so only the steady state is measured
+
+  tracemalloc.start()
+
+  try:
+    peaks = []
+
+    for _ in range(repeat):
+      current, _ = tracemalloc.get_traced_memory()
+      tracemalloc.reset_peak()
+      fn()
+      peaks.append(tracemalloc.get_traced_memory()[1] - current)
+
+    return min(peaks)
+  finally:
+    tracemalloc.stop()
+
+def run(cases, number=NUMBER, pattern=None):
+  """Runs the given cases and retrieve results keyed by case name.
+  """
+
+  results = {}
+
+  for name, fn in cases:
+    if pattern and pattern not in name:
+      continue
+
+    results[name] = {
+      'ns_op': measure_time(fn, number),
+      'bytes_op': measure_memory(fn),
+    }
+
+  return results
+
+def compare(results, baseline, threshold):
+  """Prints results against a baseline and retrieve names of cases which regressed.
+  """
+
+  regressions = []
+
+  print('%-24s %12s %12s %9s %10s' % ('case', 'ns/op', 'baseline', 'delta', 'peak B/op'))
+
+  for name, result in results.items():
+    base = baseline.get(name)
+
+    if not base:
+      print('%-24s %12.0f %12s %9s %10d' % (name, result['ns_op'], '-', '-', result['bytes_op']))
+      continue
+
+    delta = result['ns_op'] / base['ns_op'] - 1
+    flag = ''
+
+    if delta > threshold:
+      regressions.append(name)
+      flag = ' <- regression'
+
+    print('%-24s %12.0f %12.0f %+8.1f%% %10d%s' % (name, result['ns_op'], base['ns_op'], delta * 100, result['bytes_op'], flag))
+
+  return regressions
+
+def main(argv):
+  parser = argparse.ArgumentParser(description='Atlas SDK microbenchmarks')
+
+  parser.add_argument('-k', '--filter', help='Only run cases whose name contains this string')
+  parser.add_argument('-n', '--number', help='Calls per measure', type=int, default=NUMBER)
+  parser.add_argument('--save', help='Saves results to this JSON file')
+  parser.add_argument('--compare', help='Compares results to this JSON file')
+  parser.add_argument('--threshold', help='Slowdown ratio above which a case is a regression', type=float, default=0.2)
+
+  args = parser.parse_args(argv)
+  results = run(build_cases(), args.number, args.filter)
+  regressions = []
+
+  if args.compare:
+    with open(args.compare) as f:
+      regressions = compare(results, json.load(f)['results'], args.threshold)
+  else:
+    print('%-24s %12s %10s' % ('case', 'ns/op', 'peak B/op'))
+
+    for name, result in results.items():
+      print('%-24s %12.0f %10d' % (name, result['ns_op'], result['bytes_op']))
+
+  if args.save:
+    with open(args.save, 'w') as f:
+      json.dump({ 'python': platform.python_version(), 'results': results }, f, indent=2)
+
+  return 1 if regressions else 0
+
+if __name__ == '__main__':
+  sys.exit(main(sys.argv[1:]))
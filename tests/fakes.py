@@ -0,0 +1,42 @@
+from collections import namedtuple
+
+Info = namedtuple('Info', ['rc'])
+
+class FakeMQTT():
+  """Stands for a paho client and records published messages without any connection.
+  """
+
+  def __init__(self):
+    self.published = []
+    self.rc = 0
+
+  def publish(self, topic, payload=None, qos=0, retain=False):
+    self.published.append((topic, payload, qos))
+    return Info(self.rc)
+
+  def subscribe(self, topic, qos=0):
+    return (0, 1)
+
+  def will_set(self, topic, payload=None, qos=0, retain=False):
+    pass
+
+  def reconnect_delay_set(self, min_delay=1, max_delay=120):
+    pass
+
+class Message():
+  """Stands for a message received by a paho client.
+  """
+
+  def __init__(self, topic, payload):
+    self.topic = topic
+    self.payload = payload
+
+class Clock():
+  """Clock whose time only moves when tests set it, to be given as the clock of stores and limiters.
+  """
+
+  def __init__(self):
+    self.now = 0
+
+  def __call__(self):
+    return self.now
@@ -0,0 +1,75 @@
+import unittest, json
+from atlas_sdk import SkillClient, Intent
+from atlas_sdk.admission import AdmissionControl, RateLimiter, SHED_IN_FLIGHT, SHED_SESSION, SHED_USER, SHED_MESSAGE
+from atlas_sdk.client import INTENT_TOPIC
+from atlas_sdk.request import Request
+from fakes import FakeMQTT, Message, Clock
+
+def request(sid='s1', uid='u1'):
+  return Request(None, { '__sid': sid, '__uid': uid }, None)
+
+class TestAdmission(unittest.TestCase):
+
+  def test_rate_limiter(self):
+    clock = Clock()
+    limiter = RateLimiter(2, burst=3, max_keys=2, clock=clock)
+
+    self.assertEqual([True, True, True, False], [limiter.allow('a') for _ in range(4)])
+
+    clock.now = 0.5
+
+    self.assertEqual([True, False], [limiter.allow('a') for _ in range(2)])
+
+    limiter.allow('b')
+    limiter.allow('c')
+
+    self.assertEqual(2, len(limiter))
+    self.assertTrue(limiter.allow('a')) # Forgotten, so full again
+
+  def test_limits(self):
+    clock = Clock()
+    admission = AdmissionControl(max_in_flight=3, session_rate=1, user_rate=2, clock=clock)
+
+    self.assertIsNone(admission.admit(request('s1', 'u1')))
+    self.assertEqual(SHED_SESSION, admission.admit(request('s1', 'u1')))
+    self.assertIsNone(admission.admit(request('s2', 'u1')))
+    self.assertEqual(SHED_USER, admission.admit(request('s3', 'u1')))
+    self.assertIsNone(admission.admit(request('s4', 'u2')))
+    self.assertEqual(SHED_IN_FLIGHT, admission.admit(request('s5', 'u3')))
+
+    admission.release()
+
+    self.assertIsNone(admission.admit(request('s5', 'u3')))
+    self.assertEqual({ SHED_SESSION: 1, SHED_USER: 1, SHED_IN_FLIGHT: 1 }, admission.shed)
+    self.assertEqual(4, admission.admitted)
+    self.assertEqual(3, admission.in_flight)
+
+  def test_skill_sends_canned_reply(self):
+    handled = []
+    skill = SkillClient('test', '1.0.0', intents=[Intent('echo', handled.append)],
+      admission=AdmissionControl(session_rate=1, message='Slow down'))
+    skill._client = FakeMQTT()
+    skill.on_connect(None, None, None, 0)
+
+    for _ in range(3):
+      skill.on_message(None, None, Message(INTENT_TOPIC % 'echo', b'{"__cid": "c1", "__sid": "s1"}'))
+
+    replies = [p for t, p, _ in skill._client.published if t == 'atlas/s1/dialog/show']
+
+    self.assertEqual(1, len(handled))
+    self.assertEqual(2, len(replies))
+    self.assertIn(b'Slow down', replies[0] if isinstance(replies[0], bytes) else replies[0].encode())
+    self.assertEqual(0, skill.admission.in_flight)
+
+  def test_canned_reply_by_default(self):
+    skill = SkillClient('test', '1.0.0', intents=[Intent('echo', lambda r: None)], admission=AdmissionControl(session_rate=1))
+    skill._client = FakeMQTT()
+    skill.on_connect(None, None, None, 0)
+
+    for _ in range(2):
+      skill.on_message(None, None, Message(INTENT_TOPIC % 'echo', b'{"__cid": "c1", "__sid": "s1"}'))
+
+    replies = [json.loads(p) for t, p, _ in skill._client.published if t == 'atlas/s1/dialog/show']
+
+    self.assertEqual([SHED_MESSAGE], [r['text'] for r in replies])
+    self.assertIn('atlas/s1/dialog/terminate', [t for t, _, _ in skill._client.published])
@@ -0,0 +1,82 @@
+import unittest, os, tempfile, mmap
+from atlas_sdk import SkillClient, ChannelClient, Intent, BrokerConfig
+from atlas_sdk.assets import AssetRegistry, AssetCache, MMAP_THRESHOLD
+from atlas_sdk.client import INTENT_TOPIC
+from atlas_sdk.transport import LoopbackBroker
+from atlas_sdk.utils import svgs_to_data_uri
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg"/>'
+
+class TestAssets(unittest.TestCase):
+
+  def setUp(self):
+    self.dir = tempfile.TemporaryDirectory()
+    self.clients = []
+
+  def tearDown(self):
+    for client in self.clients:
+      client.stop()
+
+    self.dir.cleanup()
+
+  def write(self, name, content):
+    path = os.path.join(self.dir.name, name)
+
+    with open(path, 'wb') as f:
+      f.write(content)
+
+    return path
+
+  def test_registry(self):
+    registry = AssetRegistry()
+    small = self.write('icon.svg', SVG)
+    big = self.write('photo.png', b'x' * MMAP_THRESHOLD)
+
+    icon = registry.add(small)
+
+    self.assertIs(icon, registry.add(small))
+    self.assertEqual('icon', icon.name)
+    self.assertTrue(icon.uri.startswith('atlas-asset:') and icon.uri.endswith('.svg'))
+    self.assertIsInstance(registry.add(big).data, mmap.mmap)
+    self.assertEqual(b'x' * MMAP_THRESHOLD, registry.add(big).content())
+    self.assertEqual({ 'icon': icon.uri }, registry.uris(small))
+    self.assertEqual(2, len(registry.unpublished()))
+    self.assertEqual([], registry.unpublished())
+
+  def test_data_uris_are_cached(self):
+    path = self.write('icon.svg', SVG)
+    first = svgs_to_data_uri(path)
+
+    self.assertIs(first['icon'], svgs_to_data_uri([path])['icon'])
+
+    self.write('icon.svg', SVG + b' ')
+
+    self.assertNotEqual(first['icon'], svgs_to_data_uri(path)['icon'])
+
+  def test_channel_resolves_references(self):
+    broker = LoopbackBroker()
+    shown = []
+
+    def handler(request):
+      request.show('Here it is', cards={ 'media': icons['icon'] }, terminate=True)
+
+    skill = SkillClient('test', '1.0.0', intents=[Intent('icon', handler)], transport=broker.transport)
+    icons = skill.assets.uris(self.write('icon.svg', SVG))
+    assets = AssetCache()
+    channel = ChannelClient('c1', 'u1', on_show=lambda data, raw: shown.append(assets.resolve(data)), assets=assets, transport=broker.transport)
+
+    for client in (skill, channel):
+      client.start(BrokerConfig())
+      self.clients.append(client)
+      broker.join()
+
+    self.assertEqual(SVG, assets.get(icons['icon']))
+
+    # Stands for atlas forwarding the skill response to the channel
+    skill.subscribe_json('atlas/c1/dialog/show', lambda data, raw: channel.publish_json(channel.CHANNEL_SHOW_TOPIC, data))
+    broker.join()
+
+    skill.publish_json(INTENT_TOPIC % 'icon', { '__cid': 'c1', '__sid': 'c1' })
+    broker.join()
+
+    self.assertEqual(svgs_to_data_uri(os.path.join(self.dir.name, 'icon.svg'))['icon'], shown[0]['cards'][0]['media'])
@@ -0,0 +1,26 @@
+import unittest, asyncio
+from atlas_sdk.async_client import AsyncClient
+
+class TestAsyncClient(unittest.TestCase):
+
+  def test_spawn_keep_order_per_key(self):
+    client = AsyncClient('test')
+    results = []
+
+    async def task(key, i, delay):
+      await asyncio.sleep(delay)
+      results.append((key, i))
+
+    async def run():
+      client._loop = asyncio.get_running_loop()
+
+      client.spawn(task('a', 1, 0.02), 'a')
+      client.spawn(task('b', 1, 0.01), 'b')
+      client.spawn(task('a', 2, 0), 'a')
+
+      await asyncio.gather(*client.tasks)
+
+    asyncio.run(run())
+
+    self.assertEqual([('b', 1), ('a', 1), ('a', 2)], results)
+    self.assertEqual(0, len(client.tasks))
@@ -0,0 +1,51 @@
+import unittest, asyncio
+from atlas_sdk import AsyncSkillClient, Intent, BrokerConfig
+from atlas_sdk.client import Client, INTENT_TOPIC, DIALOG_SHOW_TOPIC
+from atlas_sdk.transport import LoopbackBroker
+
+class TestAsyncSkillClient(unittest.TestCase):
+
+  def test_both_kinds_of_handler(self):
+    broker = LoopbackBroker()
+
+    async def greet(request):
+      await asyncio.sleep(0)
+      await request.show('async', terminate=True)
+
+    def echo(request):
+      request.show('sync', terminate=True) # Not awaited, it's a plain Request
+
+    skill = AsyncSkillClient('test', '1.0.0', intents=[Intent('greet', greet), Intent('echo', echo)], transport=broker.transport)
+    atlas = Client('atlas', transport=broker.transport)
+    atlas.start(BrokerConfig())
+    broker.join()
+
+    shows = []
+    atlas.subscribe_json(DIALOG_SHOW_TOPIC % '+', lambda data, raw: shows.append(data['text']))
+    broker.join()
+
+    async def wait_for(predicate):
+      for _ in range(200):
+        if predicate():
+          return
+
+        await asyncio.sleep(0.01)
+
+    async def run():
+      await skill.start(BrokerConfig())
+      await wait_for(lambda: skill.connected)
+
+      atlas.publish_json(INTENT_TOPIC % 'greet', { '__cid': 'c1', '__sid': 's1' })
+      atlas.publish_json(INTENT_TOPIC % 'echo', { '__cid': 'c2', '__sid': 's2' })
+
+      await wait_for(lambda: len(shows) == 2)
+
+      skill.stop()
+      await asyncio.wait_for(skill.wait_closed(), 1)
+
+    try:
+      asyncio.run(run())
+    finally:
+      atlas.stop()
+
+    self.assertEqual(['async', 'sync'], sorted(shows))
@@ -0,0 +1,97 @@
+import unittest, json
+from atlas_sdk import SkillClient, Intent, Slot
+from atlas_sdk.cache import CachePolicy, ResponseCache, freeze
+from atlas_sdk.client import INTENT_TOPIC
+from atlas_sdk.metrics import Metrics
+from fakes import FakeMQTT, Message, Clock
+
+def intent_payload(cid, sid, city, lang='en', units='metric'):
+  return json.dumps({
+    '__cid': cid,
+    '__sid': sid,
+    '__lang': lang,
+    '__env': { 'UNITS': units, 'TOKEN': cid },
+    'city': [{ 'value': city }],
+    'date': [{ 'value': cid }],
+  }).encode()
+
+class TestResponseCache(unittest.TestCase):
+
+  def test_freeze(self):
+    self.assertEqual(freeze({ 'a': [1, { 'b': 2, 'c': 3 }] }), freeze({ 'a': [1, { 'c': 3, 'b': 2 }] }))
+    self.assertNotEqual(freeze([1, 2]), freeze([2, 1]))
+
+  def test_ttl_and_lru(self):
+    clock = Clock()
+    cache = ResponseCache(max_entries=2, clock=clock)
+
+    cache.set('a', ['first'], 10)
+    cache.set('b', ['second'], 5)
+
+    self.assertEqual(['first'], cache.get('a'))
+
+    cache.set('c', ['third'], 20)
+
+    self.assertIsNone(cache.get('b')) # Least recently used
+
+    clock.now = 10
+
+    self.assertIsNone(cache.get('a')) # Expired
+    self.assertEqual(['third'], cache.get('c'))
+    self.assertEqual((2, 2), (cache.hits, cache.misses))
+
+  def test_skill_replays_responses(self):
+    calls = []
+
+    def handler(request):
+      calls.append(request.cid)
+      request.show('Sunny in %s' % request.slot('city').first().value, terminate=True)
+
+    metrics = Metrics()
+    skill = SkillClient('test', '1.0.0', metrics=metrics, intents=[
+      Intent('weather', handler, [Slot('city'), Slot('date')], cache=CachePolicy(60, slots=['city'], env=['UNITS'])),
+    ])
+    skill._client = FakeMQTT()
+    skill.on_connect(None, None, None, 0)
+
+    def send(*args, **kwargs):
+      skill.on_message(None, None, Message(INTENT_TOPIC % 'weather', intent_payload(*args, **kwargs)))
+
+    send('c1', 's1', 'Paris')
+    send('c2', 's2', 'Paris') # Same city, the date and token are not part of the key
+    send('c3', 's3', 'Paris', lang='fr')
+    send('c4', 's4', 'Paris', units='imperial')
+    send('c5', 's5', 'Lyon')
+
+    self.assertEqual(['c1', 'c3', 'c4', 'c5'], calls)
+
+    replayed = [(t, json.loads(p)) for t, p, _ in skill._client.published if t.startswith('atlas/s2/')]
+
+    self.assertEqual([
+      ('atlas/s2/dialog/show', { '__cid': 'c2', 'text': 'Sunny in Paris', 'cards': None }),
+      ('atlas/s2/dialog/terminate', { '__cid': 'c2' }),
+    ], replayed)
+    self.assertEqual(4, len(skill.response_cache))
+    self.assertEqual(1, metrics.counter('intent_cache_hits_total', (('intent', 'weather'),)))
+    self.assertEqual(4, metrics.counter('intent_cache_misses_total', (('intent', 'weather'),)))
+
+  def test_failures_are_not_cached(self):
+    calls = []
+
+    def handler(request):
+      calls.append(request.cid)
+      request.show('Partial')
+      raise ValueError('Backend is down')
+
+    skill = SkillClient('test', '1.0.0', intents=[Intent('weather', handler, [Slot('city')], cache=CachePolicy(60))])
+    skill._client = FakeMQTT()
+    skill.on_connect(None, None, None, 0)
+
+    for cid in ('c1', 'c2'):
+      try:
+        skill.on_message(None, None, Message(INTENT_TOPIC % 'weather', intent_payload(cid, 's1', 'Paris')))
+      except ValueError:
+        pass
+
+    self.assertEqual(['c1', 'c2'], calls)
+    self.assertEqual(0, len(skill.response_cache))
@@ -0,0 +1,49 @@
+import unittest
+from collections import Counter
+from unittest import mock
+from atlas_sdk.channel_client import ChannelClient
+from atlas_sdk.scheduler import Stagger
+from fakes import FakeMQTT
+
+CHANNELS = 10000
+RATE = 500
+
+def fake_transport(client_id):
+  return FakeMQTT()
+
+class TestChannelClient(unittest.TestCase):
+
+  def test_restart_storm(self):
+    """Simulates an atlas restart seen by many channels of the same process.
+    """
+
+    stagger = Stagger(rate=RATE, jitter=1.0, clock=lambda: 0)
+    delays = []
+
+    channels = [ChannelClient('c%d' % i, 'u', recreate_stagger=stagger, transport=fake_transport) for i in range(CHANNELS)]
+
+    for channel in channels:
+      channel.call_later = lambda delay, fn, *args: delays.append(delay)
+      channel.create()
+
+    # Two pings in a row, channels must only be recreated once
+    for _ in range(2):
+      for channel in channels:
+        channel._check_still_connected({ 'started_at': '2100-01-01T00:00:00+02:00' }, None)
+
+    self.assertEqual(CHANNELS, len(delays))
+
+    creates_per_second = Counter(int(d) for d in delays)
+
+    self.assertLessEqual(max(creates_per_second.values()), RATE + 1)
+    self.assertAlmostEqual(CHANNELS / RATE, max(delays), delta=1.5)
+
+  def test_no_recreate_when_up_to_date(self):
+    channel = ChannelClient('c', 'u', transport=fake_transport)
+
+    channel.call_later = mock.Mock()
+    channel._check_still_connected({ 'started_at': '2000-01-01T00:00:00' }, None)
+    channel.create()
+    channel._check_still_connected({ 'started_at': '2000-01-01T00:00:00' }, None)
+
+    channel.call_later.assert_not_called()
@@ -0,0 +1,58 @@
+import unittest, json
+from atlas_sdk.channel_hub import ChannelHub
+from fakes import Message
+
+class TestChannelHub(unittest.TestCase):
+
+  def setUp(self):
+    self.published = []
+    self.hub = ChannelHub(batch_interval=0)
+    self.hub.publish = lambda topic, payload=None, *args: self.published.append((topic, payload and json.loads(payload)))
+    self.hub.on_connect(None, None, None, 0)
+
+  def test_route_by_client_id(self):
+    shown = []
+    terminated = []
+
+    self.hub.channel('a', 'john', on_show=lambda d, r: shown.append(('a', d['text'])))
+    self.hub.channel('b', 'bob', on_show=lambda d, r: shown.append(('b', d['text'])), on_terminate=lambda: terminated.append('b'))
+
+    self.hub.on_message(None, None, Message('atlas/b/channel/show', b'{"text": "hello"}'))
+    self.hub.on_message(None, None, Message('atlas/b/channel/terminate', b''))
+    self.hub.on_message(None, None, Message('atlas/c/channel/show', b'{"text": "nobody"}'))
+
+    self.assertEqual([('b', 'hello')], shown)
+    self.assertEqual(['b'], terminated)
+
+  def test_batch_create_and_destroy(self):
+    self.hub.batch_interval = 60
+    self.hub.connected = False
+
+    for i in range(3):
+      self.hub.channel(str(i), 'john').create()
+
+    self.hub.remove('1')
+
+    self.assertEqual([], self.published)
+
+    self.hub.flush()
+
+    self.assertEqual([
+      ('atlas/0/channel/create', { 'uid': 'john' }),
+      ('atlas/1/channel/destroy', None),
+      ('atlas/2/channel/create', { 'uid': 'john' }),
+    ], self.published)
+
+  def test_recreate_on_server_restart(self):
+    delays = []
+
+    self.hub.call_later = lambda delay, fn, *args: (delays.append(delay), fn(*args))
+    self.hub.channel('a', 'john').create()
+    self.published.clear()
+
+    self.hub._check_still_connected({ 'started_at': '2000-01-01T00:00:00' }, None)
+    self.assertEqual([], self.published)
+
+    self.hub._check_still_connected({ 'started_at': '2100-01-01T00:00:00' }, None)
+    self.assertEqual(['atlas/a/channel/create'], [t for t, _ in self.published])
+    self.assertEqual(1, len(delays))
@@ -0,0 +1,93 @@
+import unittest, threading, time
+from atlas_sdk.client import Client, PublishQueueFull, PUBLISH_DROP, PUBLISH_RAISE
+from atlas_sdk.transport import MQTT_ERR_NO_CONN
+from fakes import FakeMQTT
+
+def make_client(**kwargs):
+  client = Client('test', **kwargs)
+  client._client = FakeMQTT()
+  return client
+
+class TestClient(unittest.TestCase):
+
+  def test_qos_policy(self):
+    client = make_client(qos={ 'atlas/+/dialog/#': 1, 'atlas/discovery/pong': 2 })
+
+    client.publish('atlas/a/dialog/show')
+    client.publish('atlas/discovery/pong')
+    client.publish('atlas/a/channel/show')
+    client.publish('atlas/a/channel/show', qos=1)
+
+    self.assertEqual([1, 2, 0, 1], [q for _, _, q in client._client.published])
+
+  def test_in_flight(self):
+    client = make_client()
+
+    client.publish_many([('a', 'show'), ('a', 'terminate')])
+
+    self.assertEqual(2, client.in_flight)
+
+    client._on_publish(None, None, 1)
+
+    self.assertEqual(1, client.in_flight)
+
+  def test_in_flight_reset_by_reconnections(self):
+    client = make_client(max_pending=2)
+
+    client.publish('a', qos=1)
+    client.on_disconnect(None, None, 1)
+
+    self.assertEqual(0, client.in_flight)
+
+    client._client.rc = MQTT_ERR_NO_CONN
+    client.publish('a', qos=1) # Kept by paho until the next connection
+
+    self.assertEqual(0, client.in_flight)
+
+    client._client.rc = 0
+    client.publish('a', qos=1) # Accepted right before the connection is lost
+    client._on_connect(None, None, None, 0)
+
+    self.assertEqual(0, client.in_flight)
+
+    client._on_publish(None, None, 1) # Acknowledged late
+    client.publish('a', qos=1)
+    client.publish('a', qos=1)
+
+    self.assertEqual(2, client.in_flight)
+
+  def test_drop_when_full(self):
+    client = make_client(max_pending=2, on_full=PUBLISH_DROP)
+
+    self.assertTrue(client.publish('a'))
+    self.assertFalse(client.publish_many([('a', 'show'), ('a', 'terminate')]))
+    self.assertTrue(client.publish('a'))
+    self.assertFalse(client.publish('a'))
+    self.assertEqual(3, client.dropped)
+    self.assertEqual(2, len(client._client.published))
+
+  def test_raise_when_full(self):
+    client = make_client(max_pending=1, on_full=PUBLISH_RAISE)
+
+    client.publish('a')
+
+    with self.assertRaises(PublishQueueFull):
+      client.publish('a')
+
+  def test_block_when_full(self):
+    client = make_client(max_pending=1)
+
+    client.publish('a')
+
+    t = threading.Thread(target=client.publish, args=('b',))
+    t.start()
+    time.sleep(0.05)
+
+    self.assertEqual(1, client.queued)
+    self.assertEqual(1, len(client._client.published))
+
+    client._on_publish(None, None, 1)
+    t.join(1)
+
+    self.assertEqual(0, client.queued)
+    self.assertEqual(2, len(client._client.published))
@@ -0,0 +1,92 @@
+import unittest, json, os
+from atlas_sdk import SkillClient, ChannelClient, Intent
+from atlas_sdk.client import INTENT_TOPIC, CHANNEL_SHOW_TOPIC, DISCOVERY_PONG_TOPIC, ASSET_TOPIC
+from atlas_sdk.assets import AssetCache
+from atlas_sdk.compression import Compression, ZLIB, MARKER, is_compressed, decompress
+from fakes import FakeMQTT, Message
+
+CARDS = [{ 'header': 'Day %d' % i, 'text': 'Sunny with a light breeze from the north west' } for i in range(20)]
+
+class TestCompression(unittest.TestCase):
+
+  def test_threshold(self):
+    compression = Compression(threshold=100)
+    payload = json.dumps(CARDS).encode('utf-8')
+
+    self.assertIs(b'{"small": true}', compression.compress(b'{"small": true}'))
+    self.assertTrue(is_compressed(compression.compress(payload)))
+    self.assertEqual(payload, decompress(compression.compress(payload)))
+    self.assertEqual(payload, decompress(compression.compress(payload.decode('utf-8'))))
+
+  def test_incompressible_payloads_are_sent_as_is(self):
+    payload = os.urandom(2048)
+
+    self.assertIs(payload, Compression(threshold=0).compress(payload))
+
+  def test_negotiated_with_atlas(self):
+    def handler(request):
+      request.show('Forecast', cards=CARDS)
+
+    skill = SkillClient('test', '1.0.0', intents=[Intent('weather', handler)], compression=Compression())
+    skill._client = FakeMQTT()
+    skill.on_connect(None, None, None, 0)
+
+    def shows():
+      return [p for t, p, _ in skill._client.published if t == 'atlas/s1/dialog/show']
+
+    skill.on_message(None, None, Message(INTENT_TOPIC % 'weather', b'{"__cid": "c1", "__sid": "s1"}'))
+
+    self.assertFalse(is_compressed(shows()[-1])) # Atlas did not say it could read them yet
+
+    skill.on_discovery_request({ 'capabilities': [ZLIB] }, None)
+    skill.on_message(None, None, Message(INTENT_TOPIC % 'weather', b'{"__cid": "c2", "__sid": "s1"}'))
+
+    self.assertTrue(is_compressed(shows()[-1]))
+    self.assertEqual('c2', json.loads(decompress(shows()[-1]))['__cid'])
+
+    pong = [p for t, p, _ in skill._client.published if t == DISCOVERY_PONG_TOPIC][-1]
+
+    self.assertEqual([ZLIB], json.loads(pong)['capabilities'])
+
+    skill.on_discovery_request({}, None) # Atlas has been downgraded
+    skill.on_message(None, None, Message(INTENT_TOPIC % 'weather', b'{"__cid": "c3", "__sid": "s1"}'))
+
+    self.assertFalse(is_compressed(shows()[-1]))
+
+  def test_received_payloads_are_decompressed(self):
+    shown = []
+    channel = ChannelClient('c1', 'u1', on_show=lambda data, raw: shown.append(data))
+    channel._client = FakeMQTT()
+    channel.on_connect(None, None, None, 0)
+
+    payload = json.dumps({ 'text': 'Forecast', 'cards': CARDS }).encode('utf-8')
+
+    channel.on_message(None, None, Message(CHANNEL_SHOW_TOPIC % 'c1', Compression().compress(payload)))
+    channel.on_message(None, None, Message(CHANNEL_SHOW_TOPIC % 'c1', MARKER + b'corrupted'))
+
+    self.assertEqual([{ 'text': 'Forecast', 'cards': CARDS }], shown)
+
+  def test_assets_are_never_compressed(self):
+    content = MARKER + json.dumps(CARDS).encode('utf-8') # Binary content looking compressed
+
+    skill = SkillClient('test', '1.0.0', compression=Compression())
+    skill._client = FakeMQTT()
+    skill.on_discovery_request({ 'capabilities': [ZLIB] }, None)
+    skill.publish(ASSET_TOPIC % 'abc', content)
+
+    self.assertIs(content, skill._client.published[-1][1])
+
+    assets = AssetCache()
+    channel = ChannelClient('c1', 'u1', assets=assets)
+    channel._client = FakeMQTT()
+    channel.on_connect(None, None, None, 0)
+    channel.on_message(None, None, Message(ASSET_TOPIC % 'abc', content))
+
+    self.assertEqual(content, assets.get('abc'))
+
+  def test_channel_advertises_it(self):
+    channel = ChannelClient('c1', 'u1', compression=Compression())
+    channel._client = FakeMQTT()
+    channel.create()
+
+    self.assertEqual({ 'uid': 'u1', 'capabilities': [ZLIB] }, json.loads(channel._client.published[0][1]))
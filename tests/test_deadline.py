@@ -0,0 +1,117 @@
+import unittest, asyncio, threading, time
+from atlas_sdk import SkillClient, AsyncSkillClient, Intent
+from atlas_sdk.client import INTENT_TOPIC, DIALOG_TERMINATE_TOPIC
+from fakes import FakeMQTT, Message
+
+PAYLOAD = b'{"__cid": "c1", "__sid": "s1"}'
+
+def published_topics(skill):
+  return [t for t, _, _ in skill._client.published]
+
+class TestDeadline(unittest.TestCase):
+
+  def test_stuck_handler_is_abandoned(self):
+    release, answered = threading.Event(), threading.Event()
+    requests = []
+
+    def hang(request):
+      requests.append(request)
+      release.wait()
+      request.show('Too late')
+      answered.set()
+
+    skill = SkillClient('test', '1.0.0', intents=[Intent('hang', hang, timeout=0.05), Intent('quick', lambda r: r.terminate())],
+      workers=1, timeout_message='Sorry, I could not make it')
+    skill._client = FakeMQTT()
+    skill.on_connect(None, None, None, 0)
+
+    skill.on_message(None, None, Message(INTENT_TOPIC % 'hang', PAYLOAD))
+    skill.on_message(None, None, Message(INTENT_TOPIC % 'quick', PAYLOAD))
+
+    for _ in range(100):
+      if skill._pool.abandoned:
+        break
+
+      time.sleep(0.01)
+
+    skill._pool.shutdown() # Only waits for the replacement worker
+
+    self.assertEqual(1, skill.timeouts)
+    self.assertEqual(1, skill._pool.abandoned)
+    self.assertTrue(requests[0].expired)
+    self.assertAlmostEqual(0, requests[0].remaining)
+
+    show, terminate, quick_terminate = [p for t, p, _ in skill._client.published if t.startswith('atlas/s1')]
+
+    self.assertIn(b'Sorry, I could not make it', show if isinstance(show, bytes) else show.encode())
+
+    release.set()
+    answered.wait(1)
+
+    # The late response has been dropped
+    self.assertEqual(3, len([t for t in published_topics(skill) if t.startswith('atlas/s1')]))
+
+  def test_fallback_is_sent_without_workers(self):
+    release = threading.Event()
+
+    def hang(request):
+      release.wait()
+
+    skill = SkillClient('test', '1.0.0', intents=[Intent('hang', hang, timeout=0.05)], timeout_message='Sorry')
+    skill._client = FakeMQTT()
+    skill.on_connect(None, None, None, 0)
+
+    network_thread = threading.Thread(target=skill.on_message, args=(None, None, Message(INTENT_TOPIC % 'hang', PAYLOAD)))
+    network_thread.start()
+    network_thread.join(1)
+
+    self.assertFalse(network_thread.is_alive()) # The handler did not run on it
+
+    for _ in range(100):
+      if skill.timeouts:
+        break
+
+      time.sleep(0.01)
+
+    try:
+      self.assertEqual(1, skill.timeouts)
+      self.assertIn(DIALOG_TERMINATE_TOPIC % 's1', published_topics(skill)) # While the handler is still stuck
+    finally:
+      release.set()
+      skill._pool.shutdown()
+
+  def test_no_timeout_when_answered_in_time(self):
+    skill = SkillClient('test', '1.0.0', intents=[Intent('quick', lambda r: r.terminate())], timeout=1)
+    skill._client = FakeMQTT()
+    skill.on_connect(None, None, None, 0)
+
+    skill.on_message(None, None, Message(INTENT_TOPIC % 'quick', PAYLOAD))
+    skill._pool.shutdown() # Waits for the handler
+
+    self.assertEqual(0, skill.timeouts)
+    self.assertEqual([DIALOG_TERMINATE_TOPIC % 's1'], [t for t in published_topics(skill) if t.startswith('atlas/s1')])
+
+  def test_async_handler_is_cancelled(self):
+    cancelled = []
+
+    async def hang(request):
+      try:
+        await asyncio.sleep(10)
+      except asyncio.CancelledError:
+        cancelled.append(request)
+        raise
+
+    skill = AsyncSkillClient('test', '1.0.0', intents=[Intent('hang', hang)], timeout=0.05)
+    skill._client = FakeMQTT()
+
+    async def run():
+      skill._loop = asyncio.get_running_loop()
+      skill._on_intent(skill.intents[0], PAYLOAD)
+
+      await asyncio.gather(*skill.tasks)
+
+    asyncio.run(run())
+
+    self.assertEqual(1, len(cancelled))
+    self.assertEqual(1, skill.timeouts)
+    self.assertEqual([DIALOG_TERMINATE_TOPIC % 's1'], published_topics(skill))
@@ -0,0 +1,78 @@
+import unittest, json
+from atlas_sdk import SkillClient, Intent, Env, BrokerConfig
+from atlas_sdk.client import INTENT_TOPIC, DISCOVERY_PONG_TOPIC
+from atlas_sdk.env import EnvSchema, EnvCache, ENV_DELTA
+from atlas_sdk.request import Request
+from fakes import FakeMQTT, Message
+
+class TestEnv(unittest.TestCase):
+
+  def test_schema(self):
+    schema = EnvSchema([
+      Env('UNITS'),
+      Env('DAYS', var_type=int, default=3),
+      Env('VERBOSE', var_type=bool),
+      Env('RATIO', var_type=float, default=1.0),
+    ])
+
+    config = schema.parse({ 'DAYS': '5', 'VERBOSE': 'false', 'RATIO': 'nope', 'OTHER': 'kept' })
+
+    self.assertEqual({ 'UNITS': None, 'DAYS': 5, 'VERBOSE': False, 'RATIO': 1.0, 'OTHER': 'kept' }, config)
+    self.assertEqual(5, config.DAYS)
+    self.assertTrue(schema.parse({ 'VERBOSE': 'Yes' }).VERBOSE)
+
+    with self.assertRaises(AttributeError):
+      config.MISSING
+
+  def test_request_config(self):
+    skill = SkillClient('test', '1.0.0', env=[Env('DAYS', var_type=int)])
+    request = Request(skill, None, b'{"__cid": "c1", "__env": { "DAYS": "7" }}')
+
+    self.assertEqual(7, request.env('DAYS'))
+    self.assertIs(request.config, request.config)
+    self.assertEqual('a', Request(None, { '__env': { 'A': 'a' } }, None).env('A'))
+
+  def test_delta_protocol(self):
+    configs = []
+
+    def handler(request):
+      configs.append(request.config)
+
+    skill = SkillClient('test', '1.0.0', intents=[Intent('weather', handler)], env=[Env('DAYS', var_type=int)], env_cache=EnvCache())
+    skill._client = FakeMQTT()
+    skill.on_connect(None, None, None, 0)
+
+    def pongs():
+      return [p for t, p, _ in skill._client.published if t == DISCOVERY_PONG_TOPIC]
+
+    self.assertIn(ENV_DELTA, json.loads(pongs()[0])['capabilities'])
+
+    def send(payload):
+      skill.on_message(None, None, Message(INTENT_TOPIC % 'weather', payload))
+
+    send(b'{"__cid": "c1", "__uid": "u1", "__env": { "DAYS": "7" }}')
+    send(b'{"__cid": "c2", "__uid": "u1"}')
+    send(b'{"__cid": "c3", "__uid": "u2"}') # Unknown user, atlas is asked to resend env values
+
+    self.assertEqual([7, 7, None], [c.DAYS for c in configs])
+    self.assertIs(configs[0], configs[1])
+    self.assertEqual(2, len(pongs()))
+
+    send(b'{"__cid": "c4", "__uid": "u3"}') # Not asked again right away
+
+    self.assertEqual(2, len(pongs()))
+
+    skill.env = [Env('DAYS', var_type=float)]
+
+    self.assertEqual(0, len(skill.env_cache))
+
+  def test_not_available_to_replicas(self):
+    with self.assertRaises(ValueError):
+      SkillClient('test', '1.0.0', share_group='test', env_cache=EnvCache())
+
+    skill = SkillClient('test', '1.0.0', env_cache=EnvCache())
+
+    with self.assertRaises(ValueError):
+      skill._run_replicas(BrokerConfig(), 2) # Checked before forking
+
+    self.assertEqual('test', skill.share_group)
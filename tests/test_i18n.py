@@ -0,0 +1,57 @@
+import unittest, builtins, os, threading
+from atlas_sdk import i18n
+from atlas_sdk.i18n import Translations
+from atlas_sdk.request import Request
+
+LOCALE_DIR = os.path.join(os.path.dirname(__file__), '..', 'example', 'locale')
+
+class FakeClient():
+  translations = Translations(LOCALE_DIR)
+
+class TestI18n(unittest.TestCase):
+
+  def test_lazy_cached_translators(self):
+    translations = Translations(LOCALE_DIR)
+
+    self.assertEqual(0, translations.get.cache_info().currsize)
+    self.assertIs(translations.get('fr'), translations.get('fr'))
+    self.assertEqual('Bonjour', translations.get('fr').gettext('hello'))
+    self.assertEqual('hello', translations.get('de').gettext('hello'))
+    self.assertEqual('hello', translations.get(None).gettext('hello'))
+    self.assertEqual(['en', 'fr'], sorted(translations.languages()))
+
+  def test_request_gettext(self):
+    req = Request(FakeClient(), { '__lang': 'fr' }, None)
+
+    self.assertEqual('Bonjour', req._('hello'))
+    self.assertEqual('apples', req.ngettext('apple', 'apples', 2))
+
+  def test_builtin_uses_current_translator(self):
+    for name in ('_', 'ngettext'):
+      if hasattr(builtins, name):
+        self.addCleanup(setattr, builtins, name, getattr(builtins, name))
+      else:
+        self.addCleanup(delattr, builtins, name)
+
+    i18n.install()
+
+    results = {}
+    ready = threading.Barrier(2)
+
+    def handle(lang):
+      token = i18n.activate(FakeClient.translations.get(lang))
+      ready.wait()
+      results[lang] = builtins._('hello')
+      i18n.deactivate(token)
+
+    threads = [threading.Thread(target=handle, args=(l,)) for l in ('fr', 'en')]
+
+    for t in threads:
+      t.start()
+
+    for t in threads:
+      t.join()
+
+    self.assertEqual('Bonjour', results['fr'])
+    self.assertEqual('Hi', results['en'])
+    self.assertEqual('hello', builtins._('hello'))
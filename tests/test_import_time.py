@@ -0,0 +1,37 @@
+import unittest, os, subprocess, sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Dependencies which should only be imported when actually used
+HEAVY_MODULES = ('paho', 'semantic_version', 'dateutil', 'argparse', 'gettext', 'asyncio')
+
+# Budget for `from atlas_sdk import SkillClient`, could be raised on slow machines
+BUDGET_MS = float(os.environ.get('ATLAS_IMPORT_BUDGET_MS', 80))
+
+def run(statement, *flags):
+  code = '%s\nimport sys\nprint(",".join(m for m in %r if m in sys.modules))' % (statement, HEAVY_MODULES)
+
+  return subprocess.run([sys.executable, *flags, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+def import_time_ms(statement):
+  total = 0
+
+  for line in run(statement, '-X', 'importtime').stderr.splitlines():
+    if line.startswith('import time:') and 'self [us]' not in line:
+      _, cumulative, name = line.split('|')
+
+      if name.startswith(' atlas_sdk'):
+        total += int(cumulative)
+
+  return total / 1000
+
+class TestImportTime(unittest.TestCase):
+
+  def test_heavy_modules_are_lazy(self):
+    for statement in ('import atlas_sdk', 'from atlas_sdk import ChannelClient, ChannelHub', 'from atlas_sdk import SkillClient, Request'):
+      self.assertEqual('', run(statement).stdout.strip(), statement)
+
+  def test_budget(self):
+    elapsed = min(import_time_ms('from atlas_sdk import SkillClient') for _ in range(3))
+
+    self.assertLess(elapsed, BUDGET_MS)
@@ -0,0 +1,23 @@
+import unittest
+from atlas_sdk.loadtest import LoadTest, percentile, format_report
+
+class TestLoadTest(unittest.TestCase):
+
+  def test_percentile(self):
+    values = list(range(1, 101))
+
+    self.assertEqual(50, percentile(values, 50))
+    self.assertEqual(99, percentile(values, 99))
+    self.assertEqual(1, percentile(values, 0))
+    self.assertIsNone(percentile([], 50))
+
+  def test_loopback_run(self):
+    load_test = LoadTest(channels=4, skills=2, rate=200, duration=0.2, workers=2)
+    report = load_test.run(drain=5)
+
+    self.assertEqual(40, report['sent'])
+    self.assertEqual(40, report['answered'])
+    self.assertEqual(0, report['unanswered'])
+    self.assertEqual(0, report['dropped'])
+    self.assertLessEqual(report['p50_ms'], report['p99_ms'])
+    self.assertIn('answered    40', format_report(report))
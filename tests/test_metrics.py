@@ -0,0 +1,83 @@
+import unittest
+from atlas_sdk import SkillClient, Intent
+from atlas_sdk.client import Client, INTENT_TOPIC
+from atlas_sdk.metrics import Metrics, Histogram, normalize_topic
+from fakes import FakeMQTT, Message
+
+class TestMetrics(unittest.TestCase):
+
+  def test_histogram(self):
+    histogram = Histogram((1, 5))
+
+    for value in (0.5, 1, 3, 10):
+      histogram.observe(value)
+
+    self.assertEqual([(1, 2), (5, 3), (float('inf'), 4)], histogram.cumulative())
+    self.assertEqual(14.5, histogram.sum)
+
+  def test_normalize_topic(self):
+    self.assertEqual('atlas/+/dialog/show', normalize_topic('atlas/a-sid/dialog/show'))
+    self.assertEqual('atlas/+/channel/create', normalize_topic('atlas/a-client/channel/create'))
+    self.assertEqual('atlas/discovery/pong', normalize_topic('atlas/discovery/pong'))
+
+  def test_prometheus(self):
+    metrics = Metrics()
+    metrics.inc('messages_total', (('topic', 'a'),), 2)
+    metrics.observe('duration_seconds', (), 0.2, (0.1, 1))
+    metrics.gauge('depth', lambda: 3)
+
+    lines = metrics.to_prometheus().splitlines()
+
+    self.assertIn('# TYPE atlas_messages_total counter', lines)
+    self.assertIn('atlas_messages_total{topic="a"} 2', lines)
+    self.assertIn('atlas_depth 3', lines)
+    self.assertIn('atlas_duration_seconds_bucket{le="0.1"} 0', lines)
+    self.assertIn('atlas_duration_seconds_bucket{le="1.0"} 1', lines)
+    self.assertIn('atlas_duration_seconds_bucket{le="+Inf"} 1', lines)
+    self.assertIn('atlas_duration_seconds_count 1', lines)
+
+  def test_client_records_messages_and_publications(self):
+    metrics = Metrics()
+    client = Client('test', metrics=metrics)
+    client._client = FakeMQTT()
+    received = []
+
+    client.subscribe_json('atlas/+/dialog/show', lambda data, raw: received.append(data))
+    client.on_message(None, None, Message('atlas/s1/dialog/show', b'{"text": "hi"}'))
+    client.on_message(None, None, Message('atlas/s1/dialog/show', b'not json'))
+    client.publish('atlas/s1/dialog/ask', '12345')
+
+    labels = (('topic', 'atlas/+/dialog/show'),)
+
+    self.assertEqual([{ 'text': 'hi' }, {}], received)
+    self.assertEqual(2, metrics.counter('messages_received_total', labels))
+    self.assertEqual(2, metrics.histogram('dispatch_seconds', labels).count)
+    self.assertEqual(1, metrics.counter('decode_errors_total', (('codec', client.codec.name),)))
+    self.assertEqual(5, metrics.histogram('publish_bytes', (('topic', 'atlas/+/dialog/ask'),)).sum)
+    self.assertEqual(1, metrics.to_dict()['gauges']['atlas_publish_in_flight{client="atlas.client.test"}'])
+
+  def test_skill_records_intents(self):
+    def fail(request):
+      raise RuntimeError()
+
+    metrics = Metrics()
+    skill = SkillClient('test', '1.0.0', intents=[Intent('echo', lambda r: None), Intent('fail', fail)], metrics=metrics)
+    skill._client = FakeMQTT()
+    skill.on_connect(None, None, None, 0)
+
+    skill.on_message(None, None, Message(INTENT_TOPIC % 'echo', b'{"__sid": "s1"}'))
+
+    with self.assertRaises(RuntimeError):
+      skill.on_message(None, None, Message(INTENT_TOPIC % 'fail', b'{"__sid": "s1"}'))
+
+    self.assertEqual(1, metrics.counter('intents_total', (('intent', 'echo'),)))
+    self.assertEqual(0, metrics.counter('intent_errors_total', (('intent', 'echo'),)))
+    self.assertEqual(1, metrics.counter('intent_errors_total', (('intent', 'fail'),)))
+    self.assertEqual(1, metrics.histogram('intent_seconds', (('intent', 'fail'),)).count)
+    self.assertEqual(1, metrics.counter('handler_errors_total', (('topic', INTENT_TOPIC % 'fail'),)))
+
+  def test_disabled_by_default(self):
+    client = Client('test')
+
+    self.assertIsNone(client.metrics)
+    self.assertIs(client.codec.loads, client.loads)
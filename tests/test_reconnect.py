@@ -0,0 +1,117 @@
+import unittest
+from atlas_sdk import SkillClient, ChannelClient, Intent, BrokerConfig
+from atlas_sdk.client import Client, INTENT_TOPIC, DISCOVERY_PING_TOPIC, CHANNEL_SHOW_TOPIC
+from fakes import FakeMQTT, Message
+
+class RecordingMQTT(FakeMQTT):
+  """Fake client which also records calls made to it, in order.
+  """
+
+  def __init__(self):
+    super(RecordingMQTT, self).__init__()
+    self.calls = []
+
+  def subscribe(self, topic, qos=0):
+    self.calls.append(('subscribe', topic if isinstance(topic, list) else (topic, qos)))
+    return (0, 1)
+
+  def username_pw_set(self, username, password=None):
+    self.calls.append(('username_pw_set', username))
+
+  def connect(self, host, port=1883):
+    self.calls.append(('connect', host))
+
+  def loop_start(self):
+    pass
+
+def subscriptions(client):
+  return [args for name, args in client._client.calls if name == 'subscribe']
+
+class TestReconnect(unittest.TestCase):
+
+  def test_credentials_are_set_before_connecting(self):
+    client = Client('test')
+    client._client = RecordingMQTT()
+    client.start(BrokerConfig(username='user', password='pass'))
+
+    self.assertEqual([('username_pw_set', 'user'), ('connect', 'localhost')], client._client.calls)
+
+  def test_subscriptions_are_batched(self):
+    skill = SkillClient('test', '1.0.0', intents=[Intent('a', lambda r: None), Intent('b', lambda r: None)])
+    skill._client = RecordingMQTT()
+    skill._on_connect(None, None, { 'session present': 0 }, 0)
+
+    self.assertEqual([[(DISCOVERY_PING_TOPIC, 0), (INTENT_TOPIC % 'a', 0), (INTENT_TOPIC % 'b', 0)]], subscriptions(skill))
+
+    skill.on_disconnect(None, None, 1)
+    skill._on_connect(None, None, { 'session present': 0 }, 0)
+
+    self.assertEqual(2, len(subscriptions(skill)))
+    self.assertEqual(subscriptions(skill)[0], subscriptions(skill)[1])
+
+    skill.subscribe_json('atlas/custom', lambda data, raw: None)
+
+    self.assertEqual(('atlas/custom', 0), subscriptions(skill)[-1]) # Connected ones are sent right away
+
+  def test_persistent_session(self):
+    with self.assertRaises(ValueError):
+      Client(persistent=True)
+
+    shown = []
+    channel = ChannelClient('c1', 'u1', on_show=lambda data, raw: shown.append(data), persistent=True)
+    channel._client = RecordingMQTT()
+    channel._on_connect(None, None, { 'session present': 0 }, 0)
+
+    self.assertEqual(1, len(subscriptions(channel)))
+    self.assertEqual(1, len(channel._client.published)) # Created
+
+    channel.on_disconnect(None, None, 1)
+    channel._on_connect(None, None, { 'session present': 1 }, 0)
+
+    self.assertEqual(1, len(subscriptions(channel))) # The broker kept them
+    self.assertEqual(1, len(channel._client.published)) # And atlas still knows the channel
+
+    channel.on_message(None, None, Message(CHANNEL_SHOW_TOPIC % 'c1', b'{"text": "Hello"}'))
+
+    self.assertEqual([{ 'text': 'Hello' }], shown) # Still routed locally
+
+  def test_persistent_subscriptions_are_queued_by_the_broker(self):
+    channel = ChannelClient('c1', 'u1', persistent=True)
+    channel._client = RecordingMQTT()
+    channel._on_connect(None, None, { 'session present': 0 }, 0)
+    channel.subscribe_json('atlas/custom', lambda data, raw: None)
+
+    self.assertEqual(1, channel.subscribe_qos)
+    self.assertEqual({ 1 }, set(qos for _, qos in subscriptions(channel)[0]))
+    self.assertEqual(('atlas/custom', 1), subscriptions(channel)[-1])
+
+    client = Client('test', persistent=True, subscribe_qos=2)
+
+    self.assertEqual(2, client.subscribe_qos)
+
+  def test_offline_buffer(self):
+    client = Client('test', offline_buffer=2)
+    client._client = RecordingMQTT()
+
+    client.publish('atlas/1', 'one')
+    client.publish('atlas/2', 'two')
+    client.publish_many([('atlas/3', 'three')])
+
+    self.assertEqual([], client._client.published)
+    self.assertEqual(1, client.offline_dropped) # The oldest one
+
+    client._on_connect(None, None, {}, 0)
+
+    self.assertEqual(['atlas/2', 'atlas/3'], [t for t, _, _ in client._client.published])
+
+    client.publish('atlas/4', 'four')
+
+    self.assertEqual('atlas/4', client._client.published[-1][0])
+
+  def test_without_offline_buffer(self):
+    client = Client('test')
+    client._client = RecordingMQTT()
+    client.publish('atlas/1', 'one')
+    client._on_connect(None, None, {}, 0)
+
+    self.assertEqual(['atlas/1'], [t for t, _, _ in client._client.published]) # Left to the transport
@@ -1,5 +1,7 @@
-import unittest
+import unittest, json
+from atlas_sdk import SkillClient
 from atlas_sdk.request import Request
+from fakes import FakeMQTT
 
 class TestRequest(unittest.TestCase):
   
@@ -16,4 +18,25 @@ class TestRequest(unittest.TestCase):
 
     data = req.slot('location')
 
-    self.assertEqual('Paris', data.first().value)
\ No newline at end of file
+    self.assertEqual('Paris', data.first().value)
+
+  def test_decoded_on_first_access(self):
+    req = Request(None, None, b'{"__cid": "with \\"quotes\\"", "__sid": "a sid", "__lang": null, "location": [{ "value": "Paris" }]}')
+
+    self.assertIsNone(req._data)
+    self.assertEqual('with "quotes"', req.cid)
+    self.assertEqual('a sid', req.sid)
+    self.assertIsNone(req.lang)
+    self.assertEqual('Paris', req.slot('location').first().value)
+
+  def test_slot_values_are_shown(self):
+    skill = SkillClient('test', '1.0.0')
+    skill._client = FakeMQTT()
+    req = Request(skill, None, b'{"__cid": "c1", "__sid": "s1", "location": [{ "value": "Paris", "geo": { "lat": 48.85 } }]}')
+
+    req.show('Sunny', additional_data=req.slot('location').first())
+
+    data = json.loads(skill._client.published[0][1])
+
+    self.assertEqual('Paris', data['value'])
+    self.assertEqual({ 'lat': 48.85 }, data['geo'])
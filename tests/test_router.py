@@ -0,0 +1,44 @@
+import unittest
+from atlas_sdk.router import TopicRouter, Route
+
+def route(topic):
+  return Route(topic, 'void', None, None)
+
+class TestTopicRouter(unittest.TestCase):
+
+  def matches(self, router, topic):
+    return sorted(r.topic for r in router.match(topic))
+
+  def test_exact(self):
+    router = TopicRouter()
+    router.add(route('atlas/intents/echo'))
+
+    self.assertEqual(['atlas/intents/echo'], self.matches(router, 'atlas/intents/echo'))
+    self.assertEqual([], self.matches(router, 'atlas/intents/other'))
+
+  def test_wildcards(self):
+    router = TopicRouter()
+
+    for topic in ['atlas/+/channel/show', 'atlas/#', '#', 'atlas/a/channel/show', 'atlas/+', 'other/+/x']:
+      router.add(route(topic))
+
+    self.assertEqual(6, len(router))
+    self.assertEqual(['#', 'atlas/#', 'atlas/+/channel/show', 'atlas/a/channel/show'], self.matches(router, 'atlas/a/channel/show'))
+    self.assertEqual(['#', 'atlas/#', 'atlas/+'], self.matches(router, 'atlas/a'))
+    self.assertEqual(['#', 'atlas/#'], self.matches(router, 'atlas'))
+    self.assertEqual([], self.matches(router, '$SYS/broker'))
+
+  def test_remove(self):
+    router = TopicRouter()
+    router.add(route('atlas/+/channel/show'))
+    router.add(route('atlas/+/channel/ask'))
+
+    self.assertIsNotNone(router.remove('atlas/+/channel/show'))
+    self.assertIsNone(router.remove('atlas/+/channel/show'))
+    self.assertEqual([], self.matches(router, 'atlas/a/channel/show'))
+    self.assertEqual(['atlas/+/channel/ask'], self.matches(router, 'atlas/a/channel/ask'))
+
+    router.remove('atlas/+/channel/ask')
+
+    self.assertEqual(0, len(router))
+    self.assertEqual({}, router._root.children)
@@ -0,0 +1,39 @@
+import unittest, threading
+from atlas_sdk.scheduler import Scheduler, Stagger, default_scheduler, _reset_default
+
+class TestScheduler(unittest.TestCase):
+
+  def test_call_later(self):
+    scheduler = Scheduler()
+    calls = []
+    done = threading.Event()
+
+    scheduler.call_later(0.03, calls.append, 'last')
+    scheduler.call_later(0.01, calls.append, 'first')
+    scheduler.call_later(0.02, calls.append, 'cancelled').cancel()
+    scheduler.call_later(0.04, done.set)
+
+    self.assertTrue(done.wait(1))
+    self.assertEqual(['first', 'last'], calls)
+
+  def test_default_scheduler_is_shared_when_idle(self):
+    def threads():
+      return len([t for t in threading.enumerate() if t.name == 'atlas-scheduler'])
+
+    _reset_default()
+
+    before = threads()
+    scheduler = default_scheduler()
+
+    self.assertEqual(0, len(scheduler)) # An idle scheduler is falsy
+
+    for _ in range(20):
+      self.assertIs(scheduler, default_scheduler())
+      default_scheduler().call_later(0, lambda: None)
+
+    self.assertLessEqual(threads(), before + 1)
+
+  def test_stagger_rate(self):
+    stagger = Stagger(rate=10, jitter=0, clock=lambda: 0)
+
+    self.assertEqual([0, 0.1, 0.2], [round(stagger.delay(), 3) for _ in range(3)])
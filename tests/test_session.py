@@ -0,0 +1,141 @@
+import unittest, os, tempfile
+from atlas_sdk import SkillClient, Intent
+from atlas_sdk.client import INTENT_TOPIC
+from atlas_sdk.session import SessionStore, MemorySessionStore, SqliteSessionStore
+from fakes import FakeMQTT, Message, Clock
+
+class TestSessionStore(unittest.TestCase):
+
+  def test_memory_lru_and_ttl(self):
+    clock = Clock()
+    store = MemorySessionStore(ttl=10, max_sessions=2, clock=clock)
+
+    store.save('s1', { 'step': 1 })
+    store.save('s2', { 'step': 2 })
+
+    self.assertEqual({ 'step': 1 }, store.load('s1'))
+
+    store.save('s3', { 'step': 3 })
+
+    self.assertEqual({}, store.load('s2')) # Least recently used
+
+    clock.now = 10
+
+    self.assertEqual({}, store.load('s1')) # Expired
+    self.assertEqual((1, 2), (store.hits, store.misses))
+    self.assertAlmostEqual(1 / 3, store.hit_rate)
+
+  def test_sqlite(self):
+    clock = Clock()
+
+    with tempfile.TemporaryDirectory() as folder:
+      path = os.path.join(folder, 'sessions.db')
+      store = SqliteSessionStore(path, ttl=10, clock=clock)
+
+      store.save('s1', { 'step': 1, 'cities': ['Paris'] })
+      store.save('s2', { 'step': 2 })
+      store.delete('s2')
+      store.close()
+
+      store = SqliteSessionStore(path, ttl=10, clock=clock)
+
+      self.assertEqual({ 'step': 1, 'cities': ['Paris'] }, store.load('s1'))
+      self.assertEqual({}, store.load('s2'))
+      self.assertEqual(1, len(store))
+
+      clock.now = 10
+
+      self.assertEqual({}, store.load('s1'))
+      store.close()
+
+  def test_sqlite_purge(self):
+    clock = Clock()
+
+    with tempfile.TemporaryDirectory() as folder:
+      store = SqliteSessionStore(os.path.join(folder, 'sessions.db'), max_sessions=10, clock=clock)
+
+      for i in range(SqliteSessionStore.PURGE_EVERY):
+        clock.now = i
+        store.save('s%d' % i, {})
+
+      self.assertEqual(10, len(store))
+      self.assertEqual({}, store.load('s%d' % (SqliteSessionStore.PURGE_EVERY - 1)))
+      self.assertEqual(1, store.hits)
+      store.close()
+
+  def test_base_is_abstract(self):
+    with self.assertRaises(TypeError):
+      SessionStore()
+
+  def test_replicas_are_warned_about_memory_store(self):
+    with self.assertLogs('atlas.client.sdk', 'WARNING') as logs:
+      SkillClient('test', '1.0.0', share_group='test')
+
+    self.assertIn('SqliteSessionStore', logs.output[0])
+
+    with tempfile.TemporaryDirectory() as folder:
+      with self.assertNoLogs('atlas.client.sdk', 'WARNING'):
+        SkillClient('test', '1.0.0', share_group='test', sessions=SqliteSessionStore(os.path.join(folder, 'sessions.db')))
+
+  def test_kept_between_turns(self):
+    seen = []
+
+    def handler(request):
+      seen.append(dict(request.session))
+
+      if not request.slot('city').first().value:
+        request.session['asked'] = request.session.get('asked', 0) + 1
+        return request.ask('city', 'Which city?')
+
+      request.show('Sunny', terminate=True)
+
+    skill = SkillClient('test', '1.0.0', intents=[Intent('weather', handler)])
+    skill._client = FakeMQTT()
+    skill.on_connect(None, None, None, 0)
+
+    def send(payload):
+      skill.on_message(None, None, Message(INTENT_TOPIC % 'weather', payload))
+
+    send(b'{"__cid": "c1", "__sid": "s1"}')
+    send(b'{"__cid": "c2", "__sid": "s1"}')
+    send(b'{"__cid": "c3", "__sid": "s1", "city": [{ "value": "Paris" }]}')
+    send(b'{"__cid": "c4", "__sid": "s1"}')
+
+    self.assertEqual([{}, { 'asked': 1 }, { 'asked': 2 }, {}], seen)
+    self.assertEqual(1, len(skill.sessions)) # Only the last dialog is still running
+    self.assertEqual((2, 2), (skill.sessions.hits, skill.sessions.misses))
+
+  def test_not_saved_when_the_handler_fails(self):
+    def handler(request):
+      request.session['step'] = request.slot('step').first().value
+
+      if request.session['step'] == 'broken':
+        raise RuntimeError('Backend unavailable')
+
+    skill = SkillClient('test', '1.0.0', intents=[Intent('order', handler)])
+    skill._client = FakeMQTT()
+    skill.on_connect(None, None, None, 0)
+
+    def send(payload):
+      skill.on_message(None, None, Message(INTENT_TOPIC % 'order', payload))
+
+    send(b'{"__cid": "c1", "__sid": "s1", "step": [{ "value": "pizza" }]}')
+
+    with self.assertRaises(RuntimeError):
+      send(b'{"__cid": "c2", "__sid": "s1", "step": [{ "value": "broken" }]}')
+
+    self.assertEqual({ 'step': 'pizza' }, skill.sessions.load('s1'))
+
+  def test_not_shared_without_session_id(self):
+    def handler(request):
+      request.session['seen'] = request.session.get('seen', 0) + 1
+
+    skill = SkillClient('test', '1.0.0', intents=[Intent('order', handler)])
+    skill._client = FakeMQTT()
+    skill.on_connect(None, None, None, 0)
+
+    for cid in (b'c1', b'c2'):
+      skill.on_message(None, None, Message(INTENT_TOPIC % 'order', b'{"__cid": "%s"}' % cid))
+
+    self.assertEqual(0, len(skill.sessions))
+    self.assertEqual((0, 0), (skill.sessions.hits, skill.sessions.misses))
@@ -0,0 +1,141 @@
+import unittest, os
+from unittest import mock
+from atlas_sdk import SkillClient, Intent, BrokerConfig
+from atlas_sdk.client import Client, INTENT_TOPIC, DISCOVERY_PING_TOPIC, DISCOVERY_PONG_TOPIC, DIALOG_TERMINATE_TOPIC
+from atlas_sdk.router import shared_topic, split_shared
+from atlas_sdk.transport import LoopbackBroker
+from atlas_sdk.compression import Compression, ZLIB
+from fakes import FakeMQTT
+
+class TestSharedSubscription(unittest.TestCase):
+
+  def setUp(self):
+    self.broker = LoopbackBroker()
+    self.clients = []
+
+  def tearDown(self):
+    for client in self.clients:
+      client.stop()
+
+  def start(self, client):
+    client.start(BrokerConfig())
+    self.clients.append(client)
+    self.broker.join()
+    return client
+
+  def replica(self, handled, answers_pings=True, compression=None):
+    def handler(request):
+      handled.append(request.sid)
+      request.terminate()
+
+    skill = SkillClient('test', '1.0.0', intents=[Intent('greet', handler)], share_group='test', transport=self.broker.transport, compression=compression)
+    skill.answers_pings = answers_pings
+
+    return self.start(skill)
+
+  def test_split(self):
+    self.assertEqual('$share/group/atlas/intents/+', shared_topic('group', 'atlas/intents/+'))
+    self.assertEqual(('group', 'atlas/intents/+'), split_shared('$share/group/atlas/intents/+'))
+    self.assertEqual((None, 'atlas/intents/+'), split_shared('atlas/intents/+'))
+
+  def test_intents_are_split_among_replicas(self):
+    first, second = [], []
+    self.replica(first)
+    self.replica(second)
+
+    atlas = self.start(Client('atlas', transport=self.broker.transport))
+    terminated = []
+
+    atlas.subscribe_message(DIALOG_TERMINATE_TOPIC % '+', lambda msg: terminated.append(msg.topic))
+    self.broker.join()
+
+    for i in range(10):
+      atlas.publish_json(INTENT_TOPIC % 'greet', { '__cid': 'c%d' % i, '__sid': 's%d' % i })
+
+    self.broker.join()
+
+    self.assertEqual(10, len(terminated))
+    self.assertEqual(5, len(first))
+    self.assertEqual(5, len(second))
+    self.assertEqual(['s%d' % i for i in range(10)], sorted(first + second, key=lambda sid: int(sid[1:])))
+
+  def test_one_replica_answers_pings(self):
+    replicas = [self.replica([], compression=Compression()), self.replica([], answers_pings=False, compression=Compression())]
+    negotiated = []
+
+    for replica in replicas:
+      replica.negotiate = negotiated.append
+
+    atlas = self.start(Client('atlas', transport=self.broker.transport))
+    pongs = []
+
+    atlas.subscribe_json(DISCOVERY_PONG_TOPIC, lambda data, raw: pongs.append(data['name']))
+    self.broker.join()
+
+    atlas.publish_json(DISCOVERY_PING_TOPIC, { 'capabilities': [ZLIB] })
+    atlas.publish_json(DISCOVERY_PING_TOPIC, { 'capabilities': [ZLIB] })
+    self.broker.join()
+
+    self.assertEqual(['test', 'test'], pongs)
+    self.assertEqual([[ZLIB]] * 4, negotiated) # Every replica got every ping
+
+  def test_unsubscribe(self):
+    client = self.start(Client('test', transport=self.broker.transport))
+    received = []
+
+    client.subscribe_raw(shared_topic('group', 'a/+'), received.append)
+    client.subscribe_raw('a/b', received.append)
+    self.broker.join()
+
+    client.unsubscribe(shared_topic('group', 'a/+'))
+    self.broker.join()
+
+    client.publish('a/b', 'exact')
+    client.publish('a/c', 'wildcard')
+    self.broker.join()
+
+    self.assertEqual(['exact'], received)
+
+  @unittest.skipUnless(hasattr(os, 'fork'), 'Needs os.fork')
+  def test_forked_replicas(self):
+    class RecordingMQTT(FakeMQTT):
+      def __init__(self, client_id=None):
+        super(RecordingMQTT, self).__init__()
+        self.subscriptions = []
+
+      def subscribe(self, topic, qos=0):
+        self.subscriptions.extend([t for t, _ in topic] if isinstance(topic, list) else [topic])
+        return (0, 1)
+
+    replicas = []
+    skill = SkillClient('my/skill', '1.0.0', intents=[Intent('greet', lambda r: None)], workers=2, transport=RecordingMQTT)
+    parent_client, parent_pool = skill._client, skill._pool
+
+    def run(config):
+      skill._on_connect(None, None, { 'session present': 0 }, 0)
+      replicas.append((skill._client, skill._pool, skill.answers_pings))
+
+    skill._run = run
+
+    # Every replica runs here, one after the other, as if os.fork returned in the child
+    with mock.patch('os.fork', return_value=0) as fork, mock.patch('os._exit') as exit, mock.patch('os.waitpid'):
+      skill._run_replicas(BrokerConfig(), 2)
+
+    self.assertEqual(2, fork.call_count)
+    self.assertEqual(2, exit.call_count)
+    self.assertEqual('my_skill', skill.share_group)
+    self.assertEqual([True, False], [answers for _, _, answers in replicas])
+
+    clients = [c for c, _, _ in replicas]
+    pools = [p for _, p, _ in replicas]
+
+    self.assertEqual(3, len(set(map(id, [parent_client] + clients))))
+    self.assertEqual(3, len(set(map(id, [parent_pool] + pools))))
+
+    for client in clients:
+      self.assertIn(DISCOVERY_PING_TOPIC, client.subscriptions)
+      self.assertIn(shared_topic('my_skill', INTENT_TOPIC % 'greet'), client.subscriptions)
+      self.assertNotIn(INTENT_TOPIC % 'greet', client.subscriptions)
+
+    for pool in pools + [parent_pool]:
+      pool.shutdown()
@@ -0,0 +1,50 @@
+import unittest, json
+from atlas_sdk import SkillClient, Intent, Slot, Env
+from atlas_sdk.client import DISCOVERY_PONG_TOPIC, DISCOVERY_MANIFEST_TOPIC
+from fakes import FakeMQTT
+
+def make_skill(**kwargs):
+  skill = SkillClient('test', '1.0.0', intents=[Intent('echo', None, [Slot('date')])], env=[Env('KEY')], **kwargs)
+  skill._client = FakeMQTT()
+  return skill
+
+class TestSkillClient(unittest.TestCase):
+
+  def pongs(self, skill):
+    return [p for t, p, _ in skill._client.published if t == DISCOVERY_PONG_TOPIC]
+
+  def test_pong_is_cached(self):
+    skill = make_skill()
+
+    skill.on_discovery_request({ 'version': '1.1.0' }, None)
+    skill.on_discovery_request({ 'version': '1.1.0' }, None)
+
+    first, second = self.pongs(skill)
+
+    self.assertIs(first, second)
+    self.assertEqual({ 'echo': ['date'] }, json.loads(first)['intents'])
+
+    skill.intents = [Intent('other', None)]
+    skill.on_discovery_request({}, None)
+
+    self.assertEqual({ 'other': [] }, json.loads(self.pongs(skill)[-1])['intents'])
+
+  def test_pong_jitter(self):
+    skill = make_skill(discovery_jitter=2)
+    delays = []
+
+    skill.call_later = lambda delay, fn, *args: delays.append(delay)
+    skill.on_discovery_request({}, None)
+
+    self.assertEqual([], self.pongs(skill))
+    self.assertTrue(0 <= delays[0] <= 2)
+
+  def test_retained_manifest(self):
+    skill = make_skill(retain_manifest=True)
+
+    skill.on_connect(None, None, None, 0)
+
+    manifests = [(p, q) for t, p, q in skill._client.published if t == DISCOVERY_MANIFEST_TOPIC % 'test']
+
+    self.assertEqual(1, len(manifests))
+    self.assertEqual('test', json.loads(manifests[0][0])['name'])
@@ -1,5 +1,7 @@
-import unittest
+import unittest, json
+from datetime import datetime, timedelta
 from atlas_sdk.slot_data import AttrDict, SlotData
+from atlas_sdk.codec import JsonCodec, default_codec
 
 class TestSlotData(unittest.TestCase):
 
@@ -23,3 +25,69 @@ class TestSlotData(unittest.TestCase):
     self.assertEqual('a last value', data.last().value)
     self.assertEqual('a value', data[0].value)
     self.assertEqual('another one', data[1].value)
+
+  def test_slot_value_view(self):
+    raw = { 'value': 'Paris', 'location': { 'lat': 48.85 } }
+    data = SlotData([raw])
+    value = data.first()
+
+    self.assertIs(value, data[0])
+    self.assertIs(value.location, value.location)
+    self.assertEqual(48.85, value.location.lat)
+    self.assertEqual(raw, value)
+    self.assertIs(raw, value.to_dict())
+    self.assertIsNone(value.get('unknown'))
+
+    with self.assertRaises(AttributeError):
+      value.unknown
+
+    with self.assertRaises(AttributeError):
+      value.value = 'London'
+
+  def test_slot_value_is_a_mapping(self):
+    raw = { 'value': 'Paris', 'location': { 'lat': 48.85 } }
+    value = SlotData([raw]).first()
+
+    self.assertEqual(raw, dict(value))
+    self.assertEqual(raw, { **value })
+    self.assertEqual(['value', 'location'], list(value.keys()))
+    self.assertEqual(('value', 'Paris'), list(value.items())[0])
+    self.assertEqual(raw, json.loads(json.dumps(value.to_dict())))
+
+    for codec in (JsonCodec(), default_codec()):
+      self.assertEqual({ 'city': raw }, json.loads(codec.dumps({ 'city': value })))
+      self.assertEqual(raw, json.loads(codec.dumps(value)))
+
+    with self.assertRaises(TypeError):
+      JsonCodec().dumps(object())
+
+  def test_slices(self):
+    data = SlotData([{ 'value': 1 }, { 'value': 2 }, { 'value': 3 }])
+
+    self.assertEqual([2, 3], [v.value for v in data[1:]])
+    self.assertIs(data[1], data[1:2][0])
+    self.assertEqual([], data[5:])
+
+  def test_iteration(self):
+    data = SlotData([{ 'value': 1 }, { 'value': 2 }])
+
+    self.assertEqual([1, 2], [v.value for v in data])
+    self.assertIs(data.values()[1], data[1])
+
+  def test_typed_values(self):
+    data = SlotData([
+      { 'value': '2018-05-25T10:30:00' },
+      { 'value': '42' },
+      { 'value': 'PT1H30M' },
+      { 'value': 5.5 },
+      { 'value': { 'days': 1, 'minutes': 2 } },
+    ])
+
+    self.assertEqual(datetime(2018, 5, 25, 10, 30), data[0].as_date())
+    self.assertIs(data[0].as_date(), data[0].as_date())
+    self.assertEqual(42, data[1].as_number())
+    self.assertEqual(timedelta(hours=1, minutes=30), data[2].as_duration())
+    self.assertEqual(5.5, data[3].as_number())
+    self.assertEqual(timedelta(seconds=5.5), data[3].as_duration())
+    self.assertEqual(timedelta(days=1, minutes=2), data[4].as_duration())
+    self.assertIsNone(SlotData().first().as_date())
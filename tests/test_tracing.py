@@ -0,0 +1,87 @@
+import unittest, json, os, tempfile
+from atlas_sdk import SkillClient, ChannelClient, ChannelHub, Intent
+from atlas_sdk.client import CHANNEL_SHOW_TOPIC
+from atlas_sdk.tracing import Tracer, MemorySink, JsonLinesSink, TRACE_KEY, mark, durations
+from fakes import FakeMQTT, Message
+
+class TestTracing(unittest.TestCase):
+
+  def test_parse(self):
+    channel = ChannelClient('c1', 'u1', tracer=Tracer(MemorySink()))
+    channel._client = FakeMQTT()
+    channel.parse('Hello')
+
+    data = json.loads(channel._client.published[0][1])
+
+    self.assertEqual('Hello', data['text'])
+    self.assertEqual('channel.parse', data[TRACE_KEY]['marks'][0][0])
+
+    channel.tracer.sample_rate = 0
+    channel.parse('Hello')
+
+    self.assertEqual('Hello', channel._client.published[1][1])
+
+  def test_echoed_by_skills(self):
+    def handler(request):
+      request.show('Sunny', terminate=True)
+
+    skill = SkillClient('test', '1.0.0', intents=[Intent('weather', handler)])
+    skill._client = FakeMQTT()
+
+    trace = mark(mark({ 'id': 't1', 'marks': [] }, 'channel.parse', 1), 'atlas.intent', 2)
+    skill._on_intent(skill.intents[0], json.dumps({ '__cid': 'c1', '__sid': 's1', TRACE_KEY: trace }).encode('utf-8'))
+    skill._on_intent(skill.intents[0], b'{"__cid": "c2", "__sid": "s1"}')
+
+    show, terminate, untraced, _ = [json.loads(p) for _, p, _ in skill._client.published]
+    stages = [m[0] for m in show[TRACE_KEY]['marks']]
+
+    self.assertEqual('t1', show[TRACE_KEY]['id'])
+    self.assertEqual(['channel.parse', 'atlas.intent', 'skill.received', 'skill.show'], stages)
+    self.assertEqual('skill.terminate', terminate[TRACE_KEY]['marks'][-1][0])
+    self.assertNotIn(TRACE_KEY, untraced)
+
+  def test_recorded_by_channels(self):
+    sink = MemorySink()
+    shown = []
+    channel = ChannelClient('c1', 'u1', on_show=lambda data, raw: shown.append(data['text']), tracer=Tracer(sink))
+    channel._client = FakeMQTT()
+    channel.on_connect(None, None, None, 0)
+
+    trace = { 'id': 't1', 'marks': [['channel.parse', 1], ['skill.show', 3]] }
+
+    channel.on_message(None, None, Message(CHANNEL_SHOW_TOPIC % 'c1', json.dumps({ 'text': 'Sunny', TRACE_KEY: trace }).encode('utf-8')))
+    channel.on_message(None, None, Message(CHANNEL_SHOW_TOPIC % 'c1', b'{"text": "Cloudy"}'))
+
+    self.assertEqual(['Sunny', 'Cloudy'], shown)
+    self.assertEqual(1, len(sink.records))
+
+    record = sink.records[0]
+
+    self.assertEqual(('t1', 'c1', 'channel.show'), (record['trace'], record['channel'], record['stage']))
+    self.assertEqual(('channel.parse', 'skill.show', 2), durations(record['marks'])[0])
+
+  def test_recorded_by_hubs(self):
+    sink = MemorySink()
+    hub = ChannelHub(tracer=Tracer(sink))
+    hub._client = FakeMQTT()
+    hub.on_connect(None, None, None, 0)
+    hub.channel('c1', 'u1', on_show=lambda data, raw: None)
+
+    hub.on_message(None, None, Message(CHANNEL_SHOW_TOPIC % 'c1', json.dumps({ 'text': 'Sunny', TRACE_KEY: { 'id': 't1', 'marks': [] } }).encode('utf-8')))
+
+    self.assertEqual(['channel.show'], [m[0] for m in sink.records[0]['marks']])
+
+  def test_json_lines_sink(self):
+    with tempfile.TemporaryDirectory() as folder:
+      path = os.path.join(folder, 'traces.jsonl')
+      tracer = Tracer(JsonLinesSink(path))
+
+      tracer.record(tracer.start(), 'channel.show', 'c1')
+      tracer.record(tracer.start(), 'channel.ask', 'c1')
+      tracer.sink.close()
+
+      with open(path) as f:
+        records = [json.loads(line) for line in f]
+
+    self.assertEqual(['channel.show', 'channel.ask'], [r['stage'] for r in records])
+    self.assertEqual(['channel.parse', 'channel.show'], [m[0] for m in records[0]['marks']])
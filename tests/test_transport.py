@@ -0,0 +1,99 @@
+import unittest
+from atlas_sdk import SkillClient, Intent, BrokerConfig
+from atlas_sdk.client import Client, INTENT_TOPIC, DIALOG_SHOW_TOPIC, DIALOG_TERMINATE_TOPIC
+from atlas_sdk.transport import LoopbackBroker
+
+class TestLoopbackTransport(unittest.TestCase):
+
+  def setUp(self):
+    self.broker = LoopbackBroker()
+    self.clients = []
+
+  def tearDown(self):
+    for client in self.clients:
+      client.stop()
+
+  def start(self, client):
+    client.start(BrokerConfig())
+    self.clients.append(client)
+    self.broker.join()
+    return client
+
+  def client(self):
+    return self.start(Client('test', transport=self.broker.transport))
+
+  def test_topic_semantics(self):
+    client = self.client()
+    received = []
+
+    client.subscribe_message('a/+/c', lambda msg: received.append(('+', msg.topic)))
+    client.subscribe_message('a/#', lambda msg: received.append(('#', msg.topic)))
+    client.subscribe_message('#', lambda msg: received.append(('all', msg.topic)))
+    self.broker.join()
+
+    client.publish('a/b/c')
+    client.publish('$SYS/a')
+    client.publish('b')
+    self.broker.join()
+
+    self.assertEqual(sorted([('+', 'a/b/c'), ('#', 'a/b/c'), ('all', 'a/b/c'), ('all', 'b')]), sorted(received))
+
+  def test_delivered_once_per_client(self):
+    publisher, subscriber = self.client(), self.client()
+    received = []
+
+    subscriber._client.on_message = lambda client, userdata, msg: received.append(msg.topic)
+    subscriber._client.subscribe('a/+')
+    subscriber._client.subscribe('a/#')
+
+    publisher.publish('a/b')
+    self.broker.join()
+
+    self.assertEqual(['a/b'], received)
+
+  def test_retained(self):
+    publisher = self.client()
+    publisher.publish('manifest/a', 'first', retain=True)
+    publisher.publish('manifest/b', 'second', retain=True)
+    publisher.publish('manifest/b', None, retain=True)
+
+    subscriber = self.client()
+    received = []
+
+    subscriber.subscribe_raw('manifest/+', received.append)
+    self.broker.join()
+
+    self.assertEqual(['first'], received)
+
+  def test_objects_are_not_serialized(self):
+    publisher, subscriber = self.client(), self.client()
+    received = []
+    data = { 'text': 'hello' }
+
+    subscriber.subscribe_json('topic', lambda data, raw: received.append(data))
+    self.broker.join()
+
+    publisher.publish_json('topic', data)
+    publisher.publish('topic', b'{"text": "encoded"}')
+    self.broker.join()
+
+    self.assertIs(data, received[0])
+    self.assertEqual({ 'text': 'encoded' }, received[1])
+
+  def test_skill_round_trip(self):
+    def handler(request):
+      request.show('Hello %s' % request.slot('name').first().value, terminate=True)
+
+    self.start(SkillClient('test', '1.0.0', intents=[Intent('greet', handler)], transport=self.broker.transport))
+
+    atlas = self.client()
+    received = []
+
+    atlas.subscribe_json(DIALOG_SHOW_TOPIC % '+', lambda data, raw: received.append(data))
+    atlas.subscribe_void(DIALOG_TERMINATE_TOPIC % 's1', lambda: received.append('terminated'))
+    self.broker.join()
+
+    atlas.publish_json(INTENT_TOPIC % 'greet', { '__cid': 'c1', '__sid': 's1', 'name': [{ 'value': 'Bob' }] })
+    self.broker.join()
+
+    self.assertEqual([{ '__cid': 'c1', 'text': 'Hello Bob', 'cards': None }, 'terminated'], received)
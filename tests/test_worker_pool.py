@@ -0,0 +1,79 @@
+import unittest, threading, time
+from atlas_sdk.worker_pool import WorkerPool
+
+class TestWorkerPool(unittest.TestCase):
+
+  def test_keep_order_per_key(self):
+    pool = WorkerPool(4)
+    results = { 'a': [], 'b': [] }
+
+    def task(key, i):
+      time.sleep(0.001)
+      results[key].append(i)
+
+    for i in range(20):
+      pool.submit('a', task, 'a', i)
+      pool.submit('b', task, 'b', i)
+
+    pool.shutdown()
+
+    self.assertEqual(list(range(20)), results['a'])
+    self.assertEqual(list(range(20)), results['b'])
+
+  def test_run_keys_concurrently(self):
+    pool = WorkerPool(2)
+    barrier = threading.Barrier(2, timeout=2)
+
+    # Would raise a BrokenBarrierError if tasks were not running at the same time
+    pool.submit('a', barrier.wait)
+    pool.submit('b', barrier.wait)
+    pool.shutdown()
+
+    self.assertFalse(barrier.broken)
+
+  def test_queue_depth(self):
+    pool = WorkerPool(1)
+    release = threading.Event()
+
+    pool.submit('a', release.wait)
+    pool.submit('a', lambda: None)
+    pool.submit(None, lambda: None)
+
+    time.sleep(0.05)
+
+    self.assertEqual(1, pool.active)
+    self.assertEqual(2, pool.queue_depth)
+
+    release.set()
+    pool.shutdown()
+
+    self.assertEqual(0, pool.queue_depth)
+    self.assertEqual(0, pool.sessions)
+
+  def test_abandon_stuck_task(self):
+    pool = WorkerPool(1)
+    started, release, done = threading.Event(), threading.Event(), threading.Event()
+    stuck = []
+
+    def hang():
+      stuck.append(threading.current_thread())
+      started.set()
+      release.wait()
+
+    pool.submit('a', hang)
+    pool.submit('a', done.set)
+
+    started.wait(1)
+
+    self.assertTrue(pool.abandon(stuck[0]))
+    self.assertFalse(pool.abandon(stuck[0]))
+    self.assertTrue(done.wait(1))
+    self.assertEqual(1, pool.workers)
+    self.assertEqual(1, pool.abandoned)
+
+    release.set()
+    stuck[0].join(1)
+
+    self.assertFalse(stuck[0].is_alive())
+
+    pool.shutdown()